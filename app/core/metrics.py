@@ -0,0 +1,26 @@
+import bisect
+
+
+# durations, counts per bucket of upper bounds in seconds
+class LatencyHistogram:
+    def __init__(self, bounds: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one is everything slower than the last bound
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def to_dict(self) -> dict:
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts, strict=True)),
+            "count": self.count,
+            "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+        }
@@ -0,0 +1,156 @@
+import time
+
+from sqlalchemy import Engine, create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
+
+from app.core.metrics import LatencyHistogram
+from app.db.settings import settings_database
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.wait = LatencyHistogram(bounds=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+        self.timeouts = 0
+        self.peak_checked_out = 0
+
+
+# times every checkout, a slow checkout means all connections were busy
+class TimedCheckout:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait.observe(time.perf_counter() - start)
+        self.metrics.peak_checked_out = max(self.metrics.peak_checked_out, self.checkedout())
+        return connection
+
+
+class TimedQueuePool(TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_profile(url: str) -> str:
+    if settings_database.db_profile != "auto":
+        return settings_database.db_profile
+    return {"postgresql": "postgres", "sqlite": "sqlite"}.get(make_url(url).get_backend_name(), "default")
+
+
+def is_memory_sqlite(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings_database.db_sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings_database.db_sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings_database.db_sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings_database.db_sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings_database.db_sqlite_cache_size)}")
+    finally:
+        cursor.close()
+
+
+def pool_kwargs(poolclass: type[QueuePool] = TimedQueuePool) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings_database.db_pool_size,
+        "max_overflow": settings_database.db_max_overflow,
+        "pool_timeout": settings_database.db_pool_timeout_seconds,
+    }
+
+
+def postgres_kwargs(url: str, poolclass: type[QueuePool]) -> dict:
+    connect_args = {}
+    timeout = int(settings_database.db_statement_timeout_ms)
+    if timeout and make_url(url).get_driver_name() == "asyncpg":
+        connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+    elif timeout:
+        connect_args["options"] = f"-c statement_timeout={timeout}"
+    return {
+        **pool_kwargs(poolclass),
+        "pool_recycle": settings_database.db_pool_recycle_seconds,
+        "pool_pre_ping": settings_database.db_pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+def create_app_engine(url: str) -> Engine:
+    """the engine for the database url, tuned by the profile in the settings"""
+    profile = engine_profile(url)
+
+    if profile == "postgres":
+        return create_engine(url, **postgres_kwargs(url, TimedQueuePool))
+
+    if profile == "sqlite":
+        # an in-memory database lives in its connection, it keeps the sqlalchemy pool for it
+        kwargs = {} if is_memory_sqlite(url) else pool_kwargs()
+        engine = create_engine(url, connect_args={"check_same_thread": False}, **kwargs)
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        return engine
+
+    return create_engine(url)
+
+
+# same url with the async driver of the backend, an url that already names a driver other than the sync default is kept
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    drivers = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+    if parsed.get_backend_name() in drivers and parsed.get_driver_name() in ("pysqlite", "psycopg2"):
+        parsed = parsed.set(drivername=f"{parsed.get_backend_name()}+{drivers[parsed.get_backend_name()]}")
+    return parsed.render_as_string(hide_password=False)
+
+
+def create_app_async_engine(url: str) -> AsyncEngine:
+    """the async engine for the database url, with the same profile as the sync one. needs aiosqlite or asyncpg"""
+    url = async_database_url(url)
+    profile = engine_profile(url)
+
+    if profile == "postgres":
+        return create_async_engine(url, **postgres_kwargs(url, TimedAsyncQueuePool))
+
+    if profile == "sqlite":
+        kwargs = {} if is_memory_sqlite(url) else pool_kwargs(TimedAsyncQueuePool)
+        engine = create_async_engine(url, **kwargs)
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)  # the aiosqlite connection has a sync facade
+        return engine
+
+    return create_async_engine(url)
+
+
+def pool_stats(engine: Engine) -> dict:
+    pool = engine.pool
+    stats = {"profile": engine_profile(str(engine.url)), "dialect": engine.dialect.name, "pool": type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        return stats
+
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    stats.update(
+        {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": pool.checkedout() / capacity if capacity else 0.0,
+            "timeout_seconds": pool.timeout(),
+        }
+    )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update({"peak_checked_out": metrics.peak_checked_out, "timeouts": metrics.timeouts, "checkout_wait": metrics.wait.to_dict()})
+    return stats
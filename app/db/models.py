@@ -1,7 +1,7 @@
 from datetime import date, datetime
 from typing import override
 
-from sqlalchemy import CheckConstraint, Date, DateTime, Enum, Float, Integer, String
+from sqlalchemy import CheckConstraint, Date, DateTime, Enum, Float, Index, Integer, String
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.sql.schema import ForeignKey
@@ -30,10 +30,12 @@ class FightersDB(Base):
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())  # created when the record its created
     updated_at: Mapped[datetime | None] = mapped_column(onupdate=func.now(), nullable=True)
 
-    # constraints
-    __table_args__: tuple[CheckConstraint, ...] = (
+    # constraints, and indexes for the listing filtered by division in id or name order
+    __table_args__: tuple[CheckConstraint | Index, ...] = (
         CheckConstraint("LENGTH(name) >= 5", name="name_min_length"),
         CheckConstraint("LENGTH(name) <=50", name="name_max_length"),
+        Index("ix_fighters_division_id", "division", "id"),
+        Index("ix_fighters_division_name", "division", "name"),
     )
 
     features: Mapped["FighterFeatures"] = relationship("FighterFeatures", back_populates="fighter", uselist=False)
@@ -54,6 +56,18 @@ class FightsDB(Base):
     fight_date: Mapped[date] = mapped_column(Date, nullable=False)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
+    # the listing pages by (fight_date, id), optionally within a division. a fighter history reads each corner in
+    # (fight_date, id) order. the other foreign keys are looked up by card predictions and checked on fighter deletes
+    __table_args__: tuple[Index, ...] = (
+        Index("ix_fights_fight_date_id", "fight_date", "id"),
+        Index("ix_fights_division_fight_date_id", "division", "fight_date", "id"),
+        Index("ix_fights_red_corner_fight_date_id", "red_corner", "fight_date", "id"),
+        Index("ix_fights_blue_corner_fight_date_id", "blue_corner", "fight_date", "id"),
+        Index("ix_fights_card", "card"),
+        Index("ix_fights_favorite", "favorite"),
+        Index("ix_fights_winner", "winner"),
+    )
+
     # relationship definition
     red_fighter: Mapped["FightersDB"] = relationship("FightersDB", foreign_keys=[red_corner])
     blue_fighter: Mapped["FightersDB"] = relationship("FightersDB", foreign_keys=[blue_corner])
@@ -73,10 +87,11 @@ class CardsDB(Base):
     card_number: Mapped[int] = mapped_column(Integer, nullable=True, unique=True)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
-    # constraints
-    __table_args__: tuple[CheckConstraint, ...] = (
+    # constraints, and the index the listing pages by
+    __table_args__: tuple[CheckConstraint | Index, ...] = (
         CheckConstraint("LENGTH(card_name) >= 5", name="card_name_min_length"),
         CheckConstraint("LENGTH(card_name) <=50", name="card_name_max_length"),
+        Index("ix_cards_card_date_id", "card_date", "id"),
     )
 
 
@@ -92,6 +107,6 @@ class FighterFeatures(Base):
     wins_by_ko: Mapped[int] = mapped_column(Integer, default=0)
     wins_by_submission: Mapped[int] = mapped_column(Integer, default=0)
 
-    updated_at: Mapped[datetime] = mapped_column(DateTime, onupdate=func.now(), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, onupdate=func.now(), server_default=func.now(), index=True)  # the matrix sync reads recent rows
 
     fighter: Mapped["FightersDB"] = relationship("FightersDB", back_populates="features")
@@ -1,16 +1,22 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 
+from app.db.engine import create_app_async_engine, create_app_engine
 from app.db.settings import settings_database
 
 SQLALCHEMY_DATABASE_URL = settings_database.DATABASE_URL
 print(SQLALCHEMY_DATABASE_URL)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_app_engine(SQLALCHEMY_DATABASE_URL)
 
 # database session
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# only with db_async, the sync engine is still used for the table setup, the feature matrix and background jobs
+async_engine = create_app_async_engine(SQLALCHEMY_DATABASE_URL) if settings_database.db_async else None
+# no expire on commit, the templates read the attributes after the session is gone and an async session can not lazy load
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 # get database generator
 def get_db():
@@ -19,3 +25,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
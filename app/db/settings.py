@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,6 +8,23 @@ ENV_PATH = Path(__file__).resolve().parent.parent.parent / ".env"
 
 class DatabaseSettings(BaseSettings):
     DATABASE_URL: str | None = None
+    # "auto" picks the profile from the url, "default" keeps the sqlalchemy defaults
+    db_profile: Literal["auto", "postgres", "sqlite", "default"] = "auto"
+    # serve the routers with AsyncSession on an async driver of the same database, aiosqlite or asyncpg
+    db_async: bool = False
+    # postgres, per worker process
+    db_pool_size: int = 10
+    db_max_overflow: int = 20  # extra connections under bursts, closed again when they are returned
+    db_pool_timeout_seconds: float = 10.0  # waiting for a free connection before the request fails
+    db_pool_recycle_seconds: int = 1800  # reconnect before proxies and load balancers drop idle connections
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 15000  # 0 disables
+    # sqlite, applied to every new connection
+    db_sqlite_journal_mode: str = "WAL"  # readers do not block the writer
+    db_sqlite_synchronous: str = "NORMAL"  # safe with wal, no fsync on every commit
+    db_sqlite_busy_timeout_ms: int = 5000  # wait for the write lock instead of failing with "database is locked"
+    db_sqlite_mmap_size: int = 268435456
+    db_sqlite_cache_size: int = -65536  # negative is in KiB, 64 MiB
 
     model_config = SettingsConfigDict(
         env_file=ENV_PATH,
@@ -20,6 +38,38 @@ settings_database = DatabaseSettings()
 
 class APISettings(BaseSettings):
     rapidapi_api_key: str | None = None
+    rapidapi_base_url: str = "https://mma-stats.p.rapidapi.com"
+    rapidapi_host: str = "mma-stats.p.rapidapi.com"
+    # one pooled client for the app, connections are kept alive between lookups
+    api_max_connections: int = 20
+    api_max_keepalive_connections: int = 10
+    api_keepalive_expiry_seconds: float = 30.0
+    api_http2: bool = True  # only used when the h2 package is installed
+    api_connect_timeout_seconds: float = 5.0
+    api_read_timeout_seconds: float = 10.0
+    api_pool_timeout_seconds: float = 5.0  # waiting for a free connection when all of them are busy
+    # looked up fighters, in memory and in a sqlite file shared by the workers. "" keeps the cache in memory only
+    api_cache_size: int = 1024
+    api_cache_ttl_seconds: float = 86400.0  # stats change after every fight
+    api_cache_negative_ttl_seconds: float = 600.0  # fighters the api does not know are asked again sooner
+    api_cache_failure_ttl_seconds: float = 30.0  # a failed lookup, shorter still. 0 asks the api again on every lookup
+    api_cache_path: str = "cache/api_cache.sqlite"
+    # local mirror of recorded responses, built with `python -m app.services.stats_mirror build`. "first" looks it up
+    # before the api, "only" never goes upstream (staging replays, boxes without egress), "off" ignores it
+    api_mirror_path: str = "cache/stats_mirror.jsonl"
+    api_mirror_mode: Literal["off", "first", "only"] = "first"
+    # a lookup gives up after the budget, retries included and waits on the backfill rate limit not. 5xx, 429 and transport errors are retried with jittered backoff
+    api_latency_budget_seconds: float = 5.0
+    api_retries: int = 2
+    api_retry_backoff_seconds: float = 0.2  # doubles on every retry, the sleep is a random fraction of it
+    api_retry_max_backoff_seconds: float = 2.0
+    # the breaker opens when this share of the calls in the window failed or ran slower than api_slow_call_seconds.
+    # while open lookups fail at once, after api_breaker_open_seconds one trial call decides if it closes again
+    api_breaker_failure_rate: float = 0.5
+    api_breaker_min_calls: int = 10  # calls in the window before the rate counts
+    api_breaker_window_seconds: float = 30.0
+    api_slow_call_seconds: float = 2.0
+    api_breaker_open_seconds: float = 30.0
 
     model_config = SettingsConfigDict(
         env_file=ENV_PATH,
@@ -29,3 +79,83 @@ class APISettings(BaseSettings):
 
 
 settings_api = APISettings()
+
+
+class BackfillSettings(BaseSettings):
+    # match the rapidapi plan, the limiter only counts upstream calls
+    backfill_rate_per_second: float = 2.0
+    backfill_burst: int = 5
+    backfill_workers: int = 4  # lookups in flight at once
+    backfill_batch_size: int = 50  # fighters per page and per upsert statement
+    backfill_stale_after_days: float | None = 30.0  # features older than this are refreshed too, None only fills missing ones
+    backfill_state_path: str = "cache/backfill_state.json"  # cursor of an unfinished run, the next run resumes from it
+
+    model_config = SettingsConfigDict(
+        env_file=ENV_PATH,
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+settings_backfill = BackfillSettings()
+
+
+class FeatureSettings(BaseSettings):
+    # predictions serve cached features of any age, stale ones are refreshed in the background
+    feature_stale_after_seconds: float = 604800.0  # a week
+    feature_fetch_budget_seconds: float = 1.5  # inline fetch of a fighter without features, then the request fails
+    # rows written by other processes (the backfill cli, sibling workers) are polled for, 0 turns it off
+    feature_sync_interval_seconds: float = 5.0
+
+    model_config = SettingsConfigDict(
+        env_file=ENV_PATH,
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+settings_features = FeatureSettings()
+
+
+class ImportSettings(BaseSettings):
+    import_batch_size: int = 1000  # rows per validation call, reference lookup and transaction
+    import_max_reported_errors: int = 100  # failed rows kept for the response, the cli error file has all of them
+
+    model_config = SettingsConfigDict(
+        env_file=ENV_PATH,
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+settings_import = ImportSettings()
+
+
+class PredictorSettings(BaseSettings):
+    # torchscript and numpy need `python -m app.services.model_export <backend>` first, quantized is built from the checkpoint at load.
+    # numpy runs the forward pass without importing torch
+    predictor_backend: Literal["eager", "torchscript", "quantized", "numpy"] = "eager"
+    predictor_registry_dir: str = "pytorch/models"  # versioned checkpoints, pytorch/predictor.pt is used while it is empty
+    predictor_model_version: str | None = None  # pin a registry version, None serves the latest
+    predictor_reload_interval_seconds: float = 0.0  # poll the registry and hot reload a new latest version, 0 disables
+    predictor_preload: bool = True  # load and warm up the model at startup instead of on the first request
+    predictor_warmup_batch_sizes: list[int] = [1, 32, 1024]
+    predictor_max_batch_size: int = 64  # rows merged into one forward pass
+    predictor_max_wait_ms: float = 2.0  # how long the first request waits for others
+    predictor_max_queue_size: int = 1024  # pending requests before rejecting with 503
+    predictor_max_pairs_per_pass: int = 65536  # bounds the memory of the division matrix forward passes
+    predictor_offload: bool = True  # run db and model work of the async prediction routes in the pools below
+    predictor_db_threads: int = 8
+    predictor_inference_threads: int = 1  # forward passes are already batched, more threads only contend
+    predictor_torch_threads: int | None = None  # torch intra-op threads, None keeps the torch default
+    prediction_cache_size: int = 4096  # cached matchups, 0 disables the cache
+    prediction_cache_ttl_seconds: float = 600.0
+
+    model_config = SettingsConfigDict(
+        env_file=ENV_PATH,
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+settings_predictor = PredictorSettings()
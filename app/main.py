@@ -1,18 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
+from sqlalchemy.exc import SQLAlchemyError
 from app.core.templates import templates
 from app.db.models import Base
-from app.db.session import engine
-from app.db.settings import settings_api
-from app.routes.cards import router as cards_router
-from app.routes.fighters import router as fighters_router
-from app.routes.fights import router as fights_router
+from app.db.session import SessionLocal, async_engine, engine
+from app.db.settings import settings_api, settings_database, settings_features, settings_predictor
+from app.routes.imports import router as imports_router
+from app.routes.models import router as models_router
+from app.routes.stats import router as stats_router
+from app.services.api_cache import api_cache
+from app.services.api_services import close_api_client, open_api_client
+from app.services.backfill import stop_backfill_task
+from app.services.batcher import prediction_batcher
+from app.services.executors import shutdown_executors
+from app.services.feature_refresh import stop_feature_refreshes, watch_feature_table
+from app.services.feature_store import feature_matrix
+from app.services.predictor import warm_up_model, watch_model_registry
+from app.services.stats_mirror import stats_mirror
 
+# the crud and listing routes on an async session, or the sync one run in the threadpool
+if settings_database.db_async:
+    from app.routes.cards_async import router as cards_router
+    from app.routes.fighters_async import router as fighters_router
+    from app.routes.fights_async import router as fights_router
+else:
+    from app.routes.cards import router as cards_router
+    from app.routes.fighters import router as fighters_router
+    from app.routes.fights import router as fights_router
 
 RAPIDAPI_API_KEY = settings_api.rapidapi_api_key
-if not RAPIDAPI_API_KEY:
+# an authoritative mirror never goes upstream
+if not RAPIDAPI_API_KEY and settings_api.api_mirror_mode != "only":
     raise RuntimeError("RAPIDAPI_API_KEY is not set")
 
 with engine.connect() as conn:
@@ -22,8 +44,44 @@ with engine.connect() as conn:
 Base.metadata.create_all(bind=engine)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        if not feature_matrix.loaded:  # already loaded when forked from app.serve
+            with SessionLocal() as db:
+                feature_matrix.load(db)  # preload so predictions never query fighter_features
+    except SQLAlchemyError as e:
+        print(f"could not preload feature matrix, loading on first prediction: {str(e)}")
+
+    if settings_predictor.predictor_preload:
+        try:
+            warm_up_model(settings_predictor.predictor_warmup_batch_sizes)
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            print(f"could not preload the model, loading on first prediction: {str(e)}")
+
+    open_api_client()  # one keep-alive client for the external api, every lookup reuses its connections
+
+    watchers = []
+    if settings_predictor.predictor_reload_interval_seconds > 0:
+        watchers.append(asyncio.create_task(watch_model_registry(settings_predictor.predictor_reload_interval_seconds)))
+    if settings_features.feature_sync_interval_seconds > 0:
+        watchers.append(asyncio.create_task(watch_feature_table(settings_features.feature_sync_interval_seconds)))
+    yield
+    for watcher in watchers:
+        watcher.cancel()
+    await stop_backfill_task()
+    await stop_feature_refreshes()
+    await prediction_batcher.stop()
+    await close_api_client()
+    api_cache.close()
+    stats_mirror.close()
+    shutdown_executors()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
 # server instances & html rendering
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +94,9 @@ app.add_middleware(
 app.include_router(fights_router)
 app.include_router(fighters_router)
 app.include_router(cards_router)
+app.include_router(stats_router)
+app.include_router(models_router)
+app.include_router(imports_router)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from app.core.templates import templates
 from app.db.session import get_db
-from app.schemas.cards import CardForm, Cards
+from app.schemas.cards import CardForm, Cards, CardsPage
 from app.services.cards import create_card_form_service, create_card_service, delete_card_service, get_all_cards_service, get_card_by_id_service
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.predictor import CardFightPrediction, predict_card
 
 router = APIRouter(prefix="/cards", tags=["Cards"])
 
@@ -14,14 +18,47 @@ card_form_dep = Depends(create_card_form_service)  # singleton
 
 
 @router.get("/", name="list_cards", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
-def get_all_cards(request: Request, db: Session = db_dependency):
+def get_all_cards(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    format: Literal["html", "json"] = "html",
+    db: Session = db_dependency,
+):
     try:
-        cards = get_all_cards_service(db)
-        return templates.TemplateResponse("cards/list.html", {"request": request, "cards": cards})
-
+        # the filter form sends "" for no filter
+        date_from_filter = date.fromisoformat(date_from) if date_from else None
+        date_to_filter = date.fromisoformat(date_to) if date_to else None
+        cards, next_cursor = get_all_cards_service(db, cursor, limit, date_from_filter, date_to_filter)
     except ValueError as e:
-        return templates.TemplateResponse("cards/not_found.html", {"request": request})
-        # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no cards found")
+        return cards_error_response(request, e, bool(cursor or date_from or date_to), format)
+    return cards_page_response(request, cards, next_cursor, bool(cursor), date_from_filter, date_to_filter, format)
+
+
+# shared with the async router
+def cards_error_response(request: Request, error: ValueError, filtered: bool, format: str):
+    if filtered:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    if format == "json":
+        return Response(CardsPage(items=[]).model_dump_json(), media_type="application/json")
+    return templates.TemplateResponse("cards/not_found.html", {"request": request})
+    # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no cards found")
+
+
+def cards_page_response(request: Request, cards: list, next_cursor: str | None, paged: bool, date_from: date | None, date_to: date | None, format: str):
+    if format == "json":
+        page = CardsPage(items=[Cards.model_validate(card) for card in cards], next_cursor=next_cursor)
+        return Response(page.model_dump_json(), media_type="application/json")
+
+    # htmx load more only asks for the rows of the next page
+    next_url = str(request.url.include_query_params(cursor=next_cursor)) if next_cursor else None
+    template = "cards/_rows.html" if paged and request.headers.get("HX-Request") else "cards/list.html"
+    return templates.TemplateResponse(
+        template,
+        {"request": request, "cards": cards, "next_url": next_url, "date_from": date_from, "date_to": date_to},
+    )
 
 
 @router.get("/{id}/details", name="get_card", response_model=Cards, status_code=status.HTTP_200_OK)
@@ -32,6 +69,30 @@ def get_card(request: Request, id: int, db: Session = db_dependency):
     return templates.TemplateResponse("cards/get.html", {"request": request, "card": card})
 
 
+# a card without fights has no predictions, an unknown card is a 404. only checked when nothing was found
+def card_predictions(id: int, db: Session) -> list[CardFightPrediction]:
+    predictions = predict_card(id, db)
+    if not predictions:
+        try:
+            get_card_by_id_service(id, db)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="card not found") from None
+    return predictions
+
+
+# every bout of the card in one query and one forward pass
+@router.get("/{id}/predictions", name="get_card_predictions", response_model=list[CardFightPrediction], status_code=status.HTTP_200_OK)
+def get_card_predictions(id: int, db: Session = db_dependency):
+    return card_predictions(id, db)
+
+
+# htmx fragment for the card page
+@router.post("/{id}/predict_html", name="predict_card_html", response_class=HTMLResponse)
+def predict_card_html(request: Request, id: int, db: Session = db_dependency):
+    predictions = card_predictions(id, db)
+    return templates.TemplateResponse(request, "cards/predictions.html", {"predictions": predictions})
+
+
 # create card form view
 @router.get("/create_card_view", name="create_card_form", response_class=HTMLResponse)
 def create_card_form(request: Request):
@@ -0,0 +1,89 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.templates import templates
+from app.db.session import get_async_db
+from app.routes import cards
+from app.routes.cards import cards_error_response, cards_page_response
+from app.schemas.cards import CardForm, Cards
+from app.services.cards import (
+    create_card_form_service,
+    create_card_service_async,
+    delete_card_service_async,
+    get_all_cards_service_async,
+    get_card_by_id_service_async,
+)
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# same paths and names as app.routes.cards, served with an async session when db_async is set
+router = APIRouter(prefix="/cards", tags=["Cards"])
+
+async_db_dependency = Depends(get_async_db)
+card_form_dep = Depends(create_card_form_service)
+
+
+@router.get("/", name="list_cards", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+async def get_all_cards(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    date_from: str | None = None,
+    date_to: str | None = None,
+    format: Literal["html", "json"] = "html",
+    db: AsyncSession = async_db_dependency,
+):
+    try:
+        date_from_filter = date.fromisoformat(date_from) if date_from else None
+        date_to_filter = date.fromisoformat(date_to) if date_to else None
+        cards, next_cursor = await get_all_cards_service_async(db, cursor, limit, date_from_filter, date_to_filter)
+    except ValueError as e:
+        return cards_error_response(request, e, bool(cursor or date_from or date_to), format)
+    return cards_page_response(request, cards, next_cursor, bool(cursor), date_from_filter, date_to_filter, format)
+
+
+@router.get("/{id}/details", name="get_card", response_model=Cards, status_code=status.HTTP_200_OK)
+async def get_card(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        card = await get_card_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="card not found") from None
+    return templates.TemplateResponse("cards/get.html", {"request": request, "card": card})
+
+
+@router.get("{id}/update", name="update_card_form", response_class=HTMLResponse)
+async def update_card_form(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        card = await get_card_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="card not found") from None
+    return templates.TemplateResponse("cards/update.html", {"request": request, "card": card})
+
+
+@router.post("/", name="create_card", response_class=HTMLResponse, status_code=status.HTTP_201_CREATED)
+async def create_card(request: Request, db: AsyncSession = async_db_dependency, form_data: CardForm = card_form_dep):
+    try:
+        await create_card_service_async(form_data, db)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from None
+    return RedirectResponse(url=request.url_for("list_cards"), status_code=status.HTTP_303_SEE_OTHER)
+
+
+@router.delete("/{id}", name="delete_card", status_code=status.HTTP_200_OK)
+async def remove_card(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        await delete_card_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="card not found") from None
+    response = Response(status_code=200)
+    response.headers["HX-Redirect"] = str(request.url_for("list_cards"))
+    return response
+
+
+# the card predictions run the model in the same call as their select, they keep the sync session in the threadpool.
+# the form view does not use a session
+SYNC_ROUTES = ("get_card_predictions", "predict_card_html", "create_card_form")
+router.routes.extend(route for route in cards.router.routes if route.name in SYNC_ROUTES)
@@ -1,6 +1,8 @@
+from typing import Literal
 from fastapi import (
     APIRouter,
     Depends,
+    Query,
     status,
     HTTPException,
     HTTPException,
@@ -11,7 +13,9 @@ from sqlalchemy.orm import Session
 from app.core.templates import templates
 
 from app.db.session import get_db
-from app.schemas.fighters import FighterForm, Fighters, FightersUpdate
+from app.schemas.fighters import DivisionEnum, FighterForm, Fighters, FightersPage, FightersUpdate
+from app.schemas.fights import Fights, FightsPage
+from app.services.backfill import backfill_progress, start_backfill_task
 from app.services.fighters import (
     create_fighter_form_service,
     create_fighter_service,
@@ -22,6 +26,8 @@ from app.services.fighters import (
     remove_fighter_service,
     update_fighter_service,
 )
+from app.services.fights import get_fighter_fights_service
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 
 router = APIRouter(prefix="/fighters", tags=["Fighters"])
@@ -37,14 +43,45 @@ fighter_form_dep = Depends(create_fighter_form_service)  # singleton
     response_class=HTMLResponse,
     status_code=status.HTTP_200_OK,
 )
-def get_all_fighters(request: Request, db: Session = db_dependency):
+def get_all_fighters(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    division: str | None = None,
+    sort: Literal["id", "name"] = "id",
+    format: Literal["html", "json"] = "html",
+    db: Session = db_dependency,
+):
     try:
-        fighters = get_all_fighters_service(db)
-        return templates.TemplateResponse("fighters/list.html", {"request": request, "fighters": fighters})
-
+        division_filter = DivisionEnum(division) if division else None  # the filter form sends "" for all
+        fighters, next_cursor = get_all_fighters_service(db, cursor, limit, division_filter, sort)
     except ValueError as e:
-        return templates.TemplateResponse("fighters/not_found.html", {"request": request})
-        # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no fighters found")
+        return fighters_error_response(request, e, bool(cursor or division), format)
+    return fighters_page_response(request, fighters, next_cursor, bool(cursor), division_filter, sort, format)
+
+
+# shared with the async router
+def fighters_error_response(request: Request, error: ValueError, filtered: bool, format: str):
+    if filtered:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    if format == "json":
+        return Response(FightersPage(items=[]).model_dump_json(), media_type="application/json")
+    return templates.TemplateResponse("fighters/not_found.html", {"request": request})
+    # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no fighters found")
+
+
+def fighters_page_response(request: Request, fighters: list, next_cursor: str | None, paged: bool, division: DivisionEnum | None, sort: str, format: str):
+    if format == "json":
+        page = FightersPage(items=[Fighters.model_validate(fighter) for fighter in fighters], next_cursor=next_cursor)
+        return Response(page.model_dump_json(), media_type="application/json")
+
+    # htmx load more only asks for the rows of the next page
+    next_url = str(request.url.include_query_params(cursor=next_cursor)) if next_cursor else None
+    template = "fighters/_rows.html" if paged and request.headers.get("HX-Request") else "fighters/list.html"
+    return templates.TemplateResponse(
+        template,
+        {"request": request, "fighters": fighters, "next_url": next_url, "divisions": list(DivisionEnum), "division": division, "sort": sort},
+    )
 
 
 @router.get("/{id}/details", name="get_fighter", response_model=Fighters, status_code=status.HTTP_200_OK)
@@ -55,6 +92,37 @@ def get_fighter(request: Request, id: int, db: Session = db_dependency):
     return templates.TemplateResponse("fighters/get.html", {"request": request, "fighter": fighter})
 
 
+# the fights of the fighter in either corner newest first. html is the table rows fragment the details page loads
+@router.get("/{id}/fights", name="fighter_fights", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+def get_fighter_fights(
+    request: Request,
+    id: int,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: Literal["html", "json"] = "html",
+    db: Session = db_dependency,
+):
+    try:
+        get_fighter_by_id_service(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fighter not found") from None
+    try:
+        fights, next_cursor = get_fighter_fights_service(id, db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from None
+    return fighter_fights_response(request, fights, next_cursor, format)
+
+
+# shared with the async router
+def fighter_fights_response(request: Request, fights: list, next_cursor: str | None, format: str):
+    if format == "json":
+        page = FightsPage(items=[Fights.model_validate(fight) for fight in fights], next_cursor=next_cursor)
+        return Response(page.model_dump_json(), media_type="application/json")
+
+    next_url = str(request.url.include_query_params(cursor=next_cursor)) if next_cursor else None
+    return templates.TemplateResponse("fights/_rows.html", {"request": request, "fights": fights, "next_url": next_url})
+
+
 # template form to create
 @router.get(
     "/create_fighter_view",
@@ -125,3 +193,16 @@ def remove_fighter(request: Request, id: int, db: Session = db_dependency):
 @router.post("/features")
 async def create_features_fighter(fighter: FighterForm, db: Session = db_dependency):
     return await create_fighter_with_features_service(fighter, db)
+
+
+# enrich every fighter with missing or stale features in the background, resumes an unfinished run unless restart
+@router.post("/features/backfill", name="start_features_backfill", status_code=status.HTTP_202_ACCEPTED)
+async def start_features_backfill(restart: bool = False):
+    if not start_backfill_task(restart):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="a backfill is already running")
+    return backfill_progress.to_dict()
+
+
+@router.get("/features/backfill", name="features_backfill_progress", status_code=status.HTTP_200_OK)
+def get_features_backfill():
+    return backfill_progress.to_dict()
@@ -0,0 +1,131 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.templates import templates
+from app.db.session import get_async_db
+from app.routes import fighters
+from app.routes.fighters import fighter_fights_response, fighters_error_response, fighters_page_response
+from app.schemas.fighters import DivisionEnum, FighterForm, Fighters, FightersUpdate
+from app.services.fighters import (
+    create_fighter_form_service,
+    create_fighter_service_async,
+    create_fighter_with_features_service_async,
+    get_all_fighters_service_async,
+    get_fighter_by_id_service_async,
+    get_fighter_update_form,
+    remove_fighter_service_async,
+    update_fighter_service_async,
+)
+from app.services.fights import get_fighter_fights_service_async
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# same paths and names as app.routes.fighters, served with an async session when db_async is set
+router = APIRouter(prefix="/fighters", tags=["Fighters"])
+
+async_db_dependency = Depends(get_async_db)
+fighter_form_dep = Depends(create_fighter_form_service)
+fighter_update_form_dep = Depends(get_fighter_update_form)
+
+
+@router.get("/", name="list_fighters", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+async def get_all_fighters(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    division: str | None = None,
+    sort: Literal["id", "name"] = "id",
+    format: Literal["html", "json"] = "html",
+    db: AsyncSession = async_db_dependency,
+):
+    try:
+        division_filter = DivisionEnum(division) if division else None
+        fighters, next_cursor = await get_all_fighters_service_async(db, cursor, limit, division_filter, sort)
+    except ValueError as e:
+        return fighters_error_response(request, e, bool(cursor or division), format)
+    return fighters_page_response(request, fighters, next_cursor, bool(cursor), division_filter, sort, format)
+
+
+@router.get("/{id}/details", name="get_fighter", response_model=Fighters, status_code=status.HTTP_200_OK)
+async def get_fighter(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        fighter = await get_fighter_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fighter not found") from None
+    return templates.TemplateResponse("fighters/get.html", {"request": request, "fighter": fighter})
+
+
+@router.get("/{id}/fights", name="fighter_fights", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+async def get_fighter_fights(
+    request: Request,
+    id: int,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: Literal["html", "json"] = "html",
+    db: AsyncSession = async_db_dependency,
+):
+    try:
+        await get_fighter_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fighter not found") from None
+    try:
+        fights, next_cursor = await get_fighter_fights_service_async(id, db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from None
+    return fighter_fights_response(request, fights, next_cursor, format)
+
+
+@router.get("{id}/update", name="update_fighter_form", response_class=HTMLResponse)
+async def update_fighter_form(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        fighter = await get_fighter_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fighter not found") from None
+    return templates.TemplateResponse("fighters/update.html", {"request": request, "fighter": fighter})
+
+
+@router.post("/", name="create_fighter", response_class=HTMLResponse, status_code=status.HTTP_201_CREATED)
+async def create_fighter(request: Request, db: AsyncSession = async_db_dependency, form_data: FighterForm = fighter_form_dep):
+    try:
+        await create_fighter_service_async(form_data, db)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from None
+    return RedirectResponse(url=request.url_for("list_fighters"), status_code=status.HTTP_303_SEE_OTHER)
+
+
+@router.post("/{id}/update", name="update_fighter", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+async def update_fighter(
+    request: Request,
+    id: int,
+    db: AsyncSession = async_db_dependency,
+    form_data: FightersUpdate = fighter_update_form_dep,
+):
+    try:
+        await update_fighter_service_async(id, form_data, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fighter not found") from None
+    return RedirectResponse(url=request.url_for("get_fighter", id=id), status_code=status.HTTP_303_SEE_OTHER)
+
+
+@router.delete("/{id}", name="delete_fighter", status_code=status.HTTP_200_OK)
+async def remove_fighter(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        await remove_fighter_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fighter not found") from None
+    response = Response(status_code=200)
+    response.headers["HX-Redirect"] = str(request.url_for("list_fighters"))
+    return response
+
+
+@router.post("/features")
+async def create_features_fighter(fighter: FighterForm, db: AsyncSession = async_db_dependency):
+    return await create_fighter_with_features_service_async(fighter, db)
+
+
+# the form view and the backfill routes do not use a session
+router.routes.extend(
+    route for route in fighters.router.routes if route.name in ("create_fighter_form", "start_features_backfill", "features_backfill_progress")
+)
@@ -1,13 +1,19 @@
-from typing import cast
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import json
+import struct
+from datetime import date
+from typing import Literal, cast
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from sqlalchemy.orm import Session
-import torch
 
 from app.db.models import FighterFeatures
 from app.db.session import get_db
-from app.schemas.fights import FightForm, Fights, FightsUpdate
+from app.schemas.fighters import DivisionEnum
+from app.schemas.fights import FightForm, Fights, FightsPage, FightsUpdate
 from app.core.templates import templates
+from app.services.batcher import prediction_batcher
+from app.services.executors import run_blocking
+from app.services.feature_refresh import ensure_fighter_features
 from app.services.fights import (
     create_fight_form_service,
     create_fight_service,
@@ -18,7 +24,19 @@ from app.services.fights import (
     remove_fight_service,
     update_fight_service,
 )
-from app.services.predictor import FightPredictionRequest, FightPredictionResponse, get_or_fetch_fighter_features, get_pytorch_model, prepare_model_input
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.prediction_cache import prediction_cache
+from app.services.predictor import (
+    DivisionMatrixResponse,
+    FightPredictionBatchRequest,
+    FightPredictionBatchResponse,
+    FightPredictionRequest,
+    FightPredictionResponse,
+    get_matchup_input,
+    predict_division_matrix,
+    predict_fights_batch,
+    prediction_cache_key,
+)
 
 router = APIRouter(prefix="/fights", tags=["Fights"])
 
@@ -27,14 +45,67 @@ fight_form_dep = Depends(create_fight_form_service)
 
 
 @router.get("/", name="list_fights", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
-def get_all_fights(request: Request, db: Session = db_dependency):
+def get_all_fights(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    division: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    sort: Literal["date", "id"] = "date",
+    format: Literal["html", "json"] = "html",
+    db: Session = db_dependency,
+):
     try:
-        fights = get_all_fights_service(db)
-        return templates.TemplateResponse("fights/list.html", {"request": request, "fights": fights})
+        # the filter form sends "" for no filter
+        division_filter = DivisionEnum(division) if division else None
+        date_from_filter = date.fromisoformat(date_from) if date_from else None
+        date_to_filter = date.fromisoformat(date_to) if date_to else None
+        fights, next_cursor = get_all_fights_service(db, cursor, limit, division_filter, date_from_filter, date_to_filter, sort)
+    except ValueError as e:
+        return fights_error_response(request, e, bool(cursor or division or date_from or date_to), format)
+    return fights_page_response(request, fights, next_cursor, bool(cursor), division_filter, date_from_filter, date_to_filter, format)
+
+
+# shared with the async router
+def fights_error_response(request: Request, error: ValueError, filtered: bool, format: str):
+    if filtered:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    if format == "json":
+        return Response(FightsPage(items=[]).model_dump_json(), media_type="application/json")
+    return templates.TemplateResponse("fights/not_found.html", {"request": request})
+    # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no fights found")
 
-    except ValueError:
-        return templates.TemplateResponse("fights/not_found.html", {"request": request})
-        # raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="no fights found")
+
+def fights_page_response(
+    request: Request,
+    fights: list,
+    next_cursor: str | None,
+    paged: bool,
+    division: DivisionEnum | None,
+    date_from: date | None,
+    date_to: date | None,
+    format: str,
+):
+    if format == "json":
+        page = FightsPage(items=[Fights.model_validate(fight) for fight in fights], next_cursor=next_cursor)
+        return Response(page.model_dump_json(), media_type="application/json")
+
+    # htmx load more only asks for the rows of the next page
+    next_url = str(request.url.include_query_params(cursor=next_cursor)) if next_cursor else None
+    template = "fights/_rows.html" if paged and request.headers.get("HX-Request") else "fights/list.html"
+    return templates.TemplateResponse(
+        template,
+        {
+            "request": request,
+            "fights": fights,
+            "next_url": next_url,
+            "divisions": list(DivisionEnum),
+            "division": division,
+            "date_from": date_from,
+            "date_to": date_to,
+        },
+    )
 
 
 @router.get("/{id}/details", name="get_fight", response_model=Fights, status_code=status.HTTP_200_OK)
@@ -119,16 +190,26 @@ def remove_fight(request: Request, id: int, db: Session = db_dependency):
 # pytorch model
 @router.post("/predict", response_model=FightPredictionResponse)
 async def predict_fight(payload: FightPredictionRequest, db: Session = db_dependency):
-    model = get_pytorch_model()
-    red_features = await get_or_fetch_fighter_features(payload.red_corner_id, db)
-    blue_features = await get_or_fetch_fighter_features(payload.blue_corner_id, db)
-    model_input = prepare_model_input(red_features, blue_features)
+    # never waits on the external api for fighters with cached features, stale ones are refreshed in the background
+    await ensure_fighter_features((payload.red_corner_id, payload.blue_corner_id), db)
 
-    with torch.no_grad():
-        output = model(model_input)
-        probability = torch.sigmoid(output)[0][0]
+    # a hit needs neither the db nor the model
+    cache_key = prediction_cache_key(payload.red_corner_id, payload.blue_corner_id)
+    red_prob = prediction_cache.get(cache_key) if cache_key else None
+
+    if red_prob is not None and cache_key:
+        model_version = cache_key[2]
+    else:
+        model_input, versions = await run_blocking("db", get_matchup_input, payload.red_corner_id, payload.blue_corner_id, db)
+        # concurrent requests share one forward pass
+        red_prob, model_version = await prediction_batcher.submit(model_input)
+
+        # the feature versions read with the rows and the model that scored them, a reload or a feature write since
+        # then never files this result under the newer versions
+        cache_key = prediction_cache_key(payload.red_corner_id, payload.blue_corner_id, model_version, versions)
+        if cache_key:
+            prediction_cache.put(cache_key, red_prob)
 
-    red_prob = float(probability.cpu())
     blue_prob = 1.0 - red_prob  # the probs are sigmoid, not softmax
 
     return FightPredictionResponse(
@@ -136,9 +217,39 @@ async def predict_fight(payload: FightPredictionRequest, db: Session = db_depend
         blue_corner_id=payload.blue_corner_id,
         red_corner_win_probability=red_prob,
         blue_corner_win_probability=blue_prob,
+        model_version=model_version,
     )
 
 
+# many matchups, one query and one forward pass. missing features are reported per pair
+@router.post("/predict_batch", response_model=FightPredictionBatchResponse)
+def predict_fights(payload: FightPredictionBatchRequest, db: Session = db_dependency):
+    return FightPredictionBatchResponse(predictions=predict_fights_batch(payload.matchups, db))
+
+
+# f16 body: a little endian uint32 length, a json preamble with the fighter ids and the shape, then the row-major float16
+# matrix. the ids of a large division do not fit in a header, the preamble is padded so the matrix starts 8 byte aligned
+def division_matrix_f16(fighter_ids: list[int], missing: list[int], probabilities) -> bytes:
+    preamble = json.dumps({"fighter_ids": fighter_ids, "shape": [len(fighter_ids), len(fighter_ids)], "missing_features": missing}).encode()
+    preamble += b" " * (-(4 + len(preamble)) % 8)
+    return struct.pack("<I", len(preamble)) + preamble + probabilities.astype("<f2").tobytes()
+
+
+# who beats whom in a division. f16 returns the float16 matrix for the front end
+@router.get("/predict/division/{division}", name="predict_division", response_model=DivisionMatrixResponse)
+def predict_division(division: DivisionEnum, format: Literal["json", "f16"] = "json", db: Session = db_dependency):
+    fighter_ids, fighter_names, probabilities, missing = predict_division_matrix(division, db)
+
+    if format == "f16":
+        return Response(content=division_matrix_f16(fighter_ids, missing, probabilities), media_type="application/octet-stream")
+
+    rows = probabilities.tolist()
+    for i in range(len(rows)):
+        rows[i][i] = None  # nan is not valid json
+
+    return DivisionMatrixResponse(division=division, fighter_ids=fighter_ids, fighter_names=fighter_names, probabilities=rows, missing_features=missing)
+
+
 @router.post("/predict_html", response_class=HTMLResponse)
 async def predict_fight_html(request: Request, db: Session = db_dependency):
     try:
@@ -0,0 +1,138 @@
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.templates import templates
+from app.db.models import FighterFeatures
+from app.db.session import get_async_db
+from app.routes import fights
+from app.routes.fights import fights_error_response, fights_page_response
+from app.schemas.fighters import DivisionEnum
+from app.schemas.fights import FightForm, Fights, FightsUpdate
+from app.services.fights import (
+    create_fight_form_service,
+    create_fight_service_async,
+    get_all_fights_service_async,
+    get_card_fighter_form_async,
+    get_fight_by_id_service_async,
+    get_fight_update_form,
+    remove_fight_service_async,
+    update_fight_service_async,
+)
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# same paths and names as app.routes.fights, served with an async session when db_async is set
+router = APIRouter(prefix="/fights", tags=["Fights"])
+
+async_db_dependency = Depends(get_async_db)
+fight_form_dep = Depends(create_fight_form_service)
+fight_update_form_dep = Depends(get_fight_update_form)
+
+
+@router.get("/", name="list_fights", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+async def get_all_fights(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    division: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    sort: Literal["date", "id"] = "date",
+    format: Literal["html", "json"] = "html",
+    db: AsyncSession = async_db_dependency,
+):
+    try:
+        division_filter = DivisionEnum(division) if division else None
+        date_from_filter = date.fromisoformat(date_from) if date_from else None
+        date_to_filter = date.fromisoformat(date_to) if date_to else None
+        fights, next_cursor = await get_all_fights_service_async(db, cursor, limit, division_filter, date_from_filter, date_to_filter, sort)
+    except ValueError as e:
+        return fights_error_response(request, e, bool(cursor or division or date_from or date_to), format)
+    return fights_page_response(request, fights, next_cursor, bool(cursor), division_filter, date_from_filter, date_to_filter, format)
+
+
+@router.get("/{id}/details", name="get_fight", response_model=Fights, status_code=status.HTTP_200_OK)
+async def get_fight(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        fight = await get_fight_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fight not found") from None
+    return templates.TemplateResponse("fights/get.html", {"request": request, "fight": fight})
+
+
+@router.get("/create_fight_view", name="create_fight_form", response_class=HTMLResponse)
+async def create_fight_form(request: Request, db: AsyncSession = async_db_dependency):
+    fighters, cards, message = await get_card_fighter_form_async(db)
+    return templates.TemplateResponse("fights/create.html", {"request": request, "fighters": fighters, "cards": cards, "message": message})
+
+
+@router.get("{id}/update", name="update_fight_form", response_class=HTMLResponse)
+async def update_fight_form(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        fight = await get_fight_by_id_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fight not found") from None
+    fighters, cards, _ = await get_card_fighter_form_async(db)
+    return templates.TemplateResponse("fights/update.html", {"request": request, "fight": fight, "fighters": fighters, "cards": cards})
+
+
+@router.post("/", name="create_fight", response_class=HTMLResponse, status_code=status.HTTP_201_CREATED)
+async def create_fight(request: Request, db: AsyncSession = async_db_dependency, form_data: FightForm = fight_form_dep):
+    try:
+        await create_fight_service_async(form_data, db)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from None
+    return RedirectResponse(url=request.url_for("list_fights"), status_code=status.HTTP_303_SEE_OTHER)
+
+
+@router.post("/{id}/update", name="update_fight", response_class=HTMLResponse, status_code=status.HTTP_200_OK)
+async def update_fight(
+    request: Request,
+    id: int,
+    db: AsyncSession = async_db_dependency,
+    form_data: FightsUpdate = fight_update_form_dep,
+):
+    try:
+        await update_fight_service_async(id, form_data, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fight not found") from None
+    return RedirectResponse(url=request.url_for("get_fight", id=id), status_code=status.HTTP_303_SEE_OTHER)
+
+
+@router.delete("/{id}", name="delete_fight", status_code=status.HTTP_200_OK)
+async def remove_fight(request: Request, id: int, db: AsyncSession = async_db_dependency):
+    try:
+        await remove_fight_service_async(id, db)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="fight not found") from None
+    response = Response(status_code=200)
+    response.headers["HX-Redirect"] = str(request.url_for("list_fights"))
+    return response
+
+
+# testing
+@router.post("/insert-features")
+async def insert_features(fighter_id: int, db: AsyncSession = async_db_dependency):
+    db.add(
+        FighterFeatures(
+            fighter_id=fighter_id,
+            avg_sig_str_landed=2.53,
+            avg_sig_str_pct=0.69,
+            avg_sub_att=0.00,
+            avg_td_landed=4.04,
+            avg_td_pct=0.59,
+            wins_by_ko=1,
+            wins_by_submission=6,
+        )
+    )
+    await db.commit()
+    return {"status": "good"}
+
+
+# the prediction routes already keep db and model work off the loop in the bounded pools. they read through the
+# process wide feature matrix, which holds a thread lock while it loads, so they keep the sync session
+SYNC_ROUTES = ("predict_fight", "predict_fights", "predict_division", "predict_fight_html")
+router.routes.extend(route for route in fights.router.routes if route.name in SYNC_ROUTES)
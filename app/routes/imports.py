@@ -0,0 +1,23 @@
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.services.bulk_import import ImportFormat, ImportKind, OnConflict, guess_format, import_stream
+from app.services.executors import run_blocking
+
+router = APIRouter(prefix="/import", tags=["Import"])
+db_dependency = Depends(get_db)
+
+
+# the upload is spooled to a temp file by starlette and read back in batches, never held whole
+@router.post("/{kind}", name="bulk_import", status_code=status.HTTP_200_OK)
+async def bulk_import(kind: ImportKind, file: UploadFile, format: ImportFormat | None = None, on_conflict: OnConflict = "update", db: Session = db_dependency):
+    format = format or guess_format(file.filename)
+    if format is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="unknown file format, send a .csv or .jsonl file or pass format")
+
+    # a session and a transaction per batch on the bind of the request session
+    report = await run_blocking("db", import_stream, kind, file.file, format, on_conflict, partial(Session, db.get_bind(), autoflush=False))
+    return report.to_dict()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.db.settings import settings_predictor
+from app.services import predictor
+from app.services.executors import run_blocking
+
+router = APIRouter(prefix="/models", tags=["Models"])
+
+
+@router.get("/", name="list_models", status_code=status.HTTP_200_OK)
+def list_models():
+    return {
+        "versions": predictor.registry.versions(),
+        "served": predictor.model_state.served.version if predictor.model_state.served is not None else None,
+        "pinned": settings_predictor.predictor_model_version,
+        "backend": settings_predictor.predictor_backend,
+    }
+
+
+# loads and warms the version in the background pool, predictions keep using the served model until the swap.
+# only reloads this worker, set predictor_reload_interval_seconds to have every worker follow the registry
+@router.post("/reload", name="reload_model", status_code=status.HTTP_200_OK)
+async def reload_model(version: str | None = None):
+    if version is not None and version not in predictor.registry.versions():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"model version {version} not found")
+    try:
+        served = await run_blocking("reload", predictor.reload_model, version)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from None
+    return {"served": served.version}
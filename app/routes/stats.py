@@ -0,0 +1,57 @@
+from fastapi import APIRouter, status
+
+from app.db.engine import pool_stats
+from app.db.session import async_engine, engine
+from app.services import api_services, feature_refresh
+from app.services.api_cache import api_cache
+from app.services.batcher import prediction_batcher
+from app.services.executors import executor_stats
+from app.services.feature_store import feature_matrix
+from app.services.prediction_cache import prediction_cache
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/batcher", name="batcher_stats", status_code=status.HTTP_200_OK)
+def get_batcher_stats():
+    return {
+        **prediction_batcher.stats.to_dict(),
+        "queue_depth": prediction_batcher.queue_depth(),
+        "max_queue_size": prediction_batcher.max_queue_size,
+        "configured_max_batch_size": prediction_batcher.max_batch_size,
+        "max_wait_ms": prediction_batcher.max_wait * 1000,
+        "executors": executor_stats(),
+    }
+
+
+@router.get("/features", name="feature_matrix_stats", status_code=status.HTTP_200_OK)
+def get_feature_matrix_stats():
+    return {**feature_matrix.stats(), "refresh": feature_refresh.stats()}
+
+
+@router.get("/predictions", name="prediction_cache_stats", status_code=status.HTTP_200_OK)
+def get_prediction_cache_stats():
+    return prediction_cache.stats()
+
+
+@router.get("/api_cache", name="api_cache_stats", status_code=status.HTTP_200_OK)
+def get_api_cache_stats():
+    return {
+        **api_cache.stats(),
+        "in_flight": len(api_services._in_flight),
+        "coalesced_lookups": api_services.api_client_state.coalesced_lookups,
+        "mirror": api_services.stats_mirror.stats(),
+    }
+
+
+@router.get("/api_breaker", name="api_breaker_stats", status_code=status.HTTP_200_OK)
+def get_api_breaker_stats():
+    return api_services.api_breaker.stats()
+
+
+@router.get("/db", name="db_pool_stats", status_code=status.HTTP_200_OK)
+def get_db_pool_stats():
+    stats = pool_stats(engine)
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.sync_engine)
+    return stats
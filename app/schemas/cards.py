@@ -102,3 +102,9 @@ class Cards(CardsBase):
         description="Set by the datebase (do not provide manually)",
         validate_default=True,
     )
+
+
+# one page of the listing
+class CardsPage(BaseModel):
+    items: list[Cards]
+    next_cursor: str | None = Field(None, description="cursor of the next page, None on the last page")
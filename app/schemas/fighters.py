@@ -62,6 +62,12 @@ class Fighters(FightersBase):
     updated_at: datetime | None = Field(None, description="When stats were updated")
 
 
+# one page of the listing
+class FightersPage(BaseModel):
+    items: list[Fighters]
+    next_cursor: str | None = Field(None, description="cursor of the next page, None on the last page")
+
+
 # post method
 class FighterForm(BaseModel):
     """schema for post request"""
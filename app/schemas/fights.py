@@ -41,6 +41,21 @@ class FightsCreate(FightsBase):
     pass
 
 
+# bulk import row. the card and the fighters come by name, they are resolved to ids once per batch
+class FightImportRow(BaseModel):
+    rounds: RoundsEnum
+    division: DivisionEnum
+    method: WinningMethodEnum | None = None
+    card: str = Field(..., description="Card name")
+    card_date: date | None = Field(None, description="Card date, tells apart cards of the same name")
+    red_corner: str = Field(..., description="Fighter name (red corner)")
+    blue_corner: str = Field(..., description="Fighter name (blue corner)")
+    favorite: str | None = Field(None, description="Fighter name of the favorite")
+    winner: str | None = Field(None, description="Fighter name of the winner")
+    round_finish: int | None = Field(None, gt=1, le=5)
+    fight_date: date
+
+
 # general model with full fields. also the returning model
 class Fights(FightsBase):
     model_config = ConfigDict(extra="ignore", from_attributes=True)
@@ -48,6 +63,12 @@ class Fights(FightsBase):
     created_at: datetime = Field(default_factory=datetime.now)
 
 
+# one page of the listing
+class FightsPage(BaseModel):
+    items: list[Fights]
+    next_cursor: str | None = Field(None, description="cursor of the next page, None on the last page")
+
+
 class FightsUpdate(BaseModel):
     """schema for put and patch request"""
 
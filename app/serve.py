@@ -0,0 +1,106 @@
+"""pre-fork launcher. the app, the model and the feature matrix are loaded once in this process, then the workers
+are forked from it and share those pages copy-on-write, instead of each worker importing torch and loading its own copy.
+
+    python -m app.serve --workers 4 --port 8000
+
+`uvicorn app.main:app --workers N` still works, its workers are spawned and load everything themselves.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.services.feature_store import feature_matrix
+from app.services.predictor import get_model
+
+
+def preload():
+    try:
+        with SessionLocal() as db:
+            feature_matrix.load(db)
+    except SQLAlchemyError as e:
+        print(f"could not preload feature matrix, every worker loads it on first prediction: {str(e)}")
+    try:
+        get_model()  # loaded, not warmed: torch starts its thread pools on the first forward pass, that happens after the fork
+    except (FileNotFoundError, RuntimeError, ValueError) as e:
+        print(f"could not preload the model, every worker loads it on first prediction: {str(e)}")
+
+    engine.dispose()  # pooled connections must not be shared across processes
+    gc.freeze()  # the collector writes to the objects it tracks, that would copy the shared pages into every worker
+
+
+def run_worker(sock: socket.socket, args: argparse.Namespace):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # uvicorn installs its own handlers for a graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def start_worker(sock: socket.socket, args: argparse.Namespace) -> int:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(sock, args)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="serve the app with workers forked from one preloaded process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # every worker accepts on the same listening socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    preload()
+    workers = {start_worker(sock, args) for _ in range(args.workers)}
+    print(f"started {len(workers)} workers on {args.host}:{args.port}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # a worker that dies is replaced by a fresh fork, it gets the preloaded state again
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            print(f"worker {pid} exited with {os.waitstatus_to_exitcode(status)}, starting a new one")
+            time.sleep(1)  # no tight restart loop when workers crash on startup
+            workers.add(start_worker(sock, args))
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.db.settings import settings_api
+from app.services.executors import run_blocking
+
+
+# external api responses by lookup key. a bounded lru with ttls in memory, backed by a local sqlite file so restarts
+# and sibling workers reuse earlier responses. None is cached as well (not found) with the shorter negative ttl.
+# failed lookups are kept apart, in memory only and for the shortest ttl, they are never mistaken for a not found
+class ApiResponseCache:
+    def __init__(self, max_size: int, ttl_seconds: float, negative_ttl_seconds: float, path: str | None = None, failure_ttl_seconds: float = 30.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.path = path or None  # None or "" keeps it in memory only
+        self.hits = 0
+        self.negative_hits = 0
+        self.failure_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()  # key -> (expires_at, value)
+        self._failures: OrderedDict[str, tuple[float, str]] = OrderedDict()  # key -> (expires_at, error)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()  # the memory lru and counters, never held while the file is read or written
+        self._db_lock = threading.Lock()
+
+    # opened on first use, so a pre-fork parent never shares the connection with its workers
+    def _db(self) -> sqlite3.Connection | None:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers in other workers do not block on a writer
+            conn.execute("CREATE TABLE IF NOT EXISTS api_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)")
+            conn.execute("DELETE FROM api_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> tuple[bool, dict | None]:
+        """(found, value). value is None for a cached not found"""
+        now = time.time()  # wall clock, the expiry is shared with other processes through the file
+        found, value = self._get_memory(key, now)
+        return (found, value) if found else self._get_file(key, now)
+
+    # on the event loop, the file waits up to the busy timeout on a writer in another worker and is read in the db pool
+    async def aget(self, key: str) -> tuple[bool, dict | None]:
+        now = time.time()
+        found, value = self._get_memory(key, now)
+        if found or self.path is None:
+            return (found, value) if found else self._get_file(key, now)
+        return await run_blocking("db", self._get_file, key, now)
+
+    def put(self, key: str, value: dict | None):
+        expires_at = self._put_memory(key, value)
+        self._put_file(key, value, expires_at)
+
+    async def aput(self, key: str, value: dict | None):
+        expires_at = self._put_memory(key, value)  # served from memory right away, the file follows
+        if self.path is not None:
+            await run_blocking("db", self._put_file, key, value, expires_at)
+
+    def put_failure(self, key: str, error: str):
+        if self.failure_ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._failures[key] = (time.time() + self.failure_ttl_seconds, error)
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.max_size:
+                self._failures.popitem(last=False)
+
+    def failure(self, key: str) -> str | None:
+        """the error of a recent failed lookup, None when there was none"""
+        with self._lock:
+            entry = self._failures.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._failures[key]
+                return None
+            self.failure_hits += 1
+            return entry[1]
+
+    def _get_memory(self, key: str, now: float) -> tuple[bool, dict | None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._count_hit(entry[1])
+                return True, entry[1]
+            self._entries.pop(key, None)
+            return False, None
+
+    def _get_file(self, key: str, now: float) -> tuple[bool, dict | None]:
+        with self._db_lock:
+            db = self._db()
+            row = db.execute("SELECT value, expires_at FROM api_cache WHERE key = ?", (key,)).fetchone() if db else None
+        with self._lock:
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return False, None
+
+            value = json.loads(row[0]) if row[0] is not None else None
+            self._remember(key, row[1], value)
+            self.disk_hits += 1
+            self._count_hit(value)
+            return True, value
+
+    def _put_memory(self, key: str, value: dict | None) -> float:
+        expires_at = time.time() + (self.ttl_seconds if value is not None else self.negative_ttl_seconds)
+        with self._lock:
+            self._remember(key, expires_at, value)
+        return expires_at
+
+    def _put_file(self, key: str, value: dict | None, expires_at: float):
+        with self._db_lock:
+            db = self._db()
+            if db:
+                db.execute(
+                    "INSERT OR REPLACE INTO api_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value) if value is not None else None, expires_at),
+                )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._failures.clear()
+        with self._db_lock:
+            db = self._db()
+            if db:
+                db.execute("DELETE FROM api_cache")
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, expires_at: float, value: dict | None):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _count_hit(self, value: dict | None):
+        self.hits += 1
+        if value is None:
+            self.negative_hits += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "negative_ttl_seconds": self.negative_ttl_seconds,
+                "failure_ttl_seconds": self.failure_ttl_seconds,
+                "failures": len(self._failures),
+                "path": self.path,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "failure_hits": self.failure_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+api_cache = ApiResponseCache(
+    max_size=settings_api.api_cache_size,
+    ttl_seconds=settings_api.api_cache_ttl_seconds,
+    negative_ttl_seconds=settings_api.api_cache_negative_ttl_seconds,
+    path=settings_api.api_cache_path,
+    failure_ttl_seconds=settings_api.api_cache_failure_ttl_seconds,
+)
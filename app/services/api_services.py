@@ -1,37 +1,196 @@
+import asyncio
+import importlib.util
+import random
+import time
+
 import httpx
 
 from app.db.settings import settings_api
+from app.services.api_cache import api_cache
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.rate_limit import TokenBucket
+from app.services.stats_mirror import normalize_name, stats_mirror
+
+
+# the client shared by every lookup, opened and closed by the app lifespan, and the lookup counters
+class ApiClientState:
+    def __init__(self):
+        self.client: httpx.AsyncClient | None = None
+        self.coalesced_lookups = 0
+
+
+api_client_state = ApiClientState()
+
+
+# the api could not be asked: the breaker is open, or the retries or the latency budget ran out.
+# says nothing about the fighter, unlike a None from the api
+class LookupFailedError(Exception):
+    pass
+
+
+# lookups being fetched right now by cache key, concurrent callers for the same fighter await the same one
+_in_flight: dict[str, asyncio.Task[dict | None]] = {}
+
+api_breaker = CircuitBreaker(
+    failure_rate=settings_api.api_breaker_failure_rate,
+    min_calls=settings_api.api_breaker_min_calls,
+    window_seconds=settings_api.api_breaker_window_seconds,
+    slow_call_seconds=settings_api.api_slow_call_seconds,
+    open_seconds=settings_api.api_breaker_open_seconds,
+)
 
-_fighter_cache: dict[str, dict] = {}
 
+# transport is for tests and benchmarks, e.g. httpx.MockTransport with a local stand-in for the api
+def create_api_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings_api.rapidapi_base_url,
+        headers={"x-rapidapi-key": settings_api.rapidapi_api_key or "", "x-rapidapi-host": settings_api.rapidapi_host},
+        limits=httpx.Limits(
+            max_connections=settings_api.api_max_connections,
+            max_keepalive_connections=settings_api.api_max_keepalive_connections,
+            keepalive_expiry=settings_api.api_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings_api.api_read_timeout_seconds,
+            connect=settings_api.api_connect_timeout_seconds,
+            pool=settings_api.api_pool_timeout_seconds,
+        ),
+        http2=settings_api.api_http2 and importlib.util.find_spec("h2") is not None,
+        transport=transport,
+    )
 
-async def get_external_fighter_features(name: str) -> dict | None:
-    # only get if it wasnt called before
-    if name in _fighter_cache:
-        return _fighter_cache[name]
+
+def open_api_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    if api_client_state.client is None:
+        api_client_state.client = create_api_client(transport)
+    return api_client_state.client
+
+
+async def close_api_client():
+    client, api_client_state.client = api_client_state.client, None
+    if client is not None:
+        await client.aclose()
+
+
+def fighter_cache_key(name: str) -> str:
+    return f"search:{normalize_name(name)}"
+
+
+# limiter is only spent on upstream calls, cached and coalesced lookups are free. a failed lookup returns None like a
+# fighter the api does not know, or raises LookupFailedError with raise_failures
+async def get_external_fighter_features(name: str, limiter: TokenBucket | None = None, raise_failures: bool = False) -> dict | None:
+    # only get if it wasnt called before, fighters the api does not know are cached too for a shorter time
+    key = fighter_cache_key(name)
+    found, cached = await api_cache.aget(key)
+    if cached is not None:
+        return cached
+
+    # the mirror is a local file, its hits are not copied into the cache. it is asked before a cached miss is
+    # trusted, a fighter added to the mirror since is found right away
+    if settings_api.api_mirror_mode != "off":
+        fighter = stats_mirror.get(name)
+        if fighter is not None or settings_api.api_mirror_mode == "only":
+            return fighter
+    if found:
+        return None
 
     api_key = settings_api.rapidapi_api_key
     if not api_key:
         return None
 
-    url = "https://mma-stats.p.rapidapi.com/search"
-    headers = {"x-rapidapi-key": api_key, "x-rapidapi-host": "mma-stats.p.rapidapi.com"}
+    # a lookup that failed moments ago fails again without going upstream, until the short failure ttl runs out
+    error = api_cache.failure(key)
+    if error is not None:
+        if raise_failures:
+            raise LookupFailedError(error)
+        return None
+
+    task = _in_flight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(_fetch_fighter(name, key, limiter))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        api_client_state.coalesced_lookups += 1
+    # shielded, a cancelled caller does not cancel the lookup the others are waiting for
+    try:
+        return await asyncio.shield(task)
+    except LookupFailedError:
+        if raise_failures:
+            raise
+        return None
+
 
+async def _fetch_fighter(name: str, key: str, limiter: TokenBucket | None) -> dict | None:
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        fighter = await _search(name, limiter)
+
+    # the breaker already fails these at once and lets a trial through when it half opens, not cached
+    except CircuitOpenError as e:
+        print(f"external api unavailable, skipped lookup of {name}")
+        raise LookupFailedError("external api unavailable") from e
+
+    # out of budget, still failing after the retries, or refused. nothing was learned about the fighter, it is
+    # cached as a failure and never as a not found
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        print(f"error fetching external data for {name}: {error}")
+        api_cache.put_failure(key, error)
+        raise LookupFailedError(error) from e
+
+    await api_cache.aput(key, fighter)  # None here is an answer of the api, no fighter by that name
+    return fighter
+
+
+# jittered exponential backoff, concurrent retries do not hit the api again at the same moment
+def retry_delay(attempt: int) -> float:
+    return random.uniform(0, min(settings_api.api_retry_max_backoff_seconds, settings_api.api_retry_backoff_seconds * 2**attempt))
+
+
+async def _search(name: str, limiter: TokenBucket | None) -> dict | None:
+    client = open_api_client()  # opened by the lifespan, lazily when used outside the app
+    loop = asyncio.get_running_loop()
+    # the latency budget covers the calls and the backoff, the time spent waiting on the limiter is given back
+    deadline = loop.time() + settings_api.api_latency_budget_seconds
+    error: Exception | None = None
+    for attempt in range(settings_api.api_retries + 1):
+        if attempt:
+            async with asyncio.timeout_at(deadline):
+                await asyncio.sleep(retry_delay(attempt - 1))
+        if limiter is not None:
+            waiting_since = loop.time()
+            await limiter.acquire()
+            deadline += loop.time() - waiting_since
+
+        # no await between allow and the try, a half open trial is always recorded and never left running
+        if not api_breaker.allow():
+            raise CircuitOpenError()
+        start = time.perf_counter()
+        ok = False
+        try:
             print(f"Fetching data for: {name}")
-            response = await client.get(url, headers=headers, params={"name": name})
+            async with asyncio.timeout_at(deadline):
+                response = await client.get("/search", params={"name": name})
             print(f"Status code: {response.status_code}")
+            if response.status_code >= 500 or response.status_code == 429:
+                error = httpx.HTTPStatusError(f"status code {response.status_code}", request=response.request, response=response)
+            else:
+                ok = True
+        except httpx.TransportError as e:  # timeouts included
+            error = e
+        finally:
+            # a call cut off by the latency budget is recorded as failed too
+            api_breaker.record(time.perf_counter() - start, ok)
+
+        if ok:
             print(f"Response: {response.text[:500]}")  # debug
+            # a bad or revoked key says nothing about the fighter, and a retry would be refused the same way
+            if response.status_code in (401, 403):
+                raise httpx.HTTPStatusError(f"status code {response.status_code}", request=response.request, response=response)
             if response.status_code != 200:
                 return None
-
             data = response.json()
-            fighter = data[0] if isinstance(data, list) and data else None  # [0] first appearance
-            if fighter:
-                _fighter_cache[name] = fighter
-            return fighter
+            return data[0] if isinstance(data, list) and data else None  # [0] first appearance
+        print(f"lookup of {name} failed, attempt {attempt + 1}: {str(error) or type(error).__name__}")
 
-    except Exception as e:
-        print(f"error fetching external data for {name}: {str(e)}")
-        return None
+    raise error
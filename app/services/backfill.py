@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import json
+import os
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.models import FighterFeatures, FightersDB
+from app.db.session import SessionLocal
+from app.db.settings import settings_backfill
+from app.services.api_services import LookupFailedError, get_external_fighter_features
+from app.services.executors import run_blocking
+from app.services.feature_store import FEATURE_ORDER, feature_matrix
+from app.services.map_features import map_api_to_features
+from app.services.rate_limit import TokenBucket
+
+
+class BackfillProgress:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.running = False
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.total = 0  # fighters left when the run started
+        self.processed = 0
+        self.enriched = 0
+        self.not_found = 0  # the api does not know the fighter
+        self.lookup_failed = 0  # the api could not be asked, the run stops before these fighters
+        self.failed = 0  # data that could not be mapped to features
+        self.batches = 0
+        self.last_id = 0
+        self.error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total": self.total,
+            "processed": self.processed,
+            "enriched": self.enriched,
+            "not_found": self.not_found,
+            "lookup_failed": self.lookup_failed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_id": self.last_id,
+            "error": self.error,
+        }
+
+
+# progress of the run started by the app, the cli prints its own
+backfill_progress = BackfillProgress()
+
+
+# the backfill running in the background of the app, one at a time
+class BackfillTaskState:
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+
+
+backfill_task_state = BackfillTaskState()
+
+
+# fighters without features, or with features older than cutoff, after the cursor
+def candidates(cutoff: datetime | None, after_id: int):
+    missing = FighterFeatures.fighter_id.is_(None)
+    return (
+        select(FightersDB.id, FightersDB.name)
+        .outerjoin(FighterFeatures, FighterFeatures.fighter_id == FightersDB.id)
+        .where(or_(missing, FighterFeatures.updated_at < cutoff) if cutoff else missing)
+        .where(FightersDB.id > after_id)
+    )
+
+
+def count_candidates(session_factory: Callable[[], Session], cutoff: datetime | None, after_id: int) -> int:
+    with session_factory() as db:
+        return db.execute(select(func.count()).select_from(candidates(cutoff, after_id).subquery())).scalar_one()
+
+
+# keyset page, the cursor is the last fighter id of the previous page
+def read_page(session_factory: Callable[[], Session], cutoff: datetime | None, after_id: int, size: int) -> list[tuple[int, str]]:
+    with session_factory() as db:
+        return [(row.id, row.name) for row in db.execute(candidates(cutoff, after_id).order_by(FightersDB.id).limit(size))]
+
+
+def upsert_features(session_factory: Callable[[], Session], rows: dict[int, dict]):
+    """one insert .. on conflict do update for the whole batch, instead of a select and commit per fighter"""
+    now = datetime.now()
+    with session_factory() as db:
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        # against the table, not the mapped class, so the feature matrix is not invalidated as a whole
+        stmt = insert(FighterFeatures.__table__).values([{"fighter_id": fighter_id, **features, "updated_at": now} for fighter_id, features in rows.items()])
+        stmt = stmt.on_conflict_do_update(index_elements=["fighter_id"], set_={column: stmt.excluded[column] for column in [*FEATURE_ORDER, "updated_at"]})
+        db.execute(stmt)
+        db.commit()
+
+    # the matrix of this process is updated here, the other workers find the rows on their next feature_matrix.sync
+    for fighter_id, features in rows.items():
+        feature_matrix.upsert(fighter_id, features, now)
+
+
+def load_state(path: str) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path: str, state: dict):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)  # a crash mid write never leaves a broken cursor
+
+
+def clear_state(path: str):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+async def run_backfill(
+    session_factory: Callable[[], Session] = SessionLocal,
+    progress: BackfillProgress | None = None,
+    restart: bool = False,
+    limit: int | None = None,
+) -> BackfillProgress:
+    """enrich fighters with missing or stale features. resumes from the cursor of an unfinished run unless restart"""
+    progress = progress or BackfillProgress()
+    state_path = settings_backfill.backfill_state_path
+    state = {} if restart else load_state(state_path)
+
+    # a resumed run keeps the cutoff it started with, fighters refreshed since are not picked up again
+    if "last_id" in state:
+        cutoff = datetime.fromisoformat(state["cutoff"]) if state["cutoff"] else None
+        after_id = state["last_id"]
+    else:
+        stale_days = settings_backfill.backfill_stale_after_days
+        cutoff = datetime.now() - timedelta(days=stale_days) if stale_days is not None else None
+        after_id = 0
+
+    limiter = TokenBucket(settings_backfill.backfill_rate_per_second, settings_backfill.backfill_burst)
+    semaphore = asyncio.Semaphore(settings_backfill.backfill_workers)
+
+    async def enrich(fighter_id: int, name: str) -> tuple[int, dict | None | LookupFailedError]:
+        async with semaphore:
+            try:
+                return fighter_id, await get_external_fighter_features(name, limiter, raise_failures=True)
+            except LookupFailedError as e:
+                return fighter_id, e
+
+    progress.reset()
+    progress.running = True
+    progress.started_at = datetime.now()
+    progress.last_id = after_id
+    try:
+        progress.total = await run_blocking("db", count_candidates, session_factory, cutoff, after_id)
+        print(f"backfill: {progress.total} fighters to enrich, starting after id {after_id}")
+
+        while limit is None or progress.processed < limit:
+            page = await run_blocking("db", read_page, session_factory, cutoff, after_id, settings_backfill.backfill_batch_size)
+            if not page:
+                clear_state(state_path)  # finished, the next run starts over
+                break
+
+            results = await asyncio.gather(*(enrich(fighter_id, name) for fighter_id, name in page))
+            # an outage is not a miss. the batch is kept up to the first failed lookup, the next run starts there
+            failed = [i for i, (_, api_data) in enumerate(results) if isinstance(api_data, LookupFailedError)]
+            first_failure = results[failed[0]] if failed else None
+            if failed:
+                results = results[: failed[0]]
+
+            rows: dict[int, dict] = {}
+            for fighter_id, api_data in results:
+                if not api_data:
+                    progress.not_found += 1
+                    continue
+                try:
+                    rows[fighter_id] = map_api_to_features(api_data)
+                except (AttributeError, TypeError, ValueError) as e:
+                    print(f"backfill: could not map features of fighter {fighter_id}: {str(e)}")
+                    progress.failed += 1
+
+            if rows:
+                await run_blocking("db", upsert_features, session_factory, rows)
+
+            # the cursor only moves once the batch is written, a crash redoes at most one batch
+            after_id = results[-1][0] if results else after_id
+            save_state(state_path, {"last_id": after_id, "cutoff": cutoff.isoformat() if cutoff else None})
+            progress.processed += len(results)
+            progress.enriched += len(rows)
+            progress.batches += 1
+            progress.last_id = after_id
+            print(
+                f"backfill: {progress.processed}/{progress.total} processed, {progress.enriched} enriched, {progress.not_found} not found, {progress.failed} failed"
+            )
+
+            if first_failure is not None:
+                progress.lookup_failed = len(failed)
+                progress.error = f"lookup of fighter {first_failure[0]} failed: {first_failure[1]}, stopped after id {after_id}"
+                print(f"backfill: {progress.error}, run it again once the api is back")
+                break
+
+    except Exception as e:
+        progress.error = str(e)
+        raise
+    finally:
+        progress.running = False
+        progress.finished_at = datetime.now()
+
+    return progress
+
+
+def start_backfill_task(restart: bool = False) -> bool:
+    """runs the backfill in the background of the app, False when one is already running"""
+    task = backfill_task_state.task
+    if task is not None and not task.done():
+        return False
+    task = backfill_task_state.task = asyncio.create_task(run_backfill(progress=backfill_progress, restart=restart))
+    task.add_done_callback(lambda task: task.cancelled() or task.exception())  # the error is kept in the progress
+    return True
+
+
+# cancelled on shutdown, the next run resumes after the last written batch
+async def stop_backfill_task():
+    task, backfill_task_state.task = backfill_task_state.task, None
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="enrich fighters with missing or stale features from the external api")
+    parser.add_argument("--restart", action="store_true", help="ignore the cursor of an unfinished run")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many fighters, the next run resumes")
+    args = parser.parse_args()
+
+    from app.services.api_services import close_api_client
+    from app.services.executors import shutdown_executors
+
+    async def run():
+        try:
+            await run_backfill(restart=args.restart, limit=args.limit)
+        finally:
+            await close_api_client()
+
+    asyncio.run(run())
+    shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
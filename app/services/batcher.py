@@ -0,0 +1,142 @@
+import asyncio
+from collections import Counter
+from collections.abc import Callable, Sequence
+
+import numpy as np
+from fastapi import HTTPException, status
+
+from app.db.settings import settings_predictor
+from app.services.executors import run_blocking
+from app.services.predictor import predict_win_probabilities_versioned
+
+
+class BatcherStats:
+    def __init__(self):
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.rejected = 0
+        self.batch_sizes: Counter[int] = Counter()  # achieved batch size -> times seen
+
+    def record(self, batch_size: int):
+        self.requests += batch_size
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.batch_sizes[batch_size] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+
+# merges concurrent [1, 14] requests into one forward pass.
+# a batch is flushed when it is full or when the first request waited max_wait_ms.
+# T is what predict returns per row, handed back to the caller of that row
+class PredictionBatcher[T]:
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], Sequence[T]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_size: int,
+    ):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.stats = BatcherStats()
+
+        self._queue: asyncio.Queue[tuple[np.ndarray, asyncio.Future[T]]] | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # the worker lives in the loop of the first caller, restarted if that loop is gone
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def submit(self, model_input: np.ndarray) -> T:
+        """the result of predict for a single [1, 14] input"""
+        queue = self._ensure_started()
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((model_input, future))
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="prediction queue is full") from None
+        return await future
+
+    async def stop(self):
+        if self._worker is not None and self._loop is asyncio.get_running_loop():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+        self._loop = None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _collect(self, queue: asyncio.Queue) -> list[tuple[np.ndarray, asyncio.Future[T]]]:
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # take everything already waiting before sleeping on the queue
+            while len(batch) < self.max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            if len(batch) >= self.max_batch_size:
+                break
+
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        queue = self._queue
+        assert queue is not None
+        while True:
+            batch = await self._collect(queue)
+            futures = [future for _, future in batch]
+            try:
+                # the forward pass runs in the inference pool, the loop keeps queueing the next batch
+                probabilities = await run_blocking("inference", self.predict, np.concatenate([model_input for model_input, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.stats.record(len(batch))
+
+            for future, result in zip(futures, probabilities, strict=True):
+                if not future.done():  # the caller may have been cancelled
+                    future.set_result(result)
+
+
+# (red corner win probability, model version)
+prediction_batcher: PredictionBatcher[tuple[float, str]] = PredictionBatcher(
+    predict_win_probabilities_versioned,
+    max_batch_size=settings_predictor.predictor_max_batch_size,
+    max_wait_ms=settings_predictor.predictor_max_wait_ms,
+    max_queue_size=settings_predictor.predictor_max_queue_size,
+)
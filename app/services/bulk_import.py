@@ -0,0 +1,344 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from datetime import date, datetime
+from itertools import batched
+from typing import IO, Literal
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import Table, bindparam, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.models import CardsDB, FightersDB, FightsDB
+from app.db.session import SessionLocal
+from app.db.settings import settings_import
+from app.schemas.cards import CardsBase
+from app.schemas.fighters import FightersBase
+from app.schemas.fights import FightImportRow
+
+ImportKind = Literal["fighters", "cards", "fights"]
+ImportFormat = Literal["csv", "jsonl"]
+OnConflict = Literal["update", "skip"]
+
+# a whole batch is validated in one call, a failed batch is split into its bad rows and the rest
+ROW_ADAPTERS: dict[str, TypeAdapter] = {
+    "fighters": TypeAdapter(list[FightersBase]),
+    "cards": TypeAdapter(list[CardsBase]),
+    "fights": TypeAdapter(list[FightImportRow]),
+}
+TABLES: dict[str, Table] = {"fighters": FightersDB.__table__, "cards": CardsDB.__table__, "fights": FightsDB.__table__}
+# what makes a row the same record. fighters and cards have a unique constraint on it, fights do not
+KEYS: dict[str, tuple[str, ...]] = {"fighters": ("name",), "cards": ("card_date",), "fights": ("fight_date", "red_corner", "blue_corner")}
+
+
+class ImportReport:
+    def __init__(self, kind: str, error_file: IO[str] | None = None):
+        self.kind = kind
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0  # already there with on_conflict skip, or repeated later in the same batch
+        self.failed = 0
+        self.batches = 0
+        self.errors: list[dict] = []  # the first failed rows, every one of them goes to the error file
+        self.started_at = datetime.now()
+        self.finished_at: datetime | None = None
+        self._error_file = error_file
+        self._start = time.perf_counter()
+
+    def error(self, line: int, message: str, row: dict | None = None):
+        self.failed += 1
+        error = {"line": line, "error": message, "row": row}
+        if len(self.errors) < settings_import.import_max_reported_errors:
+            self.errors.append(error)
+        if self._error_file is not None:
+            self._error_file.write(json.dumps(error, default=str) + "\n")
+
+    def rows_per_second(self) -> float:
+        return self.rows / max(time.perf_counter() - self._start, 1e-9)
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "rows_per_second": self.rows_per_second(),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "errors": self.errors,
+        }
+
+
+def guess_format(filename: str | None) -> ImportFormat | None:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+
+
+# (line, record, error) one at a time, the file is never read whole
+def read_rows(stream: IO[bytes], format: ImportFormat) -> Iterator[tuple[int, dict | None, str | None]]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")  # utf-8-sig drops the bom spreadsheets write
+    try:
+        if format == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                # empty cells are missing values, the schema defaults apply
+                yield reader.line_num, {key: value for key, value in row.items() if key and value not in ("", None)}, None
+            return
+
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"invalid json: {str(e)}"
+                continue
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, "not a json object"
+    finally:
+        text.detach()  # the caller owns the stream
+
+
+def validate_batch(kind: str, batch: list[tuple[int, dict]], report: ImportReport) -> list[tuple[int, BaseModel]]:
+    adapter = ROW_ADAPTERS[kind]
+    lines = [line for line, _ in batch]
+    records = [record for _, record in batch]
+    try:
+        return list(zip(lines, adapter.validate_python(records), strict=True))
+    except ValidationError as e:
+        failed: dict[int, list[str]] = {}
+        for error in e.errors(include_url=False):
+            index, *field = error["loc"]
+            failed.setdefault(int(index), []).append(f"{'.'.join(map(str, field))}: {error['msg']}" if field else error["msg"])
+        for index, messages in failed.items():
+            report.error(lines[index], "; ".join(messages), records[index])
+
+    valid = [i for i in range(len(batch)) if i not in failed]
+    return list(zip([lines[i] for i in valid], adapter.validate_python([records[i] for i in valid]), strict=True))
+
+
+# fighter and card names to ids with one select each for the whole batch
+# card names repeat. the card is the one of that name on the card date of the row, or else on the fight date,
+# a name used by a single card needs no date
+def find_card(cards: dict[str, dict[date, int]], name: str, card_date: date | None, fight_date: date) -> tuple[int | None, str | None]:
+    by_date = cards.get(name)
+    if not by_date:
+        return None, f"unknown card {name!r}"
+    if card_date is not None:
+        return (by_date[card_date], None) if card_date in by_date else (None, f"no card {name!r} on {card_date}")
+    if fight_date in by_date:
+        return by_date[fight_date], None
+    if len(by_date) == 1:
+        return next(iter(by_date.values())), None
+    return None, f"ambiguous card {name!r}, {len(by_date)} cards share the name and none is on {fight_date}"
+
+
+def resolve_fight_references(db: Session, rows: list[tuple[int, BaseModel]], report: ImportReport) -> list[tuple[int, dict]]:
+    fighter_names = {name for _, row in rows for name in (row.red_corner, row.blue_corner, row.favorite, row.winner) if name}
+    card_names = {row.card for _, row in rows}
+    fighters = dict(db.execute(select(FightersDB.name, FightersDB.id).where(FightersDB.name.in_(fighter_names))).tuples().all()) if fighter_names else {}
+    cards: dict[str, dict[date, int]] = {}  # card_name -> card_date -> id
+    for card_name, card_date, card_id in db.execute(select(CardsDB.card_name, CardsDB.card_date, CardsDB.id).where(CardsDB.card_name.in_(card_names))):
+        cards.setdefault(card_name, {})[card_date] = card_id
+
+    resolved = []
+    for line, row in rows:
+        values = row.model_dump()
+        card_date = values.pop("card_date")
+        missing = [
+            f"unknown fighter {values[field]!r}"
+            for field in ("red_corner", "blue_corner", "favorite", "winner")
+            if values[field] and values[field] not in fighters
+        ]
+        card_id, card_error = find_card(cards, row.card, card_date, row.fight_date)
+        if card_error:
+            missing.append(card_error)
+        if missing:
+            report.error(line, "; ".join(missing), values)
+            continue
+        for field in ("red_corner", "blue_corner", "favorite", "winner"):
+            values[field] = fighters[values[field]] if values[field] else None
+        values["card"] = card_id
+        resolved.append((line, values))
+    return resolved
+
+
+def key_of(kind: str, values: dict) -> tuple:
+    return tuple(values[column] for column in KEYS[kind])
+
+
+def existing_ids(db: Session, kind: str, keys: list[tuple]) -> dict[tuple, int]:
+    table = TABLES[kind]
+    columns = [table.c[column] for column in KEYS[kind]]
+    if len(columns) == 1:
+        stmt = select(table.c.id, columns[0]).where(columns[0].in_([key[0] for key in keys]))
+    else:
+        stmt = select(table.c.id, *columns).where(tuple_(*columns).in_(keys))
+    return {tuple(row[1:]): row[0] for row in db.execute(stmt)}
+
+
+def write_rows(db: Session, kind: str, rows: list[tuple[int, dict]], on_conflict: OnConflict) -> tuple[int, int, int]:
+    """one executemany per statement for the batch. returns inserted, updated and skipped rows"""
+    table = TABLES[kind]
+    by_key = {key_of(kind, values): values for _, values in rows}  # a record repeated in the batch, the last one wins
+    skipped = len(rows) - len(by_key)
+    existing = existing_ids(db, kind, list(by_key))
+    new = [values for key, values in by_key.items() if key not in existing]
+    old = [values for key, values in by_key.items() if key in existing]
+    if on_conflict == "skip":
+        skipped += len(old)
+        old = []
+
+    if kind == "fights":
+        # no unique constraint to conflict on, existing fights are updated by id
+        if new:
+            db.execute(insert(table), new)
+        if old:
+            stmt = update(table).where(table.c.id == bindparam("_id")).values({column: bindparam(column) for column in old[0]})
+            db.execute(stmt, [{**values, "_id": existing[key_of(kind, values)]} for values in old])
+        return len(new), len(old), skipped
+
+    # insert .. on conflict on the unique key, a row written by someone else since the lookup is not an error
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(table)
+    if on_conflict == "skip":
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(KEYS[kind]))
+    else:
+        updated_columns = {column: stmt.excluded[column] for column in (new + old + [{}])[0] if column not in KEYS[kind]}
+        if kind == "fighters":
+            updated_columns["updated_at"] = datetime.now()
+        stmt = stmt.on_conflict_do_update(index_elements=list(KEYS[kind]), set_=updated_columns)
+    if new or old:
+        db.execute(stmt, new + old)
+    return len(new), len(old), skipped
+
+
+# one transaction per batch. when the database refuses the batch, the rows are retried one by one to report the bad ones
+def import_batch(session_factory: Callable[[], Session], kind: str, rows: list[tuple[int, BaseModel]], on_conflict: OnConflict, report: ImportReport):
+    with session_factory() as db:
+        if kind == "fights":
+            values = resolve_fight_references(db, rows, report)
+        else:
+            values = [(line, row.model_dump()) for line, row in rows]
+        if not values:
+            return
+
+        try:
+            counts = write_rows(db, kind, values, on_conflict)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            counts = (0, 0, 0)
+            for line, row in values:
+                try:
+                    counts = tuple(a + b for a, b in zip(counts, write_rows(db, kind, [(line, row)], on_conflict), strict=True))
+                    db.commit()
+                except IntegrityError as e:
+                    db.rollback()
+                    report.error(line, str(e.orig), row)
+
+    report.inserted += counts[0]
+    report.updated += counts[1]
+    report.skipped += counts[2]
+
+
+def import_rows(
+    kind: ImportKind,
+    records: Iterable[tuple[int, dict | None, str | None]],
+    on_conflict: OnConflict = "update",
+    session_factory: Callable[[], Session] = SessionLocal,
+    batch_size: int | None = None,
+    error_file: IO[str] | None = None,
+    on_batch: Callable[[ImportReport], None] | None = None,
+) -> ImportReport:
+    """validate and write the records batch by batch, memory stays at one batch whatever the size of the input"""
+    report = ImportReport(kind, error_file)
+    for batch in batched(records, batch_size or settings_import.import_batch_size, strict=False):
+        report.rows += len(batch)
+        parsed = []
+        for line, record, error in batch:
+            if error is not None:
+                report.error(line, error)
+            else:
+                parsed.append((line, record))
+
+        valid = validate_batch(kind, parsed, report) if parsed else []
+        if valid:
+            import_batch(session_factory, kind, valid, on_conflict, report)
+        report.batches += 1
+        if on_batch is not None:
+            on_batch(report)
+
+    report.finished_at = datetime.now()
+    return report
+
+
+def import_stream(
+    kind: ImportKind,
+    stream: IO[bytes],
+    format: ImportFormat,
+    on_conflict: OnConflict = "update",
+    session_factory: Callable[[], Session] = SessionLocal,
+    **kwargs,
+) -> ImportReport:
+    return import_rows(kind, read_rows(stream, format), on_conflict, session_factory, **kwargs)
+
+
+def print_progress(report: ImportReport):
+    print(
+        f"import {report.kind}: {report.rows} rows, {report.inserted} inserted, {report.updated} updated, "
+        f"{report.skipped} skipped, {report.failed} failed, {report.rows_per_second():.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="bulk import fighters, cards or fights from csv or jsonl. import fighters and cards before the fights that name them"
+    )
+    parser.add_argument("kind", choices=["fighters", "cards", "fights"])
+    parser.add_argument("path", help="csv or jsonl file, - reads stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None, help="taken from the file extension by default")
+    parser.add_argument("--on-conflict", choices=["update", "skip"], default="update", help="what to do with records that are already there")
+    parser.add_argument("--batch-size", type=int, default=settings_import.import_batch_size)
+    parser.add_argument("--errors", default=None, help="write every failed row to this jsonl file")
+    args = parser.parse_args(argv)
+
+    format = args.format or guess_format(args.path)
+    if format is None:
+        parser.error("can not tell the format from the file name, pass --format")
+
+    error_file = open(args.errors, "w", encoding="utf-8") if args.errors else None
+    try:
+        if args.path == "-":
+            report = import_stream(
+                args.kind, sys.stdin.buffer, format, args.on_conflict, batch_size=args.batch_size, error_file=error_file, on_batch=print_progress
+            )
+        else:
+            with open(args.path, "rb") as f:
+                report = import_stream(args.kind, f, format, args.on_conflict, batch_size=args.batch_size, error_file=error_file, on_batch=print_progress)
+    finally:
+        if error_file is not None:
+            error_file.close()
+
+    for error in report.errors[:20]:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    if report.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
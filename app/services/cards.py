@@ -1,9 +1,14 @@
+from datetime import date
+
 from fastapi import Depends, Form
+from sqlalchemy import Select, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.db.models import CardsDB
 from app.db.session import get_db
 from app.schemas.cards import CardForm, CardsBase
+from app.services.pagination import DEFAULT_PAGE_SIZE, keyset_page, keyset_page_async
 
 
 db_dependency = Depends(get_db)
@@ -22,11 +27,30 @@ def create_card_form_service(
     )
 
 
-def get_all_cards_service(db: Session = db_dependency):
-    cards = db.query(CardsDB).all()
-    if not cards:
+# newest first, one page after the cursor and the cursor of the next one
+def get_all_cards_service(
+    db: Session = db_dependency,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> tuple[list[CardsDB], str | None]:
+    cards, next_cursor = keyset_page(db, cards_stmt(date_from, date_to), CARD_SORT, cursor, limit, descending=True)
+    if not cards and not cursor and not date_from and not date_to:  # a filter without matches is an empty page
         raise ValueError("no cards found")
-    return cards
+    return cards, next_cursor
+
+
+CARD_SORT = (CardsDB.card_date, CardsDB.id)
+
+
+def cards_stmt(date_from: date | None, date_to: date | None) -> Select[tuple[CardsDB]]:
+    stmt = select(CardsDB)
+    if date_from:
+        stmt = stmt.where(CardsDB.card_date >= date_from)
+    if date_to:
+        stmt = stmt.where(CardsDB.card_date <= date_to)
+    return stmt
 
 
 def get_card_by_id_service(id: int, db: Session = db_dependency):
@@ -55,3 +79,43 @@ def delete_card_service(id: int, db: Session = db_dependency):
         raise ValueError("card not found")
     db.commit()
     return None
+
+
+# async session variants, same rules and errors as the sync services above
+async def get_all_cards_service_async(
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> tuple[list[CardsDB], str | None]:
+    cards, next_cursor = await keyset_page_async(db, cards_stmt(date_from, date_to), CARD_SORT, cursor, limit, descending=True)
+    if not cards and not cursor and not date_from and not date_to:
+        raise ValueError("no cards found")
+    return cards, next_cursor
+
+
+async def get_card_by_id_service_async(id: int, db: AsyncSession) -> CardsDB:
+    card = await db.get(CardsDB, id)
+    if not card:
+        raise ValueError(f"card with id {id} not found")
+    return card
+
+
+async def create_card_service_async(card_form: CardForm, db: AsyncSession) -> CardsDB:
+    card_data = card_form.to_cards_base_data()
+    if not card_data:
+        raise ValueError("error parsing the card data")
+
+    new_card = CardsDB(**CardsBase(**card_data).model_dump())
+    db.add(new_card)
+    await db.commit()
+    await db.refresh(new_card)
+    return new_card
+
+
+async def delete_card_service_async(id: int, db: AsyncSession):
+    result = await db.execute(delete(CardsDB).where(CardsDB.id == id))
+    if not result.rowcount:
+        raise ValueError("card not found")
+    await db.commit()
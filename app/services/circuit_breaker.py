@@ -0,0 +1,102 @@
+import time
+from collections import deque
+from typing import Literal
+
+from app.core.metrics import LatencyHistogram
+
+State = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# failure rate over a sliding time window. a slow call counts as failed, it ties up a connection and a request
+# just as much. the breaker is only used from the event loop, no lock
+class CircuitBreaker:
+    def __init__(self, failure_rate: float, min_calls: int, window_seconds: float, slow_call_seconds: float, open_seconds: float):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.latency = LatencyHistogram()
+        self.trips = 0
+        self.short_circuited = 0
+        self.failures = 0
+        self.slow_calls = 0
+
+        self._state: State = "closed"
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._calls: deque[tuple[float, bool]] = deque()  # (finished at, failed)
+        self._failed_in_window = 0
+
+    @property
+    def state(self) -> State:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+            return "half_open"
+        return self._state
+
+    def allow(self) -> bool:
+        """False while open. once the cool-down is over one trial call at a time goes through"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._state = "half_open"
+            self._trial_running = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record(self, seconds: float, ok: bool):
+        now = time.monotonic()
+        slow = seconds >= self.slow_call_seconds
+        failed = not ok or slow
+        self.latency.observe(seconds)
+        self.failures += not ok
+        self.slow_calls += slow
+
+        if self._state == "half_open":
+            self._trial_running = False
+            if failed:
+                self._trip(now)
+            else:
+                self._state = "closed"
+                self._calls.clear()
+                self._failed_in_window = 0
+            return
+        if self._state == "open":  # started before the breaker opened
+            return
+
+        self._calls.append((now, failed))
+        self._failed_in_window += failed
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._failed_in_window -= self._calls.popleft()[1]
+
+        if len(self._calls) >= self.min_calls and self._failed_in_window / len(self._calls) >= self.failure_rate:
+            self._trip(now)
+
+    def _trip(self, now: float):
+        self._state = "open"
+        self._opened_at = now
+        self.trips += 1
+        self._calls.clear()
+        self._failed_in_window = 0
+        print(f"circuit breaker open for {self.open_seconds}s")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+            "calls_in_window": len(self._calls),
+            "failed_in_window": self._failed_in_window,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "failure_rate": self.failure_rate,
+            "slow_call_seconds": self.slow_call_seconds,
+            "open_seconds": self.open_seconds,
+            "latency": self.latency.to_dict(),
+        }
@@ -0,0 +1,39 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.db.settings import settings_predictor
+
+# bounded pools so blocking work of the async prediction routes never runs on the event loop.
+# created lazily, the app lifespan shuts them down
+_executors: dict[str, ThreadPoolExecutor] = {}
+_sizes = {
+    "db": settings_predictor.predictor_db_threads,
+    "inference": settings_predictor.predictor_inference_threads,
+    "reload": 1,  # model loads and warm ups, never in the inference pool so serving is not blocked
+}
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    executor = _executors.get(name)
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=_sizes[name], thread_name_prefix=f"predict-{name}")
+        _executors[name] = executor
+    return executor
+
+
+async def run_blocking[T](name: str, fn: Callable[..., T], *args) -> T:
+    if not settings_predictor.predictor_offload:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(name), partial(fn, *args))
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
+
+
+def executor_stats() -> dict:
+    return {name: {"max_workers": size, "started": name in _executors} for name, size in _sizes.items()}
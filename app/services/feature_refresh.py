@@ -0,0 +1,147 @@
+import asyncio
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from functools import partial
+
+from fastapi import HTTPException
+from sqlalchemy import Connection, Engine, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.db.models import FightersDB
+from app.db.session import SessionLocal
+from app.db.settings import settings_features
+from app.services import api_services
+from app.services.api_services import get_external_fighter_features
+from app.services.backfill import upsert_features
+from app.services.executors import run_blocking
+from app.services.feature_store import feature_matrix
+from app.services.map_features import map_api_to_features
+
+# refreshes running right now by fighter, a fighter is fetched once however many requests ask for it
+_refreshing: dict[int, asyncio.Task[bool]] = {}
+
+
+class RefreshCounters:
+    def __init__(self):
+        self.scheduled_refreshes = 0
+        self.inline_fetches = 0
+        self.inline_timeouts = 0
+
+
+refresh_counters = RefreshCounters()
+
+
+def stale_cutoff() -> datetime:
+    return datetime.now() - timedelta(seconds=settings_features.feature_stale_after_seconds)
+
+
+async def refresh_fighter_features(fighter_id: int, name: str, bind: Engine | Connection) -> bool:
+    """fetch the fighter from the external api and store the features, False when the api has nothing"""
+    api_data = await get_external_fighter_features(name)
+    if not api_data:
+        return False
+    features = map_api_to_features(api_data)
+    # a session of its own, the request that scheduled it may be gone by now
+    await run_blocking("db", upsert_features, partial(Session, bind), {fighter_id: features})
+    return True
+
+
+def _refresh_task(fighter_id: int, name: str, bind: Engine | Connection) -> asyncio.Task[bool]:
+    task = _refreshing.get(fighter_id)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(refresh_fighter_features(fighter_id, name, bind))
+        _refreshing[fighter_id] = task
+        task.add_done_callback(partial(_refresh_done, fighter_id))
+    return task
+
+
+def _refresh_done(fighter_id: int, task: asyncio.Task[bool]):
+    _refreshing.pop(fighter_id, None)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"could not refresh features of fighter {fighter_id}: {str(task.exception())}")
+
+
+def _fighter_names(fighter_ids: list[int], db: Session) -> dict[int, str]:
+    return {row.id: row.name for row in db.execute(select(FightersDB.id, FightersDB.name).where(FightersDB.id.in_(fighter_ids)))}
+
+
+async def ensure_fighter_features(fighter_ids: Iterable[int], db: Session):
+    """stale-while-revalidate. cached features of any age are served as they are, stale ones are refreshed in the
+    background. fighters without features are fetched inline within the latency budget, then the request fails fast"""
+    ids = list(dict.fromkeys(fighter_ids))
+
+    # the usual case, every fighter is in the matrix and nothing here touches the db
+    missing = feature_matrix.missing(ids)
+    if missing:
+        rows = await run_blocking("db", feature_matrix.rows_for, missing, db)
+        missing = [fighter_id for fighter_id in missing if fighter_id not in rows]
+
+    stale = feature_matrix.stale(ids, stale_cutoff())
+    if not stale and not missing:
+        return
+
+    names = await run_blocking("db", _fighter_names, stale + missing, db)
+    for fighter_id in missing:
+        if fighter_id not in names:
+            raise HTTPException(status_code=404, detail=f"fighter {fighter_id} not found")
+
+    bind = db.get_bind()
+    for fighter_id in stale:
+        if fighter_id not in _refreshing:
+            refresh_counters.scheduled_refreshes += 1
+        _refresh_task(fighter_id, names[fighter_id], bind)
+
+    if not missing:
+        return
+
+    refresh_counters.inline_fetches += len(missing)
+    tasks = [_refresh_task(fighter_id, names[fighter_id], bind) for fighter_id in missing]
+    # shielded, a fetch that runs over the budget still finishes and stores the features for the next request
+    await asyncio.wait([asyncio.shield(task) for task in tasks], timeout=settings_features.feature_fetch_budget_seconds)
+    for fighter_id, task in zip(missing, tasks, strict=True):
+        if not task.done():
+            refresh_counters.inline_timeouts += 1
+            raise HTTPException(status_code=504, detail=f"features of fighter {fighter_id} are still being fetched, try again")
+        if task.cancelled() or task.exception() is not None or not task.result():
+            if api_services.api_breaker.state != "closed":
+                raise HTTPException(status_code=503, detail="external api unavailable, try again later")
+            raise HTTPException(status_code=400, detail=f"fighter {fighter_id} has no features")
+
+
+def sync_feature_matrix() -> int:
+    with SessionLocal() as db:
+        return feature_matrix.sync(db)
+
+
+# backfills from the cli or another worker write with core statements this process never sees, each worker polls
+# fighter_features for them. the changed fighters get new versions, their cached predictions are dropped
+async def watch_feature_table(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            changed = await run_blocking("db", sync_feature_matrix)
+        except SQLAlchemyError as e:
+            print(f"could not sync the feature matrix: {str(e)}")
+            continue
+        if changed:
+            print(f"feature matrix: {changed} fighters changed by other processes")
+
+
+# cancelled on shutdown, a stale fighter is scheduled again by the next request that needs it
+async def stop_feature_refreshes():
+    tasks = list(_refreshing.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def stats() -> dict:
+    return {
+        "stale_after_seconds": settings_features.feature_stale_after_seconds,
+        "fetch_budget_seconds": settings_features.feature_fetch_budget_seconds,
+        "refreshing": len(_refreshing),
+        "scheduled_refreshes": refresh_counters.scheduled_refreshes,
+        "inline_fetches": refresh_counters.inline_fetches,
+        "inline_timeouts": refresh_counters.inline_timeouts,
+    }
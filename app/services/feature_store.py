@@ -0,0 +1,257 @@
+import threading
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.db.models import FighterFeatures
+
+# same order used when training, red corner first
+FEATURE_ORDER = [
+    "avg_sig_str_landed",
+    "avg_sig_str_pct",
+    "avg_sub_att",
+    "avg_td_landed",
+    "avg_td_pct",
+    "wins_by_ko",
+    "wins_by_submission",
+]
+
+_PENDING_KEY = "feature_matrix_pending"
+_RELOAD_KEY = "feature_matrix_reload"
+# a sync reads back this far behind the newest row it saw, a write stamped earlier may commit later
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+# contiguous float32 copy of the fighter_features table, one row per fighter.
+# prediction inputs are built with row gathers instead of a select + dict per corner
+class FeatureMatrix:
+    def __init__(self, initial_capacity: int = 1024):
+        self.matrix = np.zeros((initial_capacity, len(FEATURE_ORDER)), dtype=np.float32)
+        self.index: dict[int, int] = {}  # fighter_id -> row
+        self.fighter_ids: list[int] = []  # row -> fighter_id
+        self.versions: dict[int, int] = {}  # fighter_id -> generation of its last write
+        self.updated_at: dict[int, datetime] = {}  # fighter_id -> when the features were fetched, for the freshness policy
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0  # never reset, so a version is never reused across reloads
+        self._synced_through: datetime | None = None  # newest updated_at read from the table
+        self._listeners: list[Callable[[int | None], None]] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.fighter_ids)
+
+    def load(self, db: Session):
+        stmt = select(FighterFeatures.fighter_id, FighterFeatures.updated_at, *(getattr(FighterFeatures, f) for f in FEATURE_ORDER))
+        rows = db.execute(stmt).all()
+
+        matrix = np.zeros((max(len(rows), 1024), len(FEATURE_ORDER)), dtype=np.float32)
+        if rows:
+            matrix[: len(rows)] = np.asarray([row[2:] for row in rows], dtype=np.float32)
+
+        with self._lock:
+            self.matrix = matrix
+            self.fighter_ids = [row[0] for row in rows]
+            self.index = {fighter_id: i for i, fighter_id in enumerate(self.fighter_ids)}
+            self._generation += 1
+            self.versions = dict.fromkeys(self.fighter_ids, self._generation)
+            self.updated_at = {row[0]: row[1] or datetime.min for row in rows}
+            self._synced_through = max((row[1] for row in rows if row[1]), default=None)
+            self.loaded = True
+        self._notify(None)
+        print(f"feature matrix loaded: {len(rows)} fighters")
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+        self._notify(None)
+
+    # called with the fighter_id that changed, or None when every row may have changed
+    def add_listener(self, listener: Callable[[int | None], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, fighter_id: int | None):
+        for listener in self._listeners:
+            listener(fighter_id)
+
+    def version(self, fighter_id: int) -> int | None:
+        """version of the cached row, None when the fighter is not in the matrix"""
+        with self._lock:
+            return self.versions.get(fighter_id) if self.loaded else None
+
+    def upsert(self, fighter_id: int, features: dict, updated_at: datetime | None = None):
+        values = [features[f] or 0.0 for f in FEATURE_ORDER]
+        with self._lock:
+            row = self.index.get(fighter_id)
+            if row is None:
+                row = len(self.fighter_ids)
+                if row == self.matrix.shape[0]:  # grow by doubling, copies once per doubling
+                    grown = np.zeros((row * 2, self.matrix.shape[1]), dtype=np.float32)
+                    grown[:row] = self.matrix
+                    self.matrix = grown
+                self.index[fighter_id] = row
+                self.fighter_ids.append(fighter_id)
+            self.matrix[row] = values
+            self._generation += 1
+            self.versions[fighter_id] = self._generation
+            self.updated_at[fighter_id] = updated_at or datetime.now()
+        self._notify(fighter_id)
+
+    def remove(self, fighter_id: int):
+        with self._lock:
+            row = self.index.pop(fighter_id, None)
+            self.versions.pop(fighter_id, None)
+            self.updated_at.pop(fighter_id, None)
+            if row is None:
+                return
+            # move the last row into the hole so the used rows stay contiguous
+            last = len(self.fighter_ids) - 1
+            last_id = self.fighter_ids.pop()
+            if row != last:
+                self.matrix[row] = self.matrix[last]
+                self.fighter_ids[row] = last_id
+                self.index[last_id] = row
+        self._notify(fighter_id)
+
+    def rows_for(self, fighter_ids: Iterable[int], db: Session) -> dict[int, int]:
+        """fighter_id -> row for the fighters that have features. misses are read from the db in one select"""
+        ids = set(fighter_ids)
+        with self._lock:
+            if not self.loaded:
+                self.load(db)
+
+            found = {fighter_id: self.index[fighter_id] for fighter_id in ids if fighter_id in self.index}
+            self.hits += len(found)
+            missing = ids - found.keys()
+            self.misses += len(missing)
+
+        if missing:
+            # written by another worker or outside the orm
+            stmt = select(FighterFeatures).where(FighterFeatures.fighter_id.in_(missing))
+            for features in db.execute(stmt).scalars():
+                self.upsert(features.fighter_id, {f: getattr(features, f) for f in FEATURE_ORDER}, features.updated_at)
+            with self._lock:
+                found.update({fighter_id: self.index[fighter_id] for fighter_id in missing if fighter_id in self.index})
+
+        return found
+
+    def sync(self, db: Session) -> int:
+        """apply rows other processes wrote since the last load or sync, the session events only see the writes of
+        this one. returns how many fighters changed"""
+        with self._lock:
+            if not self.loaded:
+                return 0  # the next load reads everything
+            since = self._synced_through
+
+        stmt = select(FighterFeatures.fighter_id, FighterFeatures.updated_at, *(getattr(FighterFeatures, f) for f in FEATURE_ORDER))
+        if since is not None:
+            stmt = stmt.where(FighterFeatures.updated_at >= since - SYNC_OVERLAP)
+        rows = db.execute(stmt).all()
+
+        changed = 0
+        for row in rows:
+            if row[1] is None or self.updated_at.get(row[0]) == row[1]:
+                continue  # written by this process, or already synced
+            self.upsert(row[0], dict(zip(FEATURE_ORDER, row[2:], strict=True)), row[1])
+            changed += 1
+        with self._lock:
+            newest = max((row[1] for row in rows if row[1]), default=None)
+            if newest is not None and (self._synced_through is None or newest > self._synced_through):
+                self._synced_through = newest
+        return changed
+
+    def missing(self, fighter_ids: Iterable[int]) -> list[int]:
+        """fighters not in the matrix, every one of them while it is not loaded. never reads the db"""
+        with self._lock:
+            return [fighter_id for fighter_id in fighter_ids if not self.loaded or fighter_id not in self.index]
+
+    def stale(self, fighter_ids: Iterable[int], cutoff: datetime) -> list[int]:
+        """fighters in the matrix whose features were fetched before cutoff"""
+        with self._lock:
+            return [fighter_id for fighter_id in fighter_ids if fighter_id in self.updated_at and self.updated_at[fighter_id] < cutoff]
+
+    def pair_input(self, red_rows: list[int], blue_rows: list[int]) -> np.ndarray:
+        """[N, 14] float32 input, red corner features first"""
+        with self._lock:
+            return np.hstack((self.matrix[red_rows], self.matrix[blue_rows]))
+
+    def pair_with_versions(self, red_corner_id: int, blue_corner_id: int) -> tuple[np.ndarray, int, int] | None:
+        """[1, 14] input and the versions of both rows, read together. None when a fighter is not in the matrix"""
+        with self._lock:
+            red_row, blue_row = self.index.get(red_corner_id), self.index.get(blue_corner_id)
+            if not self.loaded or red_row is None or blue_row is None:
+                return None
+            return self.pair_input([red_row], [blue_row]), self.versions[red_corner_id], self.versions[blue_corner_id]
+
+    def gather(self, rows: list[int]) -> np.ndarray:
+        with self._lock:
+            return self.matrix[rows]
+
+    def row_values(self, row: int) -> np.ndarray:
+        with self._lock:
+            return self.matrix[row].copy()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "loaded": self.loaded,
+                "fighters": len(self.fighter_ids),
+                "capacity": self.matrix.shape[0],
+                "matrix_bytes": self.matrix.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+feature_matrix = FeatureMatrix()
+
+
+# keep the matrix in sync with every orm write to fighter_features.
+# changes are collected on flush and only applied once the transaction commits
+@event.listens_for(Session, "after_flush")
+def _collect_feature_changes(session: Session, flush_context):
+    pending: dict[int, dict | None] = session.info.setdefault(_PENDING_KEY, {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, FighterFeatures):
+            values = inspect(obj).dict
+            # expired attributes are not loaded here, the row is refetched on the next miss
+            if all(f in values for f in FEATURE_ORDER):
+                # updated_at is only known when set explicitly, the default and onupdate are filled in by the db
+                pending[obj.fighter_id] = {f: values[f] for f in FEATURE_ORDER} | {"updated_at": values.get("updated_at")}
+            else:
+                pending[obj.fighter_id] = None
+    for obj in session.deleted:
+        if isinstance(obj, FighterFeatures):
+            pending[inspect(obj).identity[0]] = None
+
+
+# orm enabled insert/update/delete statements skip the flush, reload the whole matrix after them
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_feature_changes(orm_execute_state: ORMExecuteState):
+    if orm_execute_state.is_select:
+        return
+    if any(mapper.class_ is FighterFeatures for mapper in orm_execute_state.all_mappers):
+        orm_execute_state.session.info[_RELOAD_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_feature_changes(session: Session):
+    if session.info.pop(_RELOAD_KEY, False):
+        feature_matrix.invalidate()
+    for fighter_id, values in session.info.pop(_PENDING_KEY, {}).items():
+        if values is None:
+            feature_matrix.remove(fighter_id)
+        else:
+            feature_matrix.upsert(fighter_id, values, values["updated_at"])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_feature_changes(session: Session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_RELOAD_KEY, None)
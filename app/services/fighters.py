@@ -1,5 +1,9 @@
 from datetime import datetime
+from typing import Literal
+
 from fastapi import Depends, Form
+from sqlalchemy import Select, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.db.models import FightersDB
@@ -7,6 +11,7 @@ from app.db.session import get_db
 from app.schemas.fighters import DivisionEnum, FighterForm, FightersBase, FightersUpdate
 from app.services.api_services import get_external_fighter_features
 from app.services.map_features import update_fighter_features
+from app.services.pagination import DEFAULT_PAGE_SIZE, keyset_page, keyset_page_async
 
 
 db_dependency = Depends(get_db)
@@ -39,11 +44,32 @@ def create_fighter_form_service(
     )
 
 
-def get_all_fighters_service(db: Session = db_dependency):
-    fighters = db.query(FightersDB).all()
-    if not fighters:
+# keyset columns of each sort, the id last so the order is unique
+FIGHTER_SORTS = {
+    "id": (FightersDB.id,),
+    "name": (FightersDB.name, FightersDB.id),
+}
+
+
+# one page after the cursor and the cursor of the next one
+def get_all_fighters_service(
+    db: Session = db_dependency,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    division: DivisionEnum | None = None,
+    sort: Literal["id", "name"] = "id",
+) -> tuple[list[FightersDB], str | None]:
+    fighters, next_cursor = keyset_page(db, fighters_stmt(division), FIGHTER_SORTS[sort], cursor, limit)
+    if not fighters and not cursor and not division:  # a filter without matches is an empty page
         raise ValueError("no fighters found")
-    return fighters
+    return fighters, next_cursor
+
+
+def fighters_stmt(division: DivisionEnum | None) -> Select[tuple[FightersDB]]:
+    stmt = select(FightersDB)
+    if division:
+        stmt = stmt.where(FightersDB.division == division)
+    return stmt
 
 
 def get_fighter_by_id_service(id: int, db: Session = db_dependency):
@@ -72,10 +98,18 @@ def update_fighter_service(id: int, fighter: FightersUpdate, db: Session = db_de
     if not db_fighter:
         raise ValueError("fighter not found")
 
+    if apply_fighter_update(db_fighter, fighter):
+        db.commit()
+        db.refresh(db_fighter)
+    return db_fighter
+
+
+# sets the changed fields on the row, true when something changed
+def apply_fighter_update(db_fighter: FightersDB, fighter: FightersUpdate) -> bool:
     # get the updated data
     update_data = fighter.model_dump(exclude_unset=True, exclude_none=True)
     if not update_data:
-        return db_fighter
+        return False
 
     # validata the data
     current_data = {
@@ -102,9 +136,7 @@ def update_fighter_service(id: int, fighter: FightersUpdate, db: Session = db_de
 
     if changes_made:
         db_fighter.updated_at = datetime.now()
-        db.commit()
-        db.refresh(db_fighter)
-    return db_fighter
+    return bool(changes_made)
 
 
 def remove_fighter_service(id: int, db: Session = db_dependency):
@@ -146,6 +178,81 @@ async def create_fighter_with_features_service(fighter_form: FighterForm, sessio
         raise ValueError("error with the database: {str(e)}") from None
 
 
+# async session variants, same rules and errors as the sync services above
+async def get_all_fighters_service_async(
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    division: DivisionEnum | None = None,
+    sort: Literal["id", "name"] = "id",
+) -> tuple[list[FightersDB], str | None]:
+    fighters, next_cursor = await keyset_page_async(db, fighters_stmt(division), FIGHTER_SORTS[sort], cursor, limit)
+    if not fighters and not cursor and not division:
+        raise ValueError("no fighters found")
+    return fighters, next_cursor
+
+
+async def get_fighter_by_id_service_async(id: int, db: AsyncSession) -> FightersDB:
+    fighter = await db.get(FightersDB, id)
+    if not fighter:
+        raise ValueError("fighter with id not found")
+    return fighter
+
+
+async def create_fighter_service_async(fighter_form: FighterForm, db: AsyncSession) -> FightersDB:
+    fighter_data = fighter_form.to_fighters_base_data()
+    if not fighter_data:
+        raise ValueError("error parsing the fighter data")
+
+    new_fighter = FightersDB(**FightersBase(**fighter_data).model_dump())
+    db.add(new_fighter)
+    await db.commit()
+    await db.refresh(new_fighter)
+    return new_fighter
+
+
+async def update_fighter_service_async(id: int, fighter: FightersUpdate, db: AsyncSession) -> FightersDB:
+    db_fighter = await get_fighter_by_id_service_async(id, db)
+    if apply_fighter_update(db_fighter, fighter):
+        await db.commit()
+        await db.refresh(db_fighter)
+    return db_fighter
+
+
+async def remove_fighter_service_async(id: int, db: AsyncSession):
+    result = await db.execute(delete(FightersDB).where(FightersDB.id == id))
+    if not result.rowcount:
+        raise ValueError("fighter not found")
+    await db.commit()
+
+
+async def create_fighter_with_features_service_async(fighter_form: FighterForm, db: AsyncSession) -> FightersDB:
+    try:
+        fighter = FightersDB(**FightersBase(**fighter_form.to_fighters_base_data()).model_dump())
+        db.add(fighter)
+        await db.flush()
+
+        api_data = None
+        try:
+            api_data = await get_external_fighter_features(fighter.name)
+        except Exception as e:
+            print(f"could not fetch external data for {fighter.name}:{str(e)}")
+
+        if api_data:
+            try:
+                await db.run_sync(update_fighter_features, fighter.id, api_data)
+            except Exception as e:
+                print(f"could not update features: {str(e)}")
+
+        await db.commit()
+        await db.refresh(fighter)
+        return fighter
+
+    except Exception as e:
+        await db.rollback()
+        raise ValueError(f"error with the database: {str(e)}") from None
+
+
 # we need to use this service because the way fastapi handles forms
 async def get_fighter_update_form(
     name: str = Form(None),
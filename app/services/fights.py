@@ -1,14 +1,28 @@
+from datetime import date
+from typing import Literal
+
 from fastapi import Depends, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, delete, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
 from app.db.models import CardsDB, FightersDB, FightsDB
 from app.db.session import get_db
 from app.schemas.fighters import DivisionEnum
 from app.schemas.fights import FightForm, FightsBase, FightsUpdate, RoundsEnum, WinningMethodEnum
+from app.services.pagination import DEFAULT_PAGE_SIZE, after, decode_cursor, keyset_page, keyset_page_async
 
 
 db_dependency = Depends(get_db)
 
+# the fight templates show all four fighters. joined in the same select, lazy loading them is up to 4 selects per fight
+FIGHT_FIGHTERS = (
+    joinedload(FightsDB.red_fighter),
+    joinedload(FightsDB.blue_fighter),
+    joinedload(FightsDB.favorite_fighter),
+    joinedload(FightsDB.winner_fighter),
+)
+
 
 # get the data from the form
 def create_fight_form_service(
@@ -51,16 +65,67 @@ def get_card_fighter_form(db: Session = db_dependency):
     return fighters, cards, message
 
 
-def get_all_fights_service(db: Session = db_dependency):
-    fights = db.query(FightsDB).all()
-    if not fights:
+# keyset columns of each sort and whether it is newest first, the id last so the order is unique
+FIGHT_SORTS = {
+    "date": ((FightsDB.fight_date, FightsDB.id), True),
+    "id": ((FightsDB.id,), False),
+}
+
+
+# one page after the cursor and the cursor of the next one
+def get_all_fights_service(
+    db: Session = db_dependency,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    division: DivisionEnum | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    sort: Literal["date", "id"] = "date",
+):
+    columns, descending = FIGHT_SORTS[sort]
+    fights, next_cursor = keyset_page(db, fights_stmt(division, date_from, date_to), columns, cursor, limit, descending)
+    if not fights and not cursor and not division and not date_from and not date_to:  # a filter without matches is an empty page
         raise ValueError("no fights found")
 
-    return fights
+    return fights, next_cursor
+
+
+def fights_stmt(division: DivisionEnum | None, date_from: date | None, date_to: date | None) -> Select[tuple[FightsDB]]:
+    stmt = select(FightsDB).options(*FIGHT_FIGHTERS)
+    if division:
+        stmt = stmt.where(FightsDB.division == division)
+    if date_from:
+        stmt = stmt.where(FightsDB.fight_date >= date_from)
+    if date_to:
+        stmt = stmt.where(FightsDB.fight_date <= date_to)
+    return stmt
+
+
+# a fighter history pages newest first like the listing
+FIGHTER_FIGHTS_SORT = (FightsDB.fight_date, FightsDB.id)
+
+
+def fighter_fights_stmt(fighter_id: int, cursor: str | None, limit: int) -> Select[tuple[FightsDB]]:
+    """fights of the fighter in either corner. a union of one page per corner, each read backwards on its
+    (corner, fight_date, id) index and stopped after the page. an OR of the corners matches the same rows but has to
+    sort all of them, the union only merges the two pages. keyset_page orders and limits the merged rows"""
+    pages = []
+    for corner in (FightsDB.red_corner, FightsDB.blue_corner):
+        page = select(FightsDB.id).where(corner == fighter_id)
+        if cursor:
+            page = page.where(after(FIGHTER_FIGHTS_SORT, decode_cursor(cursor, FIGHTER_FIGHTS_SORT), descending=True))
+        page = page.order_by(FightsDB.fight_date.desc(), FightsDB.id.desc()).limit(limit + 1).subquery()
+        pages.append(select(page.c.id))
+    return select(FightsDB).options(*FIGHT_FIGHTERS).where(FightsDB.id.in_(union(*pages)))
+
+
+# a bad cursor raises ValueError, a fighter without fights is an empty page
+def get_fighter_fights_service(fighter_id: int, db: Session, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE):
+    return keyset_page(db, fighter_fights_stmt(fighter_id, cursor, limit), FIGHTER_FIGHTS_SORT, cursor, limit, descending=True)
 
 
 def get_fight_by_id_service(id: int, db: Session = db_dependency):
-    fight = db.query(FightsDB).filter(FightsDB.id == id).first()
+    fight = db.query(FightsDB).options(*FIGHT_FIGHTERS).filter(FightsDB.id == id).first()
     if not fight:
         raise ValueError("fight doesnt exists")
     return fight
@@ -99,10 +164,18 @@ def update_fight_service(id: int, fight: FightsUpdate, db: Session = db_dependen
     if not db_fight:
         raise ValueError("fight not found")
 
+    if apply_fight_update(db_fight, fight):
+        db.commit()
+        db.refresh(db_fight)
+    return db_fight
+
+
+# sets the changed fields on the row, true when something changed
+def apply_fight_update(db_fight: FightsDB, fight: FightsUpdate) -> bool:
     # get the updated data
     update_data = fight.model_dump(exclude_unset=True, exclude_none=True)
     if not update_data:
-        return db_fight
+        return False
 
     # validata the data
     current_data = {
@@ -127,10 +200,7 @@ def update_fight_service(id: int, fight: FightsUpdate, db: Session = db_dependen
             setattr(db_fight, field_name, new_value)
             changes_made.append(new_value)
 
-    if changes_made:
-        db.commit()
-        db.refresh(db_fight)
-    return db_fight
+    return bool(changes_made)
 
 
 def remove_fight_service(id: int, db: Session = db_dependency):
@@ -141,6 +211,82 @@ def remove_fight_service(id: int, db: Session = db_dependency):
     return None
 
 
+# async session variants, same rules and errors as the sync services above
+async def get_card_fighter_form_async(db: AsyncSession):
+    fighters = list(await db.scalars(select(FightersDB)))
+    cards = list(await db.scalars(select(CardsDB)))
+    message = None
+
+    if not fighters:
+        message = "no fighters found, create fighters"
+
+    elif not cards:
+        message = "no cards found, create fighters"
+
+    return fighters, cards, message
+
+
+async def get_all_fights_service_async(
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    division: DivisionEnum | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    sort: Literal["date", "id"] = "date",
+):
+    columns, descending = FIGHT_SORTS[sort]
+    fights, next_cursor = await keyset_page_async(db, fights_stmt(division, date_from, date_to), columns, cursor, limit, descending)
+    if not fights and not cursor and not division and not date_from and not date_to:
+        raise ValueError("no fights found")
+    return fights, next_cursor
+
+
+async def get_fighter_fights_service_async(fighter_id: int, db: AsyncSession, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await keyset_page_async(db, fighter_fights_stmt(fighter_id, cursor, limit), FIGHTER_FIGHTS_SORT, cursor, limit, descending=True)
+
+
+async def get_fight_by_id_service_async(id: int, db: AsyncSession) -> FightsDB:
+    fight = (await db.scalars(select(FightsDB).options(*FIGHT_FIGHTERS).where(FightsDB.id == id))).first()
+    if not fight:
+        raise ValueError("fight doesnt exists")
+    return fight
+
+
+async def create_fight_service_async(fight_form: FightForm, db: AsyncSession) -> FightsDB:
+    fight_data = fight_form.to_fights_base_data()
+    if not fight_data:
+        raise ValueError("error parsing fight data")
+
+    for fighter_id in (fight_form.red_corner, fight_form.blue_corner):
+        if not await db.get(FightersDB, fighter_id):
+            raise ValueError(f"fighter with id {fighter_id} not found")
+
+    new_fight = FightsDB(**FightsBase(**fight_data).model_dump())
+    db.add(new_fight)
+    await db.commit()
+    await db.refresh(new_fight)
+    return new_fight
+
+
+async def update_fight_service_async(id: int, fight: FightsUpdate, db: AsyncSession) -> FightsDB:
+    db_fight = await db.get(FightsDB, id)
+    if not db_fight:
+        raise ValueError("fight not found")
+
+    if apply_fight_update(db_fight, fight):
+        await db.commit()
+        await db.refresh(db_fight)
+    return db_fight
+
+
+async def remove_fight_service_async(id: int, db: AsyncSession):
+    result = await db.execute(delete(FightsDB).where(FightsDB.id == id))
+    if not result.rowcount:
+        raise ValueError("fight not found")
+    await db.commit()
+
+
 async def get_fight_update_form(
     fight_date: str = Form(None),
     rounds: str = Form(None),
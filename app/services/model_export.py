@@ -0,0 +1,94 @@
+import argparse
+import sys
+
+import numpy as np
+import torch
+import torch.nn as nn
+from sqlalchemy.orm import Session
+
+from app.services.feature_store import feature_matrix
+from app.services.numpy_backend import NumpyFightPredictor
+from app.services.predictor import MODEL_PATH, NUMPY_PATH, TORCHSCRIPT_PATH, Model, metadata
+from app.services.torch_backend import TorchPredictorRunner, load_eager_model, quantize_model
+
+
+# traced and frozen, weights become constants and the python module dispatch is gone
+def export_torchscript(model: nn.Module, path: str = TORCHSCRIPT_PATH) -> str:
+    example = torch.zeros((1, metadata["input_dim"]), dtype=torch.float32)
+    with torch.no_grad():
+        traced = torch.jit.trace(model.eval(), example)
+    frozen = torch.jit.freeze(traced)
+    torch.jit.save(frozen, path)
+    return path
+
+
+# float32 state dict, loaded by the numpy backend without torch
+def export_numpy(model: nn.Module, path: str = NUMPY_PATH) -> str:
+    weights = {name: tensor.detach().cpu().numpy().astype(np.float32) for name, tensor in model.state_dict().items()}
+    with open(path, "wb") as f:  # np.savez would append .npz to a path without it
+        np.savez(f, **weights)
+    return path
+
+
+# random matchups between fighters that have features, same seed gives the same set
+def reference_matchups(db: Session, n_matchups: int, seed: int = 0) -> np.ndarray:
+    feature_matrix.load(db)
+    if not len(feature_matrix):
+        raise ValueError("no fighter features in the database")
+    rng = np.random.default_rng(seed)
+    red = rng.integers(0, len(feature_matrix), n_matchups).tolist()
+    blue = rng.integers(0, len(feature_matrix), n_matchups).tolist()
+    return feature_matrix.pair_input(red, blue)
+
+
+# both models map the same numpy input to win probabilities, see predictor.Model
+def parity_report(reference: Model, candidate: Model, model_input: np.ndarray) -> dict:
+    expected = reference(model_input)
+    actual = candidate(model_input)
+    diff = np.abs(expected - actual)
+    return {
+        "matchups": model_input.shape[0],
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "winner_agreement": float(np.mean((expected > 0.5) == (actual > 0.5))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export the fight predictor checkpoint for serving")
+    parser.add_argument("format", choices=["torchscript", "numpy", "parity"], help="parity compares the quantized and numpy models against the float one")
+    parser.add_argument("--checkpoint", default=MODEL_PATH)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--matchups", type=int, default=1000, help="size of the parity reference set")
+    parser.add_argument("--tolerance", type=float, default=0.03, help="max allowed probability difference")
+    args = parser.parse_args()
+
+    model = load_eager_model(args.checkpoint, metadata["input_dim"])
+    if args.format == "parity":
+        from app.db.session import SessionLocal
+
+        with SessionLocal() as db:
+            model_input = reference_matchups(db, args.matchups)
+        candidates = {
+            "quantized": TorchPredictorRunner(quantize_model(load_eager_model(args.checkpoint, metadata["input_dim"]))),
+            "numpy": NumpyFightPredictor({name: tensor.numpy() for name, tensor in model.state_dict().items()}),
+        }
+        failed = []
+        for name, candidate in candidates.items():
+            report = parity_report(TorchPredictorRunner(model), candidate, model_input)
+            print(name, report)
+            if report["max_abs_diff"] > args.tolerance:
+                failed.append(f"{name} model is off by {report['max_abs_diff']:.4f}")
+        if failed:
+            sys.exit(f"{', '.join(failed)}, tolerance {args.tolerance}")
+        return
+
+    if args.format == "numpy":
+        path = export_numpy(model, args.output or NUMPY_PATH)
+    else:
+        path = export_torchscript(model, args.output or TORCHSCRIPT_PATH)
+    print(f"exported {args.format} model to {path}")
+
+
+if __name__ == "__main__":
+    main()
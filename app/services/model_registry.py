@@ -0,0 +1,43 @@
+import json
+import os
+
+META_FILE = "predictor_meta.json"
+# artifact each backend loads from a version directory, the quantized model is built from the checkpoint
+ARTIFACTS = {
+    "eager": "predictor.pt",
+    "quantized": "predictor.pt",
+    "torchscript": "predictor.torchscript.pt",
+    "numpy": "predictor.npz",
+}
+
+
+# a directory of model versions, one sub directory each with predictor_meta.json and the backend artifacts:
+#   pytorch/models/2025-03-01/predictor_meta.json
+#   pytorch/models/2025-03-01/predictor.pt
+# versions are ordered by name, so use sortable names like dates or zero padded numbers
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = root
+
+    def versions(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isfile(os.path.join(self.root, name, META_FILE)))
+
+    def latest(self) -> str | None:
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    # only listed versions are joined into a path, a name like ".." never leaves the registry
+    def check_version(self, version: str):
+        if version not in self.versions():
+            raise ValueError(f"model version {version} not found")
+
+    def metadata(self, version: str) -> dict:
+        self.check_version(version)
+        with open(os.path.join(self.root, version, META_FILE)) as f:
+            return json.load(f)
+
+    def artifact_path(self, version: str, backend: str) -> str:
+        self.check_version(version)
+        return os.path.join(self.root, version, ARTIFACTS[backend])
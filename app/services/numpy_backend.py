@@ -0,0 +1,27 @@
+import numpy as np
+
+
+# the fight predictor forward pass without torch: linear -> relu -> linear -> relu -> linear -> sigmoid
+class NumpyFightPredictor:
+    def __init__(self, weights: dict[str, np.ndarray]):
+        # state dict names, net.<index>.weight / net.<index>.bias, in layer order
+        indices = sorted({int(name.split(".")[1]) for name in weights})
+        # weights are stored [out, in], transpose once so the forward pass is x @ w
+        self.layers = [
+            (np.ascontiguousarray(weights[f"net.{i}.weight"].T, dtype=np.float32), np.asarray(weights[f"net.{i}.bias"], dtype=np.float32)) for i in indices
+        ]
+
+    def __call__(self, model_input: np.ndarray) -> np.ndarray:
+        hidden = model_input
+        last = len(self.layers) - 1
+        for i, (weight, bias) in enumerate(self.layers):
+            hidden = hidden @ weight + bias
+            if i < last:
+                np.maximum(hidden, 0.0, out=hidden)
+        with np.errstate(over="ignore"):  # exp overflows to inf for very negative logits, the sigmoid is still 0
+            return 1.0 / (1.0 + np.exp(-hidden[:, 0]))
+
+
+def load_numpy_model(path: str) -> NumpyFightPredictor:
+    with np.load(path) as weights:
+        return NumpyFightPredictor({name: weights[name] for name in weights.files})
@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import date
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+# opaque to clients, the sort values of the last row of the page
+def encode_cursor(values: tuple) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, date) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: tuple[InstrumentedAttribute, ...]) -> tuple:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return tuple(
+            date.fromisoformat(value) if column.type.python_type is date else column.type.python_type(value)
+            for column, value in zip(columns, values, strict=True)
+        )
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"invalid cursor: {str(e)}") from e
+
+
+# rows after the cursor in (a, b, ..) order. a row value comparison, postgres and sqlite use the index for it
+def after(columns: tuple[InstrumentedAttribute, ...], values: tuple, descending: bool) -> ColumnElement[bool]:
+    return tuple_(*columns) < tuple_(*values) if descending else tuple_(*columns) > tuple_(*values)
+
+
+def keyset_page(
+    db: Session,
+    stmt: Select,
+    columns: tuple[InstrumentedAttribute, ...],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> tuple[list[Any], str | None]:
+    """one page of stmt ordered by columns, the last one unique (the id). the cost does not depend on how deep the
+    page is, unlike offset. returns the rows and the cursor of the next page, None on the last page"""
+    rows = list(db.execute(keyset_stmt(stmt, columns, cursor, limit, descending)).unique().scalars())
+    return next_page(rows, columns, limit)
+
+
+async def keyset_page_async(
+    db: AsyncSession,
+    stmt: Select,
+    columns: tuple[InstrumentedAttribute, ...],
+    cursor: str | None,
+    limit: int,
+    descending: bool = False,
+) -> tuple[list[Any], str | None]:
+    rows = list((await db.execute(keyset_stmt(stmt, columns, cursor, limit, descending))).unique().scalars())
+    return next_page(rows, columns, limit)
+
+
+# one row more than the page, it tells whether there is a next page
+def keyset_stmt(stmt: Select, columns: tuple[InstrumentedAttribute, ...], cursor: str | None, limit: int, descending: bool) -> Select:
+    if cursor:
+        stmt = stmt.where(after(columns, decode_cursor(cursor, columns), descending))
+    return stmt.order_by(*(column.desc() if descending else column for column in columns)).limit(limit + 1)
+
+
+def next_page(rows: list[Any], columns: tuple[InstrumentedAttribute, ...], limit: int) -> tuple[list[Any], str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(tuple(getattr(rows[-1], column.key) for column in columns))
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from app.db.settings import settings_predictor
+
+# (red_id, blue_id, model_version, red_feature_version, blue_feature_version)
+CacheKey = tuple[int, int, str, int, int]
+
+
+# bounded lru with ttl for red corner win probabilities.
+# entries are also dropped when either fighter changes or a new model is loaded
+class PredictionCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[CacheKey, tuple[float, float]] = OrderedDict()  # key -> (expires_at, red_prob)
+        self._by_fighter: defaultdict[int, set[CacheKey]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> float | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, red_prob = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return red_prob
+
+    def put(self, key: CacheKey, red_prob: float):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, red_prob)
+            self._entries.move_to_end(key)
+            self._by_fighter[key[0]].add(key)
+            self._by_fighter[key[1]].add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate_fighter(self, fighter_id: int | None):
+        """drop every matchup of the fighter, everything when fighter_id is None"""
+        if fighter_id is None:
+            self.clear()
+            return
+        with self._lock:
+            for key in list(self._by_fighter.get(fighter_id, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_fighter.clear()
+
+    def _drop(self, key: CacheKey):
+        self._entries.pop(key, None)
+        for fighter_id in (key[0], key[1]):
+            keys = self._by_fighter.get(fighter_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_fighter[fighter_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+prediction_cache = PredictionCache(
+    max_size=settings_predictor.prediction_cache_size,
+    ttl_seconds=settings_predictor.prediction_cache_ttl_seconds,
+)
@@ -1,38 +1,155 @@
+import asyncio
+import gc
 import json
+import os
+import threading
+from collections.abc import Callable
+
+import numpy as np
 from fastapi import HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy import select
-from sqlalchemy.orm import Session
-import torch
-import torch.nn as nn
-from app.db.models import FighterFeatures
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import FighterFeatures, FightersDB, FightsDB
+from app.db.settings import settings_predictor
+from app.schemas.fighters import DivisionEnum
+from app.services.executors import run_blocking
+from app.services.feature_store import FEATURE_ORDER, feature_matrix
+from app.services.model_registry import ModelRegistry
+from app.services.prediction_cache import CacheKey, prediction_cache
 
+MODEL_PATH = "pytorch/predictor.pt"
+# written by app.services.model_export
+TORCHSCRIPT_PATH = "pytorch/predictor.torchscript.pt"
+NUMPY_PATH = "pytorch/predictor.npz"
 
-model = None
+# float32 [N, 14] in, red corner win probabilities [N] out. torch is only imported by the torch backends
+Model = Callable[[np.ndarray], np.ndarray]
 
-with open("pytorch/predictor_meta.json", "r") as f:
+MAX_BATCH_MATCHUPS = 1000
+
+with open("pytorch/predictor_meta.json") as f:
     metadata = json.load(f)
 
+registry = ModelRegistry(settings_predictor.predictor_registry_dir)
+
+
+# a loaded model with the version it came from, swapped in as a single reference.
+# a request that already holds it keeps scoring with it while a reload runs
+class ServedModel:
+    def __init__(self, model: Model, version: str, metadata: dict):
+        self.model = model
+        self.version = version  # part of the prediction cache key, reported with every prediction
+        self.metadata = metadata
+
+    def __call__(self, model_input: np.ndarray) -> np.ndarray:
+        return self.model(model_input)
+
+
+# the model predictions are scored with, swapped by a reload
+class ModelState:
+    def __init__(self):
+        self.served: ServedModel | None = None
+
+
+model_state = ModelState()
+_load_lock = threading.Lock()  # one load or reload at a time
+
+
+# cached predictions of a changed fighter are dropped
+feature_matrix.add_listener(prediction_cache.invalidate_fighter)
+
+
+# file the configured backend loads, the quantized model is built from the checkpoint.
+# without a registry version the single checkpoint under pytorch/ is used
+def model_path(version: str | None = None) -> str:
+    backend = settings_predictor.predictor_backend
+    if version is not None:
+        return registry.artifact_path(version, backend)
+    return {"torchscript": TORCHSCRIPT_PATH, "numpy": NUMPY_PATH}.get(backend, MODEL_PATH)
+
+
+def load_model(version: str | None = None) -> ServedModel:
+    """the given registry version, the pinned or latest one when None"""
+    version = version or settings_predictor.predictor_model_version or registry.latest()
+    model_metadata = registry.metadata(version) if version else metadata
+    path = model_path(version)
 
-def get_pytorch_model():
-    global model
-    if model is None:
-        checkpoint = torch.load("pytorch/predictor.pt", map_location="cpu")
-        model = FightPredictor(input_dim=metadata["input_dim"])
-        model.load_state_dict(checkpoint["model_state_dict"])
-        model.eval()
-        print("pytorch model loaded")
+    backend = settings_predictor.predictor_backend
+    if backend == "numpy":
+        from app.services.numpy_backend import load_numpy_model
 
-    return model
+        model = load_numpy_model(path)
+    else:
+        from app.services import torch_backend
 
+        if backend == "torchscript":
+            model = torch_backend.TorchPredictorRunner(torch_backend.load_torchscript_model(path))
+        else:
+            eager_model = torch_backend.load_eager_model(path, model_metadata["input_dim"])
+            model = torch_backend.TorchPredictorRunner(torch_backend.quantize_model(eager_model) if backend == "quantized" else eager_model)
 
-class FightPredictor(nn.Module):
-    def __init__(self, input_dim):
-        super().__init__()
-        self.net = nn.Sequential(nn.Linear(input_dim, 128), nn.ReLU(), nn.Linear(128, 64), nn.ReLU(), nn.Linear(64, 1))
+    version = version or model_metadata.get("version") or str(int(os.path.getmtime(path)))
+    return ServedModel(model, f"{version}-{backend}", model_metadata)  # backends do not give bit identical outputs
 
-    def forward(self, x):
-        return self.net(x)
+
+def get_model() -> ServedModel:
+    if model_state.served is None:
+        with _load_lock:
+            if model_state.served is None:
+                model_state.served = load_model()
+                prediction_cache.clear()  # results of the previous checkpoint are not valid anymore
+
+    return model_state.served
+
+
+# first calls pay allocation and dispatch setup, run them before serving traffic
+def warm_up_model(batch_sizes: list[int], warm_model: ServedModel | None = None):
+    warm_model = warm_model or get_model()
+    for batch_size in batch_sizes:
+        for _ in range(2):  # torchscript optimizes the graph on the second run
+            warm_model(np.zeros((batch_size, warm_model.metadata["input_dim"]), dtype=np.float32))
+    print(f"model {warm_model.version} warmed up, batch sizes: {batch_sizes}")
+
+
+def reload_model(version: str | None = None) -> ServedModel:
+    """load and warm a registry version next to the served model, then swap it in"""
+    with _load_lock:
+        candidate = load_model(version)
+        warm_up_model(settings_predictor.predictor_warmup_batch_sizes, candidate)
+
+        previous, model_state.served = model_state.served, candidate
+        prediction_cache.clear()  # old version entries can not be hit anymore, free them now
+        del previous
+        gc.collect()  # torch modules hold reference cycles, release the old weights now and not at some later collection
+    print(f"model reloaded: {candidate.version}")
+    return candidate
+
+
+# polls the registry, each worker picks up a new version on its own
+async def watch_model_registry(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        latest = registry.latest()
+        if settings_predictor.predictor_model_version or latest is None:
+            continue
+        if model_state.served is not None and model_state.served.version == f"{latest}-{settings_predictor.predictor_backend}":
+            continue
+        try:
+            await run_blocking("reload", reload_model, latest)
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            print(f"could not reload model {latest}, keeping the served one: {str(e)}")
+
+
+# none when the model or either fighter is not loaded yet, that prediction is not cached.
+# versions are the feature versions a prediction was scored with, the current ones by default
+def prediction_cache_key(red_corner_id: int, blue_corner_id: int, model_version: str | None = None, versions: tuple[int, int] | None = None) -> CacheKey | None:
+    model_version = model_version or (model_state.served.version if model_state.served is not None else None)
+    red_version, blue_version = versions or (feature_matrix.version(red_corner_id), feature_matrix.version(blue_corner_id))
+    if model_version is None or red_version is None or blue_version is None:
+        return None
+    return (red_corner_id, blue_corner_id, model_version, red_version, blue_version)
 
 
 class FighterFeaturesRequest(BaseModel):
@@ -49,73 +166,175 @@ class FightPredictionResponse(BaseModel):
     blue_corner_id: int
     red_corner_win_probability: float
     blue_corner_win_probability: float
+    model_version: str
+
+
+class FightPredictionBatchRequest(BaseModel):
+    matchups: list[FightPredictionRequest] = Field(..., min_length=1, max_length=MAX_BATCH_MATCHUPS)
+
+
+# probabilities are null when the pair could not be scored, error says why
+class FightPredictionBatchItem(BaseModel):
+    red_corner_id: int
+    blue_corner_id: int
+    red_corner_win_probability: float | None = None
+    blue_corner_win_probability: float | None = None
+    error: str | None = None
+
+
+class FightPredictionBatchResponse(BaseModel):
+    predictions: list[FightPredictionBatchItem]
+
+
+class CardFightPrediction(BaseModel):
+    fight_id: int
+    red_corner_id: int
+    red_corner_name: str
+    blue_corner_id: int
+    blue_corner_name: str
+    red_corner_win_probability: float | None = None
+    blue_corner_win_probability: float | None = None
+    error: str | None = None
+
+
+# probabilities[i][j] is the chance of fighter_ids[i] beating fighter_ids[j] from the red corner
+class DivisionMatrixResponse(BaseModel):
+    division: DivisionEnum
+    fighter_ids: list[int]
+    fighter_names: list[str]
+    probabilities: list[list[float | None]]
+    missing_features: list[int] = Field(default_factory=list, description="Fighters of the division left out, they have no features")
+
+
+# red corner win probability for every row of the input
+def predict_win_probabilities(model_input: np.ndarray) -> list[float]:
+    return get_model()(model_input).tolist()
+
+
+# same, each probability with the version of the model that produced it
+def predict_win_probabilities_versioned(model_input: np.ndarray) -> list[tuple[float, str]]:
+    model = get_model()
+    return [(red_prob, model.version) for red_prob in model(model_input).tolist()]
+
+
+# row gathers from the feature matrix, no select or dict per corner. the feature versions are read with the rows,
+# a prediction is cached under the versions it was scored with even when the features change before the put
+def get_matchup_input(red_corner_id: int, blue_corner_id: int, db: Session) -> tuple[np.ndarray, tuple[int, int]]:
+    rows = feature_matrix.rows_for((red_corner_id, blue_corner_id), db)
+    for fighter_id in (red_corner_id, blue_corner_id):
+        if fighter_id not in rows:
+            raise HTTPException(status_code=400, detail=f"fighter {fighter_id} has no features")
+    pair = feature_matrix.pair_with_versions(red_corner_id, blue_corner_id)
+    if pair is None:  # removed or reloaded since the rows were found
+        raise HTTPException(status_code=400, detail=f"fighter {red_corner_id} or {blue_corner_id} has no features")
+    model_input, red_version, blue_version = pair
+    return model_input, (red_version, blue_version)
+
+
+def predict_fights_batch(matchups: list[FightPredictionRequest], db: Session) -> list[FightPredictionBatchItem]:
+    rows = feature_matrix.rows_for([fighter_id for m in matchups for fighter_id in (m.red_corner_id, m.blue_corner_id)], db)
+
+    items: list[FightPredictionBatchItem] = []
+    red_rows: list[int] = []
+    blue_rows: list[int] = []
+    scored: list[FightPredictionBatchItem] = []  # items that go through the model, same order as the rows
+    for matchup in matchups:
+        item = FightPredictionBatchItem(red_corner_id=matchup.red_corner_id, blue_corner_id=matchup.blue_corner_id)
+        items.append(item)
+
+        missing = [fighter_id for fighter_id in (matchup.red_corner_id, matchup.blue_corner_id) if fighter_id not in rows]
+        if missing:
+            item.error = f"fighter {missing[0]} has no features"
+            continue
+
+        red_rows.append(rows[matchup.red_corner_id])
+        blue_rows.append(rows[matchup.blue_corner_id])
+        scored.append(item)
+
+    if scored:
+        probabilities = predict_win_probabilities(feature_matrix.pair_input(red_rows, blue_rows))
+        for item, red_prob in zip(scored, probabilities, strict=True):
+            item.red_corner_win_probability = red_prob
+            item.blue_corner_win_probability = 1.0 - red_prob
+
+    return items
+
+
+def predict_division_matrix(division: DivisionEnum, db: Session) -> tuple[list[int], list[str], np.ndarray, list[int]]:
+    """every fighter of the division against every other, the diagonal is nan"""
+    fighters = db.execute(select(FightersDB.id, FightersDB.name).where(FightersDB.division == division).order_by(FightersDB.id)).all()
+    rows = feature_matrix.rows_for([fighter.id for fighter in fighters], db)
+
+    fighter_ids = [fighter.id for fighter in fighters if fighter.id in rows]
+    fighter_names = [fighter.name for fighter in fighters if fighter.id in rows]
+    missing = [fighter.id for fighter in fighters if fighter.id not in rows]
+
+    features = feature_matrix.gather([rows[fighter_id] for fighter_id in fighter_ids])
+    n = len(fighter_ids)
+    n_features = len(FEATURE_ORDER)
+    probabilities = np.empty((n, n), dtype=np.float32)
+
+    # each pass scores a block of red corners against the whole division
+    block = max(1, settings_predictor.predictor_max_pairs_per_pass // max(n, 1))
+    model = get_model() if n else None  # every block with the same version, even if a reload lands in between
+    for start in range(0, n, block):
+        assert model is not None
+        red = features[start : start + block]
+        pairs = np.empty((red.shape[0], n, 2 * n_features), dtype=np.float32)
+        pairs[:, :, :n_features] = red[:, None, :]  # broadcast, no python loop over pairs
+        pairs[:, :, n_features:] = features[None, :, :]
+        output = model(pairs.reshape(-1, 2 * n_features))
+        probabilities[start : start + red.shape[0]] = output.reshape(red.shape[0], n)
+
+    np.fill_diagonal(probabilities, np.nan)
+    return fighter_ids, fighter_names, probabilities, missing
+
+
+# every bout of the card with both fighters and their features in one joined select, scored in one pass
+def predict_card(card_id: int, db: Session) -> list[CardFightPrediction]:
+    red, blue = aliased(FightersDB), aliased(FightersDB)
+    red_features, blue_features = aliased(FighterFeatures), aliased(FighterFeatures)
+    stmt = (
+        select(
+            FightsDB.id,
+            red.id,
+            red.name,
+            blue.id,
+            blue.name,
+            red_features.fighter_id,
+            blue_features.fighter_id,
+            *(getattr(red_features, f) for f in FEATURE_ORDER),
+            *(getattr(blue_features, f) for f in FEATURE_ORDER),
+        )
+        .join(red, FightsDB.red_corner == red.id)
+        .join(blue, FightsDB.blue_corner == blue.id)
+        .outerjoin(red_features, red_features.fighter_id == red.id)
+        .outerjoin(blue_features, blue_features.fighter_id == blue.id)
+        .where(FightsDB.card == card_id)
+        .order_by(FightsDB.id)
+    )
+
+    predictions: list[CardFightPrediction] = []
+    inputs: list[tuple] = []
+    scored: list[CardFightPrediction] = []
+    for row in db.execute(stmt):
+        fight_id, red_id, red_name, blue_id, blue_name, red_features_id, blue_features_id = row[:7]
+        prediction = CardFightPrediction(fight_id=fight_id, red_corner_id=red_id, red_corner_name=red_name, blue_corner_id=blue_id, blue_corner_name=blue_name)
+        predictions.append(prediction)
+
+        # the outer join leaves the features null when the fighter has no features row
+        if red_features_id is None:
+            prediction.error = f"fighter {red_id} has no features"
+        elif blue_features_id is None:
+            prediction.error = f"fighter {blue_id} has no features"
+        else:
+            inputs.append(tuple(v or 0.0 for v in row[7:]))
+            scored.append(prediction)
 
+    if inputs:
+        probabilities = predict_win_probabilities(np.asarray(inputs, dtype=np.float32))
+        for prediction, red_prob in zip(scored, probabilities, strict=True):
+            prediction.red_corner_win_probability = red_prob
+            prediction.blue_corner_win_probability = 1.0 - red_prob
 
-async def get_or_fetch_fighter_features(fighter_id: int, db: Session) -> dict:
-    stmt = select(FighterFeatures).where(FighterFeatures.fighter_id == fighter_id)
-    features = db.execute(stmt).scalars().first()
-
-    # if features and all(
-    #     [
-    #         features.avg_sig_str_landed,
-    #         features.avg_sig_str_pct,
-    #         features.avg_sub_att,
-    #         features.avg_td_landed,
-    #         features.avg_td_pct,
-    #     ]
-    # ):
-    #     return features_to_dict(features)
-    if features:
-        return features_to_dict(features)
-
-    raise HTTPException(status_code=400, detail=f"fighter {fighter_id} has no features")
-    # fighter = db.execute(select(FightersDB).where(FightersDB.id == fighter_id)).scalars().first()
-    #
-    # if not fighter:
-    #     raise HTTPException(status_code=404, detail=f"Fighter {fighter_id} not found")
-    #
-    # external_data = await get_external_fighter_features(fighter.name)
-    # print(f"External API response: {external_data}")
-    #
-    # if not external_data:
-    #     raise HTTPException(status_code=502, detail=f"Could not fetch data for fighter {fighter.name} from external API")
-    #
-    # update_fighter_features(db, fighter_id, external_data)
-    # db.commit()
-    #
-    # # fetch updated features
-    # updated_features = db.execute(stmt).scalars().first()
-    # return features_to_dict(updated_features)
-
-
-def features_to_dict(features: FighterFeatures | None) -> dict:
-    if not features:
-        raise ValueError("fighter features not found")
-    return {
-        "fighter_id": features.fighter_id,
-        "avg_sig_str_landed": features.avg_sig_str_landed,
-        "avg_sig_str_pct": features.avg_sig_str_pct,
-        "avg_sub_att": features.avg_sub_att,
-        "avg_td_landed": features.avg_td_landed,
-        "avg_td_pct": features.avg_td_pct,
-        "wins_by_ko": features.wins_by_ko,
-        "wins_by_submission": features.wins_by_submission,
-    }
-
-
-def prepare_model_input(red_corner_features: dict, blue_corner_features: dict) -> torch.Tensor:
-    feature_order = [
-        "avg_sig_str_landed",
-        "avg_sig_str_pct",
-        "avg_sub_att",
-        "avg_td_landed",
-        "avg_td_pct",
-        "wins_by_ko",
-        "wins_by_submission",
-    ]
-
-    red_corner_vector = [red_corner_features[f] for f in feature_order]
-    blue_corner_vector = [blue_corner_features[f] for f in feature_order]
-
-    combined = red_corner_vector + blue_corner_vector
-    return torch.tensor([combined], dtype=torch.float32)
+    return predictions
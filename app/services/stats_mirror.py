@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from app.db.settings import settings_api
+
+# sorted by hash, looked up with a binary search over the memory mapped file
+INDEX_DTYPE = np.dtype([("hash", "<u8"), ("offset", "<u8")])
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def name_hash(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(normalize_name(name).encode(), digest_size=8).digest(), "little")
+
+
+def index_path(path: str) -> str:
+    return f"{path}.idx"
+
+
+# local copy of mma-stats payloads by fighter name, for boxes without egress and replays that must not hit the api.
+# the data is a jsonl file of {"name": ..., "data": <payload>} lines, next to it a sorted (hash, offset) index
+class StatsMirror:
+    def __init__(self, path: str | None):
+        self.path = path or None  # None or "" disables the mirror
+        self.hits = 0
+        self.misses = 0
+
+        self._index: np.ndarray | None = None
+        self._data = None
+        self._signature: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+
+    # the cli replaces both files, a changed index is picked up on the next lookup without a restart
+    def _open(self) -> np.ndarray | None:
+        if self.path is None:
+            return None
+        try:
+            stat = os.stat(index_path(self.path))
+        except FileNotFoundError:
+            self._close()
+            return None
+
+        signature = (stat.st_ino, stat.st_mtime_ns)
+        if signature != self._signature:
+            self._close()
+            # the data is replaced before the index, with the new index the new data is already in place
+            self._data = open(self.path, "rb")
+            self._index = np.memmap(index_path(self.path), dtype=INDEX_DTYPE, mode="r") if stat.st_size else np.empty(0, dtype=INDEX_DTYPE)
+            self._signature = signature
+        return self._index
+
+    def get(self, name: str) -> dict | None:
+        """the payload of the fighter, None when the mirror does not have it"""
+        key = normalize_name(name)
+        target = np.uint64(name_hash(key))  # a python int would convert the whole index before the search
+        with self._lock:
+            index = self._open()
+            if index is not None:
+                hashes = index["hash"]
+                first, last = np.searchsorted(hashes, target, side="left"), np.searchsorted(hashes, target, side="right")
+                for offset in index["offset"][first:last]:  # more than one only on a hash collision
+                    self._data.seek(int(offset))
+                    try:
+                        record = json.loads(self._data.readline())
+                    except ValueError:  # caught between the two replaces of a rebuild
+                        break
+                    if normalize_name(record["name"]) == key:
+                        self.hits += 1
+                        return record["data"]
+            self.misses += 1
+            return None
+
+    def __len__(self) -> int:
+        with self._lock:
+            index = self._open()
+            return 0 if index is None else len(index)
+
+    def _close(self):
+        if self._data is not None:
+            self._data.close()
+        self._data = None
+        self._index = None
+        self._signature = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "mode": settings_api.api_mirror_mode,
+            "fighters": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def read_mirror(path: str) -> Iterator[tuple[str, dict]]:
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            yield record["name"], record["data"]
+
+
+def write_mirror(path: str, records: Iterable[tuple[str, dict]]) -> int:
+    """writes the data and the index, later records of the same fighter win. returns the number of fighters"""
+    merged = {normalize_name(name): (name, data) for name, data in records}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    index = np.empty(len(merged), dtype=INDEX_DTYPE)
+    with open(f"{path}.tmp", "wb") as f:
+        for i, (name, data) in enumerate(merged.values()):
+            index[i] = (name_hash(name), f.tell())
+            f.write(json.dumps({"name": name, "data": data}).encode() + b"\n")
+    np.sort(index, order=["hash", "offset"]).tofile(f"{index_path(path)}.tmp")
+
+    os.replace(f"{path}.tmp", path)
+    os.replace(f"{index_path(path)}.tmp", index_path(path))
+    return len(merged)
+
+
+# recorded responses: mirror lines, /search responses (a list of payloads) or single payloads with a name
+def read_recorded(path: str) -> Iterator[tuple[str, dict]]:
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict) and "data" in record and "name" in record:
+                yield record["name"], record["data"]
+                continue
+            for payload in record if isinstance(record, list) else [record]:
+                if isinstance(payload, dict) and payload.get("name"):
+                    yield payload["name"], payload
+                else:
+                    print(f"{path}:{number}: skipped, no fighter name")
+
+
+# responses kept by the api cache, failed and not found lookups are left out
+def read_api_cache(path: str) -> Iterator[tuple[str, dict]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for key, value in conn.execute("SELECT key, value FROM api_cache WHERE key LIKE 'search:%' AND value IS NOT NULL"):
+            yield key.removeprefix("search:"), json.loads(value)
+    finally:
+        conn.close()
+
+
+stats_mirror = StatsMirror(settings_api.api_mirror_path)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="build or refresh the local mirror of external fighter stats")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="add recorded responses to the mirror")
+    build.add_argument("files", nargs="*", help="jsonl files of recorded responses")
+    build.add_argument("--from-api-cache", nargs="?", const=settings_api.api_cache_path, default=None, help="also take the responses kept by the api cache")
+    build.add_argument("--replace", action="store_true", help="drop what the mirror already has")
+    build.add_argument("--mirror", default=settings_api.api_mirror_path)
+
+    lookup = subparsers.add_parser("lookup", help="print the payload of a fighter")
+    lookup.add_argument("name")
+    lookup.add_argument("--mirror", default=settings_api.api_mirror_path)
+
+    args = parser.parse_args(argv)
+    if not args.mirror:
+        parser.error("no mirror path, set API_MIRROR_PATH or pass --mirror")
+
+    if args.command == "lookup":
+        mirror = StatsMirror(args.mirror)
+        data = mirror.get(args.name)
+        mirror.close()
+        if data is None:
+            print(f"{args.name} is not in the mirror")
+            sys.exit(1)
+        print(json.dumps(data, indent=2))
+        return
+
+    def records() -> Iterator[tuple[str, dict]]:
+        if not args.replace:
+            yield from read_mirror(args.mirror)
+        if args.from_api_cache:
+            yield from read_api_cache(args.from_api_cache)
+        for path in args.files:
+            yield from read_recorded(path)
+
+    print(f"stats mirror {args.mirror}: {write_mirror(args.mirror, records())} fighters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+from app.db.settings import settings_predictor
+
+# only imported by the torch backends, the numpy backend never loads torch
+if settings_predictor.predictor_torch_threads:
+    torch.set_num_threads(settings_predictor.predictor_torch_threads)
+
+
+class FightPredictor(nn.Module):
+    def __init__(self, input_dim):
+        super().__init__()
+        self.net = nn.Sequential(nn.Linear(input_dim, 128), nn.ReLU(), nn.Linear(128, 64), nn.ReLU(), nn.Linear(64, 1))
+
+    def forward(self, x):
+        return self.net(x)
+
+
+# numpy in, red corner win probabilities out, same interface as the numpy backend
+class TorchPredictorRunner:
+    def __init__(self, module: nn.Module):
+        self.module = module
+
+    def __call__(self, model_input: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            output = torch.sigmoid(self.module(torch.from_numpy(model_input)))
+        return output.squeeze(1).numpy()
+
+
+# the weights stay memory mapped from the checkpoint, workers loading the same file share its pages
+def load_eager_model(path: str, input_dim: int) -> FightPredictor:
+    checkpoint = torch.load(path, map_location="cpu", mmap=True)
+    eager_model = FightPredictor(input_dim=input_dim)
+    eager_model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    eager_model.eval()
+    return eager_model
+
+
+# int8 weights for the linear layers, activations are quantized on the fly for each batch
+def quantize_model(eager_model: nn.Module) -> nn.Module:
+    return torch.ao.quantization.quantize_dynamic(eager_model, {nn.Linear}, dtype=torch.qint8)
+
+
+def load_torchscript_model(path: str) -> nn.Module:
+    return torch.jit.load(path, map_location="cpu")
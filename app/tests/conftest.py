@@ -1,10 +1,20 @@
+from datetime import date
+
 import pytest
+import torch
 from fastapi.testclient import TestClient
 from sqlalchemy import StaticPool, create_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.db.models import Base
+from app.db.models import Base, FighterFeatures, FightersDB
 from app.db.session import get_db
+from app.services import api_services, predictor
+from app.services.api_cache import ApiResponseCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.feature_store import feature_matrix
+from app.services.prediction_cache import prediction_cache
+from app.services.stats_mirror import StatsMirror
+from app.services.torch_backend import FightPredictor, TorchPredictorRunner
 from main import app
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -33,6 +43,45 @@ def db_session(db_engine):
         connection.close()
 
 
+# the matrix is process wide, reload it from the test session on first use
+@pytest.fixture(autouse=True)
+def reset_feature_matrix():
+    feature_matrix.invalidate()
+    yield
+    feature_matrix.invalidate()
+
+
+# memory only, tests never read or write the cache file
+@pytest.fixture(autouse=True)
+def api_cache(monkeypatch):
+    cache = ApiResponseCache(max_size=100, ttl_seconds=60, negative_ttl_seconds=10)
+    monkeypatch.setattr(api_services, "api_cache", cache)
+    return cache
+
+
+# no mirror unless a test builds one, a local mirror file never answers lookups of other tests
+@pytest.fixture(autouse=True)
+def stats_mirror(monkeypatch):
+    mirror = StatsMirror(None)
+    monkeypatch.setattr(api_services, "stats_mirror", mirror)
+    return mirror
+
+
+# closed breaker for every test, failures of one test never open it for the next
+@pytest.fixture(autouse=True)
+def api_breaker(monkeypatch):
+    settings = api_services.settings_api
+    breaker = CircuitBreaker(
+        failure_rate=settings.api_breaker_failure_rate,
+        min_calls=settings.api_breaker_min_calls,
+        window_seconds=settings.api_breaker_window_seconds,
+        slow_call_seconds=settings.api_slow_call_seconds,
+        open_seconds=settings.api_breaker_open_seconds,
+    )
+    monkeypatch.setattr(api_services, "api_breaker", breaker)
+    return breaker
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     def override_get_db():
@@ -44,3 +93,37 @@ def client(db_session):
         yield test_client
 
     app.dependency_overrides.clear()
+
+
+# untrained predictor, the checkpoint is not needed for the tests
+@pytest.fixture
+def model(monkeypatch):
+    torch.manual_seed(0)
+    test_model = FightPredictor(input_dim=14)
+    test_model.eval()
+    monkeypatch.setattr(predictor.model_state, "served", predictor.ServedModel(TorchPredictorRunner(test_model), "test", {"input_dim": 14}))
+    prediction_cache.clear()
+    yield test_model
+    prediction_cache.clear()
+
+
+@pytest.fixture
+def add_fighter(db_session):
+    def add(id: int, name: str, with_features: bool = True, division: str = "lightweight"):
+        db_session.add(FightersDB(id=id, name=name, division=division, birth_date=date(1995, 1, 1), wins=10, losses=1, height=1.75, weight=70.0))
+        if with_features:
+            db_session.add(
+                FighterFeatures(
+                    fighter_id=id,
+                    avg_sig_str_landed=3.0 + id,
+                    avg_sig_str_pct=0.5,
+                    avg_sub_att=0.2 * id,
+                    avg_td_landed=1.5,
+                    avg_td_pct=0.4,
+                    wins_by_ko=id,
+                    wins_by_submission=2,
+                )
+            )
+        db_session.flush()
+
+    return add
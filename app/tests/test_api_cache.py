@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from functools import partial
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import api_services
+from app.services.api_cache import ApiResponseCache
+
+FIGHTER = {"name": "Jon Jones", "Records": {"Sig. Str. Landed": "4.3"}}
+
+
+def test_lru_eviction_and_negative_ttl():
+    cache = ApiResponseCache(max_size=2, ttl_seconds=600, negative_ttl_seconds=10)
+    with patch("app.services.api_cache.time.time", return_value=1000.0):
+        cache.put("a", FIGHTER)
+        cache.put("missing", None)
+        assert cache.get("a") == (True, FIGHTER)  # now most recently used
+        cache.put("b", FIGHTER)
+
+        assert cache.get("missing") == (False, None)
+        assert cache.evictions == 1
+        cache.put("missing", None)  # evicts a
+        assert cache.get("missing") == (True, None)
+
+    with patch("app.services.api_cache.time.time", return_value=1020.0):
+        assert cache.get("missing") == (False, None)  # negative entries expire first
+        assert cache.get("b") == (True, FIGHTER)
+
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "api_cache.sqlite")
+    cache = ApiResponseCache(max_size=10, ttl_seconds=600, negative_ttl_seconds=10, path=path)
+    cache.put("a", FIGHTER)
+    cache.put("missing", None)
+    cache.close()
+
+    # a new process, or a sibling worker, with an empty memory cache
+    restarted = ApiResponseCache(max_size=10, ttl_seconds=600, negative_ttl_seconds=10, path=path)
+    assert restarted.get("a") == (True, FIGHTER)
+    assert restarted.get("missing") == (True, None)
+    assert restarted.get("other") == (False, None)
+    assert restarted.disk_hits == 2
+    restarted.close()
+
+
+def test_the_file_is_read_and_written_off_the_event_loop(tmp_path):
+    cache = ApiResponseCache(max_size=10, ttl_seconds=600, negative_ttl_seconds=10, path=str(tmp_path / "api_cache.sqlite"))
+    threads = []
+    execute = sqlite3.Connection.execute
+
+    class Connection(sqlite3.Connection):
+        def execute(self, *args):
+            threads.append(threading.current_thread())
+            return execute(self, *args)
+
+    async def lookups():
+        with patch("app.services.api_cache.sqlite3.connect", partial(sqlite3.connect, factory=Connection)):
+            await cache.aput("a", FIGHTER)
+            cache._entries.clear()  # only on disk
+            return await cache.aget("a"), await cache.aget("a")
+
+    assert asyncio.run(lookups()) == ((True, FIGHTER), (True, FIGHTER))
+    assert cache.disk_hits == 1  # the second lookup is served from memory
+    assert threads and threading.main_thread() not in threads
+    cache.close()
+
+
+def test_misses_and_failures_are_cached_apart(api_cache):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["name"])
+        if request.url.params["name"] == "Nobody":
+            return httpx.Response(200, json=[])
+        if request.url.params["name"] == "Locked Out":
+            return httpx.Response(403)
+        raise httpx.ConnectError("api down")
+
+    names = ("Nobody", "nobody ", "Jon Jones", "Jon Jones", "Locked Out", "Locked Out")
+
+    async def lookup():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        results = [await api_services.get_external_fighter_features(name) for name in names]
+        with pytest.raises(api_services.LookupFailedError, match="api down"):
+            await api_services.get_external_fighter_features("Jon Jones", raise_failures=True)
+        await api_services.close_api_client()
+        return results
+
+    assert asyncio.run(lookup()) == [None] * len(names)
+    # names are normalized. the failure is retried within the lookup and then cached for the short failure ttl,
+    # an auth error is not retried
+    assert calls == ["Nobody"] + ["Jon Jones"] * (api_services.settings_api.api_retries + 1) + ["Locked Out"]
+    assert (api_cache.stats()["negative_hits"], api_cache.stats()["failure_hits"]) == (1, 3)
+    # neither is a not found
+    assert api_cache.get(api_services.fighter_cache_key("Jon Jones")) == (False, None)
+    assert api_cache.get(api_services.fighter_cache_key("Locked Out")) == (False, None)
+
+    with patch("app.services.api_cache.time.time", return_value=time.time() + api_cache.failure_ttl_seconds + 1):
+        assert api_cache.failure(api_services.fighter_cache_key("Jon Jones")) is None
@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+from app.services import api_services
+
+FIGHTER = {"name": "Jon Jones", "Records": {"Sig. Str. Landed": "4.3"}, "Win Stats": {"Wins by Knockout": 10}}
+
+
+# local stand-in for the api, records what it was asked
+@pytest.fixture
+def api():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.params["name"] == "Nobody":
+            return httpx.Response(404, json={"message": "not found"})
+        return httpx.Response(200, json=[FIGHTER])
+
+    api_services.open_api_client(httpx.MockTransport(handler))
+    yield requests
+    asyncio.run(api_services.close_api_client())
+
+
+def test_lookups_share_the_pooled_client(api):
+    client = api_services.open_api_client()
+
+    async def lookup():
+        return await asyncio.gather(*(api_services.get_external_fighter_features(name) for name in ("Jon Jones", "Alex Pereira", "Nobody")))
+
+    assert asyncio.run(lookup()) == [FIGHTER, FIGHTER, None]
+    assert api_services.open_api_client() is client
+
+    assert [request.url.path for request in api] == ["/search"] * 3
+    assert api[0].url.host == "mma-stats.p.rapidapi.com"
+    assert api[0].headers["x-rapidapi-host"] == "mma-stats.p.rapidapi.com"
+    assert "x-rapidapi-key" in api[0].headers
+
+
+def test_lifespan_closes_the_client():
+    with TestClient(app):
+        client = api_services.api_client_state.client
+        assert client is not None and not client.is_closed
+    assert api_services.api_client_state.client is None
+    assert client.is_closed
+
+
+def test_concurrent_lookups_make_one_upstream_call():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["name"])
+        await asyncio.sleep(0.05)  # every caller arrives while the first lookup is in flight
+        return httpx.Response(200, json=[FIGHTER])
+
+    async def lookup():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        results = await asyncio.gather(*(api_services.get_external_fighter_features("Jon Jones" if i % 2 else " jon  JONES") for i in range(100)))
+        await api_services.close_api_client()
+        return results
+
+    assert asyncio.run(lookup()) == [FIGHTER] * 100
+    assert len(calls) == 1  # names are normalized before coalescing
+    assert api_services._in_flight == {}
+
+
+def test_concurrent_lookups_share_the_error(api_cache, monkeypatch):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=[])
+
+    # unknown fighters are cached as None, an error only reaches the callers when caching it fails
+    async def failing_put(key, value):
+        raise RuntimeError("cache unavailable")
+
+    monkeypatch.setattr(api_cache, "aput", failing_put)
+    monkeypatch.setattr(api_services.settings_api, "api_retries", 0)
+
+    async def lookup():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        results = await asyncio.gather(*(api_services.get_external_fighter_features("Jon Jones") for _ in range(100)), return_exceptions=True)
+        await api_services.close_api_client()
+        return results
+
+    results = asyncio.run(lookup())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
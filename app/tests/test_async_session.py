@@ -0,0 +1,122 @@
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import engine as db_engine
+from app.db.engine import TimedAsyncQueuePool, async_database_url, create_app_async_engine
+from app.db.models import Base, CardsDB, FightersDB, FightsDB
+from app.db.session import get_async_db
+from app.db.settings import settings_database
+from app.routes import cards_async, fighters_async, fights_async
+from app.schemas.fighters import DivisionEnum
+from app.schemas.fights import RoundsEnum
+
+pytest.importorskip("aiosqlite", reason='the async extra is not installed, uv pip install -e ".[async]"')
+
+FIGHTER_FORM = {"name": "Jon Jones", "division": "heavyweight", "birth_date": "1987-07-19", "wins": 27, "losses": 1, "height": 1.93, "weight": 112}
+
+
+# the async routers on a fresh in-memory database, everything runs on the loop of the test
+async def with_async_app(scenario):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+    async def override_get_async_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (fighters_async, fights_async, cards_async):
+        app.include_router(module.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async with sessions() as db:
+                return await scenario(client, db)
+    finally:
+        await engine.dispose()
+
+
+def test_async_fighters_crud_and_pages():
+    async def scenario(client: httpx.AsyncClient, db: AsyncSession):
+        response = await client.post("/fighters/", data=FIGHTER_FORM)
+        assert response.status_code == 303
+        for i in range(4):
+            await client.post("/fighters/", data={**FIGHTER_FORM, "name": f"Fighter {i}"})
+
+        first = (await client.get("/fighters/", params={"limit": 3, "format": "json"})).json()
+        second = (await client.get("/fighters/", params={"limit": 3, "format": "json", "cursor": first["next_cursor"]})).json()
+        assert [f["id"] for f in first["items"] + second["items"]] == [1, 2, 3, 4, 5]
+        assert second["next_cursor"] is None
+
+        assert "Jon Jones" in (await client.get("/fighters/1/details")).text
+        assert (await client.get("/fighters/99/details")).status_code == 404
+        assert (await client.post("/fighters/1/update", data={"wins": "28"})).status_code == 303
+        assert (await db.get(FightersDB, 1)).wins == 28
+        assert (await client.delete("/fighters/5")).status_code == 200
+        assert (await client.delete("/fighters/5")).status_code == 404
+        assert (await client.get("/fighters/", params={"cursor": "not-a-cursor"})).status_code == 400
+
+    asyncio.run(with_async_app(scenario))
+
+
+def test_async_fights_and_cards_render_joined_fighters():
+    async def scenario(client: httpx.AsyncClient, db: AsyncSession):
+        db.add_all(
+            [
+                FightersDB(id=i, name=name, division=DivisionEnum("lightweight"), birth_date=date(1990, 1, 1), wins=1, losses=0, height=1.8, weight=70)
+                for i, name in ((1, "Red Fighter"), (2, "Blue Fighter"))
+            ]
+        )
+        db.add(CardsDB(id=1, card_name="Async Card", card_date=date(2025, 1, 1), card_number=1))
+        db.add_all(
+            [
+                FightsDB(rounds=RoundsEnum(3), division=DivisionEnum("lightweight"), card=1, red_corner=1, blue_corner=2, fight_date=date(2025, 1, 1))
+                for _ in range(3)
+            ]
+        )
+        await db.commit()
+
+        # the templates read the fighters after the session is gone, they must come with the fights
+        listing = await client.get("/fights/")
+        assert listing.status_code == 200
+        assert listing.text.count("Red Fighter vs Blue Fighter") == 3
+        assert "Red Fighter vs Blue Fighter" in (await client.get("/fights/1/details")).text
+        assert "Async Card" in (await client.get("/cards/1/details")).text
+        assert (await client.get("/cards/", params={"format": "json"})).json()["items"][0]["card_name"] == "Async Card"
+
+        # shared with the sync router
+        assert any(route.name == "predict_fight" for route in fights_async.router.routes)
+
+    asyncio.run(with_async_app(scenario))
+
+
+def test_async_engine_profiles(tmp_path, monkeypatch):
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("postgresql+psycopg2://user:secret@db/ufc") == "postgresql+asyncpg://user:secret@db/ufc"
+
+    async def pragmas():
+        engine = create_app_async_engine(f"sqlite:///{tmp_path / 'app.db'}")
+        async with engine.connect() as conn:
+            journal_mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+        assert isinstance(engine.sync_engine.pool, TimedAsyncQueuePool)
+        await engine.dispose()
+        return journal_mode
+
+    assert asyncio.run(pragmas()) == "wal"
+
+    calls = []
+    monkeypatch.setattr(db_engine, "create_async_engine", lambda url, **kwargs: calls.append((url, kwargs)))
+    monkeypatch.setattr(settings_database, "db_statement_timeout_ms", 2000)
+    create_app_async_engine("postgresql://user:secret@db/ufc")
+    ((url, kwargs),) = calls
+    assert url == "postgresql+asyncpg://user:secret@db/ufc"
+    assert kwargs["poolclass"] is TimedAsyncQueuePool
+    assert kwargs["connect_args"] == {"server_settings": {"statement_timeout": "2000"}}
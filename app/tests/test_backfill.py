@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import StaticPool, create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, FighterFeatures, FightersDB
+from app.services import api_services
+from app.services.backfill import load_state, run_backfill, save_state, settings_backfill
+from app.services.feature_store import FEATURE_ORDER, feature_matrix
+from app.services.rate_limit import TokenBucket
+
+API_DATA = {"Records": {"Sig. Str. Landed": "4.5", "Striking accuracy": "51%"}, "Win Stats": {"Wins by Knockout": 7, "Wins by Submission": 2}}
+
+
+# fighter 2 has fresh features, 4 stale ones, the others none. the api does not know fighter 3
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with factory() as db:
+        for i, name in enumerate(["Fighter One", "Fighter Two", "Fighter Three", "Fighter Four", "Fighter Five"], start=1):
+            db.add(FightersDB(id=i, name=name, division="lightweight", birth_date=date(1995, 1, 1), wins=10, losses=1, height=1.75, weight=70.0))
+        db.add(FighterFeatures(fighter_id=2, wins_by_ko=1, updated_at=datetime.now()))
+        db.add(FighterFeatures(fighter_id=4, wins_by_ko=1, updated_at=datetime.now() - timedelta(days=90)))
+        db.commit()
+
+    monkeypatch.setattr(settings_backfill, "backfill_batch_size", 2)
+    monkeypatch.setattr(settings_backfill, "backfill_rate_per_second", 1000.0)
+    monkeypatch.setattr(settings_backfill, "backfill_state_path", str(tmp_path / "backfill_state.json"))
+    monkeypatch.setattr(settings_backfill, "backfill_stale_after_days", 30.0)
+
+    inserts = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO fighter_features") else None,
+    )
+    factory.inserts = inserts
+    yield factory
+    engine.dispose()
+
+
+def backfill(session_factory, failing: str | None = None, **kwargs):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.params["name"] == failing:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[] if request.url.params["name"] == "Fighter Three" else [API_DATA])
+
+    async def run():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        try:
+            return await run_backfill(session_factory, **kwargs)
+        finally:
+            await api_services.close_api_client()
+
+    return asyncio.run(run())
+
+
+def test_backfill_fills_missing_and_stale_features_in_batches(session_factory):
+    with session_factory() as db:
+        feature_matrix.load(db)
+
+    progress = backfill(session_factory)
+
+    assert (progress.total, progress.processed, progress.enriched, progress.not_found, progress.batches) == (4, 4, 3, 1, 2)
+    assert len(session_factory.inserts) == 2  # one upsert per batch
+    assert not os.path.exists(settings_backfill.backfill_state_path)
+
+    with session_factory() as db:
+        assert db.get(FighterFeatures, 4).wins_by_ko == 7
+        assert db.get(FighterFeatures, 3) is None
+    assert sorted(feature_matrix.fighter_ids) == [1, 2, 4, 5]
+    assert feature_matrix.loaded  # updated row by row, not reloaded
+
+
+def test_sync_picks_up_writes_of_other_processes(session_factory):
+    with session_factory() as db:
+        feature_matrix.load(db)
+        version = feature_matrix.version(4)
+        assert feature_matrix.sync(db) == 0
+
+        # a backfill in another process, no session event of this one sees its writes
+        with db.get_bind().begin() as conn:
+            conn.execute(update(FighterFeatures.__table__).where(FighterFeatures.__table__.c.fighter_id == 4).values(wins_by_ko=9, updated_at=datetime.now()))
+            conn.execute(FighterFeatures.__table__.insert().values(fighter_id=5, wins_by_ko=3, updated_at=datetime.now()))
+        assert feature_matrix.version(4) == version
+
+        assert feature_matrix.sync(db) == 2
+        assert feature_matrix.sync(db) == 0  # already synced
+    assert feature_matrix.version(4) > version
+    assert feature_matrix.row_values(feature_matrix.index[4])[FEATURE_ORDER.index("wins_by_ko")] == 9
+    assert 5 in feature_matrix.index
+
+
+def test_backfill_resumes_from_the_cursor(session_factory):
+    # an earlier run that only refilled missing features stopped after fighter 3
+    save_state(settings_backfill.backfill_state_path, {"last_id": 3, "cutoff": None})
+
+    progress = backfill(session_factory)
+    assert (progress.processed, progress.enriched, progress.last_id) == (1, 1, 5)
+
+    with session_factory() as db:
+        assert db.get(FighterFeatures, 1) is None
+        assert db.get(FighterFeatures, 5) is not None
+
+
+def test_failed_lookups_stop_the_run_before_the_fighter(session_factory, api_cache, monkeypatch):
+    monkeypatch.setattr(api_services.settings_api, "api_retries", 0)
+
+    # the api is down for fighter 4, the first fighter of the second batch
+    progress = backfill(session_factory, failing="Fighter Four")
+    assert (progress.processed, progress.enriched, progress.not_found, progress.lookup_failed) == (2, 1, 1, 1)
+    assert progress.error.startswith("lookup of fighter 4 failed")
+    assert load_state(settings_backfill.backfill_state_path)["last_id"] == 3
+
+    # until the failure ttl runs out a new run stops at the same fighter, after it the run starts there
+    assert backfill(session_factory).lookup_failed == 1
+    api_cache.clear()
+    progress = backfill(session_factory)
+    assert (progress.processed, progress.enriched, progress.lookup_failed, progress.error) == (2, 2, 0, None)
+    assert not os.path.exists(settings_backfill.backfill_state_path)
+    with session_factory() as db:
+        assert db.get(FighterFeatures, 4).wins_by_ko == 7
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+
+    async def acquire_all():
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        return time.monotonic() - start
+
+    assert asyncio.run(acquire_all()) >= 0.09  # the burst token, then 5 more at 20 ms each
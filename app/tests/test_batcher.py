@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.services.batcher import PredictionBatcher
+
+
+def test_concurrent_requests_share_forward_pass():
+    forward_sizes = []
+
+    def predict(model_input: np.ndarray) -> list[float]:
+        forward_sizes.append(model_input.shape[0])
+        return model_input[:, 0].tolist()
+
+    batcher = PredictionBatcher(predict, max_batch_size=8, max_wait_ms=50, max_queue_size=100)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit(np.full((1, 14), float(i), dtype=np.float32)) for i in range(20)))
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    # every caller gets its own row back
+    assert results == [float(i) for i in range(20)]
+    assert forward_sizes == [8, 8, 4]
+    assert batcher.stats.batches == 3
+    assert batcher.stats.requests == 20
+    assert batcher.stats.batch_sizes == {8: 2, 4: 1}
+
+
+def test_errors_are_propagated_to_every_caller():
+    def predict(model_input: np.ndarray) -> list[float]:
+        raise RuntimeError("model exploded")
+
+    batcher = PredictionBatcher(predict, max_batch_size=4, max_wait_ms=5, max_queue_size=10)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit(np.zeros((1, 14), dtype=np.float32)) for _ in range(3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_full_queue_is_rejected():
+    batcher = PredictionBatcher(lambda x: [0.5] * x.shape[0], max_batch_size=4, max_wait_ms=5, max_queue_size=2)
+
+    async def run():
+        tasks = [asyncio.ensure_future(batcher.submit(np.zeros((1, 14), dtype=np.float32))) for _ in range(2)]
+        await asyncio.sleep(0)  # both queued, worker has not run yet
+        with pytest.raises(HTTPException) as exc:
+            await batcher.submit(np.zeros((1, 14), dtype=np.float32))
+        await asyncio.gather(*tasks)
+        await batcher.stop()
+        return exc.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503
+    assert batcher.stats.rejected == 1
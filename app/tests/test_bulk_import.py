@@ -0,0 +1,146 @@
+import io
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from sqlalchemy import StaticPool, create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.models import Base, CardsDB, FightersDB, FightsDB
+from app.db.session import get_db
+from app.services.bulk_import import import_stream
+
+FIGHTERS_CSV = """name,division,birth_date,wins,losses,draws,height,weight,reach
+Jon Jones,heavyweight,1987-07-19,27,1,,1.93,112,215
+Tom Aspinall,heavyweight,1993-04-11,15,3,0,1.96,116,
+Bad Row,heavyweight,1990-01-01,ten,1,,1.8,100,
+Alex Pereira,light_heavyweight,1987-07-07,12,2,,1.93,93,200
+"""
+
+
+# the import commits every batch, it gets a database of its own instead of the rolled back test session
+@pytest.fixture
+def sessions():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(sessions):
+    with sessions() as db:
+        yield db
+
+
+def test_import_fighters_csv_with_row_errors(sessions, db_session: Session):
+    report = import_stream("fighters", io.BytesIO(FIGHTERS_CSV.encode()), "csv", session_factory=sessions, batch_size=2)
+
+    assert (report.rows, report.inserted, report.failed, report.batches) == (4, 3, 1, 2)
+    assert report.errors[0]["line"] == 4
+    assert report.errors[0]["error"].startswith("wins:")
+    jones = db_session.scalars(select(FightersDB).where(FightersDB.name == "Jon Jones")).one()
+    assert (jones.wins, jones.draws, jones.reach) == (27, None, 215)
+
+    # importing again updates in place, or leaves the rows alone with skip
+    again = import_stream("fighters", io.BytesIO(FIGHTERS_CSV.replace(",27,", ",28,").encode()), "csv", session_factory=sessions)
+    assert (again.inserted, again.updated) == (0, 3)
+    skipped = import_stream("fighters", io.BytesIO(FIGHTERS_CSV.encode()), "csv", "skip", session_factory=sessions)
+    assert (skipped.inserted, skipped.updated, skipped.skipped) == (0, 0, 3)
+    db_session.expire_all()
+    assert db_session.get(FightersDB, jones.id).wins == 28
+    assert db_session.scalar(select(func.count()).select_from(FightersDB)) == 3
+
+
+def test_import_fights_jsonl_resolves_names(sessions, db_session: Session, add_fighter):
+    add_fighter(1, "Red Fighter")
+    add_fighter(2, "Blue Fighter")
+    db_session.add(CardsDB(id=1, card_name="Import Card", card_date=date(2020, 1, 1), card_number=1))
+    db_session.commit()
+
+    fight = {
+        "rounds": 3,
+        "division": "lightweight",
+        "card": "Import Card",
+        "red_corner": "Red Fighter",
+        "blue_corner": "Blue Fighter",
+        "winner": "Red Fighter",
+        "fight_date": "2020-01-01",
+    }
+    lines = [
+        json.dumps(fight),
+        "{not json",
+        json.dumps({**fight, "blue_corner": "Nobody Known"}),
+        "",
+        json.dumps({**fight, "method": "tko", "round_finish": 2}),  # same fight again, the later one wins
+    ]
+    report = import_stream("fights", io.BytesIO("\n".join(lines).encode()), "jsonl", session_factory=sessions)
+
+    assert (report.rows, report.inserted, report.skipped, report.failed) == (4, 1, 1, 2)
+    assert [(e["line"], e["error"]) for e in report.errors][1] == (3, "unknown fighter 'Nobody Known'")
+    (stored,) = db_session.scalars(select(FightsDB)).all()
+    assert (stored.card, stored.red_corner, stored.blue_corner, stored.winner, stored.round_finish) == (1, 1, 2, 1, 2)
+
+    # the same fight is found by date and corners on a second import
+    again = import_stream("fights", io.BytesIO(json.dumps({**fight, "winner": "Blue Fighter"}).encode()), "jsonl", session_factory=sessions)
+    assert (again.inserted, again.updated) == (0, 1)
+    db_session.expire_all()
+    assert db_session.get(FightsDB, stored.id).winner == 2
+
+
+def test_import_fights_tells_apart_cards_of_the_same_name(sessions, db_session: Session, add_fighter):
+    add_fighter(1, "Red Fighter")
+    add_fighter(2, "Blue Fighter")
+    db_session.add_all(
+        [
+            CardsDB(id=1, card_name="Fight Night", card_date=date(2020, 1, 1), card_number=1),
+            CardsDB(id=2, card_name="Fight Night", card_date=date(2021, 6, 5), card_number=2),
+        ]
+    )
+    db_session.commit()
+
+    fight = {"rounds": 3, "division": "lightweight", "card": "Fight Night", "red_corner": "Red Fighter", "blue_corner": "Blue Fighter"}
+    lines = [
+        json.dumps({**fight, "fight_date": "2021-06-05"}),
+        json.dumps({**fight, "fight_date": "2020-01-02", "card_date": "2020-01-01"}),  # past midnight, the card date tells
+        json.dumps({**fight, "fight_date": "2022-01-01"}),
+        json.dumps({**fight, "fight_date": "2022-01-01", "card_date": "2022-01-01"}),
+    ]
+    report = import_stream("fights", io.BytesIO("\n".join(lines).encode()), "jsonl", session_factory=sessions)
+
+    assert (report.inserted, report.failed) == (2, 2)
+    assert [(e["line"], e["error"]) for e in report.errors] == [
+        (3, "ambiguous card 'Fight Night', 2 cards share the name and none is on 2022-01-01"),
+        (4, "no card 'Fight Night' on 2022-01-01"),
+    ]
+    stored = db_session.scalars(select(FightsDB).order_by(FightsDB.fight_date)).all()
+    assert [(fight.fight_date, fight.card) for fight in stored] == [(date(2020, 1, 2), 1), (date(2021, 6, 5), 2)]
+
+
+@pytest.fixture
+def client(sessions):
+    def override_get_db():
+        with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def test_import_upload_endpoint(client: TestClient, db_session: Session):
+    cards = "card_name,card_date,card_number\nUFC 300,2024-04-13,300\nUFC 301,2024-05-04,300\nUFC,2024-06-01,\n"
+    response = client.post("/import/cards", files={"file": ("cards.csv", cards.encode(), "text/csv")})
+
+    assert response.status_code == 200
+    report = response.json()
+    # the card number clash only shows at the database, the batch is retried row by row
+    assert (report["inserted"], report["failed"]) == (1, 2)
+    assert {e["line"] for e in report["errors"]} == {3, 4}
+    assert db_session.scalars(select(CardsDB.card_name)).all() == ["UFC 300"]
+
+    assert client.post("/import/cards", files={"file": ("cards.txt", b"", "text/plain")}).status_code == 400
+    assert client.post("/import/events", files={"file": ("cards.csv", cards.encode(), "text/csv")}).status_code == 422
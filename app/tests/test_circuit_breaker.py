@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import api_services
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.rate_limit import TokenBucket
+
+
+def test_breaker_opens_on_failures_and_closes_after_a_good_trial():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window_seconds=60, slow_call_seconds=1.0, open_seconds=0.05)
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(0.01, ok)
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.short_circuited == 1
+
+    time.sleep(0.06)
+    assert breaker.allow()  # the trial
+    assert not breaker.allow()  # one at a time
+    breaker.record(0.01, False)
+    assert (breaker.state, breaker.trips) == ("open", 2)
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(0.01, True)
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window_seconds=60, slow_call_seconds=0.5, open_seconds=30)
+    breaker.record(0.6, True)
+    breaker.record(0.7, True)
+
+    assert breaker.state == "open"
+    assert breaker.stats()["latency"]["buckets"]["le_1"] == 2
+
+
+# local stand-in for the api, answers with the next status of the script, after waiting delay seconds
+@pytest.fixture
+def fake_api(monkeypatch):
+    calls = []
+    script = {"statuses": [], "delay": 0.0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["name"])
+        await asyncio.sleep(script["delay"])
+        status_code = script["statuses"].pop(0) if script["statuses"] else 200
+        return httpx.Response(status_code, json=[{"name": request.url.params["name"]}] if status_code == 200 else {})
+
+    monkeypatch.setattr(api_services.settings_api, "api_retry_backoff_seconds", 0.01)
+    return calls, script, handler
+
+
+def lookup(handler, *names):
+    async def run():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        try:
+            return [await api_services.get_external_fighter_features(name) for name in names]
+        finally:
+            await api_services.close_api_client()
+
+    return asyncio.run(run())
+
+
+def test_5xx_is_retried(fake_api):
+    calls, script, handler = fake_api
+    script["statuses"] = [503, 502]
+
+    assert lookup(handler, "Jon Jones") == [{"name": "Jon Jones"}]
+    assert calls == ["Jon Jones"] * 3
+
+
+def test_open_breaker_short_circuits_without_caching(fake_api, api_breaker, api_cache, monkeypatch):
+    calls, script, handler = fake_api
+    monkeypatch.setattr(api_services.settings_api, "api_retries", 0)
+    api_breaker.min_calls = 3
+    script["statuses"] = [500] * 3
+
+    assert lookup(handler, "Fighter One", "Fighter Two", "Fighter Three", "Fighter Four") == [None] * 4
+    assert calls == ["Fighter One", "Fighter Two", "Fighter Three"]  # the fourth never reached the api
+    assert (api_breaker.state, api_breaker.trips, api_breaker.short_circuited) == ("open", 1, 1)
+    assert api_cache.get(api_services.fighter_cache_key("Fighter Four")) == (False, None)
+    assert api_cache.failure(api_services.fighter_cache_key("Fighter Four")) is None  # the breaker answers those
+
+
+def test_latency_budget_cuts_off_slow_calls(fake_api, api_breaker, monkeypatch):
+    calls, script, handler = fake_api
+    monkeypatch.setattr(api_services.settings_api, "api_latency_budget_seconds", 0.1)
+    script["delay"] = 1.0
+
+    start = time.monotonic()
+    assert lookup(handler, "Jon Jones") == [None]
+    assert time.monotonic() - start < 0.5
+    assert api_breaker.failures == 1
+    assert api_breaker.latency.count == 1
+
+
+# a lookup waiting on the backfill limiter has not taken the half open trial, cancelling it leaves the trial free
+def test_limiter_wait_does_not_hold_the_trial(fake_api, api_breaker, api_cache, monkeypatch):
+    calls, script, handler = fake_api
+    monkeypatch.setattr(api_services.settings_api, "api_latency_budget_seconds", 0.05)
+    api_breaker.open_seconds = 0.01
+    api_breaker._trip(time.monotonic())
+    time.sleep(0.02)
+
+    async def run():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        try:
+            limiter = TokenBucket(rate=5, capacity=1)
+            await limiter.acquire()  # the next token is 0.2s away, longer than the budget
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.1):
+                    await api_services.get_external_fighter_features("Jon Jones", limiter)
+            assert (api_breaker.state, api_breaker._trial_running) == ("half_open", False)
+            return await api_services.get_external_fighter_features("Jon Jones", limiter)
+        finally:
+            await api_services.close_api_client()
+
+    # the wait on the limiter is not spent from the latency budget, the lookup still gets its answer
+    assert asyncio.run(run()) == {"name": "Jon Jones"}
+    assert api_breaker.state == "closed"
+
+
+def test_budget_timeout_is_cached_as_a_failure_not_a_miss(fake_api, api_cache, monkeypatch):
+    calls, script, handler = fake_api
+    monkeypatch.setattr(api_services.settings_api, "api_latency_budget_seconds", 0.05)
+    script["delay"] = 1.0
+
+    assert lookup(handler, "Jon Jones") == [None]
+    assert api_cache.get(api_services.fighter_cache_key("Jon Jones")) == (False, None)
+    assert api_cache.failure(api_services.fighter_cache_key("Jon Jones")) is not None
+
+
+def test_breaker_stats_endpoint(client: TestClient, api_breaker):
+    api_breaker.record(0.2, True)
+
+    stats = client.get("/stats/api_breaker").json()
+    assert stats["state"] == "closed"
+    assert stats["latency"]["count"] == 1
+    assert stats["latency"]["buckets"]["le_0.25"] == 1
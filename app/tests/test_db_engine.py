@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc, text
+
+from app.db import engine as db_engine
+from app.db.engine import TimedQueuePool, create_app_engine, pool_stats
+from app.db.settings import settings_database
+
+
+def test_sqlite_pragmas_on_connect(tmp_path):
+    engine = create_app_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()  # noqa: E731
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == settings_database.db_sqlite_busy_timeout_ms
+        assert pragma("cache_size") == settings_database.db_sqlite_cache_size
+    assert isinstance(engine.pool, TimedQueuePool)
+    engine.dispose()
+
+
+def test_pool_checkout_waits_and_timeouts(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_database, "db_pool_size", 1)
+    monkeypatch.setattr(settings_database, "db_max_overflow", 0)
+    monkeypatch.setattr(settings_database, "db_pool_timeout_seconds", 0.1)
+    engine = create_app_engine(f"sqlite:///{tmp_path / 'app.db'}")
+
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+    assert pool_stats(engine)["saturation"] == 1.0
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    # a waiting checkout gets the connection once it is returned
+    threading.Timer(0.05, held.close).start()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    stats = pool_stats(engine)
+    assert stats["profile"] == "sqlite"
+    assert stats["timeouts"] == 1
+    assert stats["peak_checked_out"] == 1
+    assert stats["checkout_wait"]["count"] == 3
+    assert stats["checkout_wait"]["max_seconds"] >= 0.05
+    assert stats["saturation"] == 0.0
+    engine.dispose()
+
+
+def test_postgres_profile(monkeypatch):
+    calls = []
+    monkeypatch.setattr(db_engine, "create_engine", lambda url, **kwargs: calls.append((url, kwargs)))
+    monkeypatch.setattr(settings_database, "db_statement_timeout_ms", 2000)
+
+    create_app_engine("postgresql+psycopg2://user:secret@db/ufc")
+    ((_, kwargs),) = calls
+    assert kwargs["poolclass"] is TimedQueuePool
+    assert kwargs["pool_size"] == settings_database.db_pool_size
+    assert kwargs["max_overflow"] == settings_database.db_max_overflow
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["pool_recycle"] == settings_database.db_pool_recycle_seconds
+    assert kwargs["connect_args"] == {"options": "-c statement_timeout=2000"}
+
+
+def test_db_stats_endpoint(client: TestClient):
+    response = client.get("/stats/db")
+    assert response.status_code == 200
+    assert response.json()["dialect"] == "sqlite"
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.models import FighterFeatures
+from app.services import api_services, feature_refresh
+from app.services.feature_store import feature_matrix
+
+FIGHTER = {"Records": {"Sig. Str. Landed": "6.1", "Striking accuracy": "55%"}, "Win Stats": {"Wins by Knockout": 12, "Wins by Submission": 1}}
+
+
+# local stand-in for the api, records the names it was asked for. every lookup takes delay seconds
+@pytest.fixture
+def api(monkeypatch):
+    api = SimpleNamespace(names=[], delay=0.0)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        api.names.append(request.url.params["name"])
+        await asyncio.sleep(api.delay)
+        return httpx.Response(200, json=[] if request.url.params["name"] == "Nobody Known" else [FIGHTER])
+
+    monkeypatch.setattr(feature_refresh.settings_features, "feature_fetch_budget_seconds", 1.0)
+    api_services.open_api_client(httpx.MockTransport(handler))  # before the app lifespan opens the real one
+    yield api
+    asyncio.run(api_services.close_api_client())
+
+
+def wait_for_refreshes(timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while feature_refresh._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fresh_features_never_call_the_api(api, client: TestClient, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+
+    assert client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2}).status_code == 200
+    assert api.names == []
+
+
+def test_stale_features_are_served_and_refreshed_in_the_background(api, client: TestClient, db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    db_session.get(FighterFeatures, 1).updated_at = datetime.now() - timedelta(days=60)
+    db_session.flush()
+    api.delay = 0.5
+
+    start = time.monotonic()
+    stale = client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2})
+    assert stale.status_code == 200
+    assert time.monotonic() - start < 0.5  # did not wait for the api
+    assert api.names == ["Fighter One"]
+
+    wait_for_refreshes()
+    assert feature_matrix.stale([1], feature_refresh.stale_cutoff()) == []
+    assert db_session.get(FighterFeatures, 1).wins_by_ko == 12
+
+    fresh = client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2})
+    assert fresh.json()["red_corner_win_probability"] != stale.json()["red_corner_win_probability"]
+    assert api.names == ["Fighter One"]
+
+
+def test_missing_features_are_fetched_inline(api, client: TestClient, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two", with_features=False)
+    add_fighter(3, "Nobody Known", with_features=False)
+
+    assert client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2}).status_code == 200
+    assert api.names == ["Fighter Two"]
+
+    response = client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 3})
+    assert response.status_code == 400
+    assert client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 99}).status_code == 404
+
+
+def test_slow_fetch_fails_fast_and_finishes_in_the_background(api, client: TestClient, model, add_fighter, monkeypatch):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two", with_features=False)
+    monkeypatch.setattr(feature_refresh.settings_features, "feature_fetch_budget_seconds", 0.1)
+    api.delay = 0.5
+
+    start = time.monotonic()
+    assert client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2}).status_code == 504
+    assert time.monotonic() - start < 0.5
+
+    wait_for_refreshes()
+    assert client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2}).status_code == 200
+    assert api.names == ["Fighter Two"]
@@ -0,0 +1,86 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import StaticPool, create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, FighterFeatures, FightersDB
+from app.services.feature_store import FEATURE_ORDER, FeatureMatrix, feature_matrix
+from app.services.map_features import update_fighter_features
+
+API_DATA = {
+    "Records": {
+        "Sig. Str. Landed": "4.5",
+        "Striking accuracy": "51%",
+        "Submission avg": "0.3",
+        "Takedown avg": "1.2",
+        "Takedown Accuracy": "40%",
+    },
+    "Win Stats": {"Wins by Knockout": 7, "Wins by Submission": 2},
+}
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with factory() as db:
+        db.add(FightersDB(id=1, name="Fighter One", division="lightweight", birth_date=date(1995, 1, 1), wins=10, losses=1, height=1.75, weight=70.0))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def test_commit_updates_matrix_incrementally(session_factory):
+    with session_factory() as db:
+        feature_matrix.load(db)
+        assert len(feature_matrix) == 0
+
+        update_fighter_features(db, 1, API_DATA)
+        assert db.info == {}
+
+    row = feature_matrix.index[1]
+    assert feature_matrix.row_values(row).tolist() == pytest.approx([4.5, 51.0, 0.3, 1.2, 40.0, 7, 2])
+
+    with session_factory() as db:
+        update_fighter_features(db, 1, {**API_DATA, "Win Stats": {"Wins by Knockout": 8, "Wins by Submission": 2}})
+    assert feature_matrix.row_values(feature_matrix.index[1])[FEATURE_ORDER.index("wins_by_ko")] == 8
+
+    with session_factory() as db:
+        db.delete(db.get(FighterFeatures, 1))
+        db.commit()
+    assert 1 not in feature_matrix.index
+
+
+def test_rollback_leaves_matrix_untouched(session_factory):
+    with session_factory() as db:
+        feature_matrix.load(db)
+        db.add(FighterFeatures(fighter_id=1, wins_by_ko=3))
+        db.flush()
+        db.rollback()
+    assert 1 not in feature_matrix.index
+
+
+def test_bulk_delete_forces_reload(session_factory):
+    with session_factory() as db:
+        update_fighter_features(db, 1, API_DATA)
+        feature_matrix.load(db)
+        db.execute(delete(FighterFeatures))
+        db.commit()
+        assert not feature_matrix.loaded
+        assert feature_matrix.rows_for([1], db) == {}
+
+
+def test_remove_keeps_rows_contiguous():
+    matrix = FeatureMatrix(initial_capacity=2)
+    for fighter_id in (10, 20, 30):
+        matrix.upsert(fighter_id, dict.fromkeys(FEATURE_ORDER, float(fighter_id)))
+    assert matrix.stats()["capacity"] == 4
+
+    matrix.remove(10)
+    assert matrix.fighter_ids == [30, 20]
+    pair = matrix.pair_input([matrix.index[30]], [matrix.index[20]])
+    assert pair.dtype == np.float32
+    assert pair.tolist() == [[30.0] * 7 + [20.0] * 7]
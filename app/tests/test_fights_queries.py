@@ -0,0 +1,138 @@
+import os
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, or_, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Base, CardsDB, FightsDB
+from app.schemas.fighters import DivisionEnum
+from app.schemas.fights import RoundsEnum
+from app.services.fights import fighter_fights_stmt
+from app.services.pagination import encode_cursor
+
+
+@pytest.fixture
+def add_fights(db_session, add_fighter):
+    db_session.add(CardsDB(id=1, card_name="Test Card", card_date=date(2025, 1, 1), card_number=1))
+    for i in range(1, 11):
+        add_fighter(i, f"Fighter {i:02d}", with_features=False)
+
+    def add(n: int):
+        for i in range(n):
+            red, blue = i % 10 + 1, (i + 3) % 10 + 1
+            db_session.add(
+                FightsDB(
+                    rounds=RoundsEnum(3),
+                    division=DivisionEnum("lightweight"),
+                    card=1,
+                    red_corner=red,
+                    blue_corner=blue,
+                    favorite=red,
+                    winner=blue,
+                    fight_date=date(2025, 1, 1),
+                )
+            )
+        db_session.flush()
+        db_session.expunge_all()  # nothing cached in the identity map, every fighter has to come from a query
+
+    return add
+
+
+# statements sent to the database inside the block
+@contextmanager
+def count_statements(db_session):
+    statements = []
+    engine = db_session.get_bind().engine
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def test_fights_list_statements_do_not_grow_with_rows(client: TestClient, db_session, add_fights):
+    counts = []
+    for n in (2, 40):
+        add_fights(n)
+        with count_statements(db_session) as statements:
+            response = client.get("/fights/")
+        assert response.status_code == 200
+        assert "Fighter 04" in response.text
+        counts.append(len(statements))
+
+    assert counts == [1, 1]
+
+
+def test_fight_detail_is_one_statement(client: TestClient, db_session, add_fights):
+    add_fights(1)
+    fight_id = db_session.query(FightsDB.id).scalar()
+    db_session.expunge_all()
+
+    with count_statements(db_session) as statements:
+        response = client.get(f"/fights/{fight_id}/details")
+    assert response.status_code == 200
+    assert "Fighter 01 vs Fighter 04" in response.text
+    assert len(statements) == 1
+
+
+def test_fighter_fights_pages_both_corners(client: TestClient, db_session, add_fights):
+    add_fights(40)  # fighter 1 is red in 4 fights and blue in 4
+    ids, cursor = [], None
+    while True:
+        with count_statements(db_session) as statements:
+            page = client.get("/fighters/1/fights", params={"format": "json", "limit": 3, "cursor": cursor}).json()
+        assert len(statements) == 2  # the fighter, then the page with its fighters
+        ids += [fight["id"] for fight in page["items"]]
+        assert all(1 in (fight["red_corner"], fight["blue_corner"]) for fight in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = db_session.scalars(
+        select(FightsDB.id).where(or_(FightsDB.red_corner == 1, FightsDB.blue_corner == 1)).order_by(FightsDB.fight_date.desc(), FightsDB.id.desc())
+    ).all()
+    assert ids == expected
+    assert len(ids) == 8
+
+    fragment = client.get("/fighters/1/fights", params={"limit": 3})
+    assert fragment.text.count("<tr>") == 3
+    assert "Load more" in fragment.text
+    assert client.get("/fighters/99/fights").status_code == 404
+    assert client.get("/fighters/1/fights", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def fighter_fights_sql(db_session) -> str:
+    stmt = fighter_fights_stmt(1, encode_cursor((date(2025, 1, 1), 30)), 50)
+    stmt = stmt.order_by(FightsDB.fight_date.desc(), FightsDB.id.desc()).limit(51)
+    return str(stmt.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+
+
+# each corner is read on its own index, the fights come by primary key. never a scan of the whole table
+def test_fighter_fights_plan_sqlite(db_session, add_fights):
+    add_fights(40)
+    plan = [row[-1] for row in db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {fighter_fights_sql(db_session)}")]
+    assert any("ix_fights_red_corner_fight_date_id" in step for step in plan)
+    assert any("ix_fights_blue_corner_fight_date_id" in step for step in plan)
+    assert not [step for step in plan if step.startswith("SCAN") and "fights" in step and "USING" not in step]
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL is not set")
+def test_fighter_fights_plan_postgres():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(bind=engine)
+    try:
+        with engine.connect() as conn, Session(bind=conn) as db:
+            conn.exec_driver_sql("SET enable_seqscan = off")  # a small table is read whole otherwise, whatever the indexes
+            plan = "\n".join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {fighter_fights_sql(db)}"))
+            conn.rollback()
+    finally:
+        engine.dispose()
+    assert "ix_fights_red_corner_fight_date_id" in plan
+    assert "ix_fights_blue_corner_fight_date_id" in plan
@@ -0,0 +1,82 @@
+import copy
+import os
+import subprocess
+import sys
+
+import numpy as np
+import torch
+
+from app.services import predictor, torch_backend
+from app.services.model_export import export_numpy, export_torchscript, parity_report
+from app.services.torch_backend import FightPredictor, TorchPredictorRunner
+
+
+# matchups in the ranges of the real features: per fight averages, percentages and win counts
+def reference_input(n_matchups: int = 500) -> np.ndarray:
+    generator = torch.Generator().manual_seed(1)
+    corner = torch.cat(
+        (
+            torch.rand((n_matchups, 1), generator=generator) * 8,
+            torch.rand((n_matchups, 1), generator=generator) * 70,
+            torch.rand((n_matchups, 1), generator=generator) * 2,
+            torch.rand((n_matchups, 1), generator=generator) * 5,
+            torch.rand((n_matchups, 1), generator=generator) * 70,
+            torch.randint(0, 15, (n_matchups, 2), generator=generator).float(),
+        ),
+        dim=1,
+    )
+    return torch.cat((corner, corner.roll(1, dims=0)), dim=1).numpy()
+
+
+def test_torchscript_export_matches_eager(tmp_path, monkeypatch):
+    torch.manual_seed(0)
+    eager = FightPredictor(input_dim=14).eval()
+    path = export_torchscript(eager, str(tmp_path / "predictor.torchscript.pt"))
+
+    monkeypatch.setattr(predictor.settings_predictor, "predictor_backend", "torchscript")
+    monkeypatch.setattr(predictor, "TORCHSCRIPT_PATH", path)
+    scripted = predictor.load_model()
+
+    model_input = np.random.default_rng(0).standard_normal((64, 14), dtype=np.float32)
+    np.testing.assert_allclose(scripted(model_input), TorchPredictorRunner(eager)(model_input), rtol=1e-5, atol=1e-6)
+
+
+def test_warm_up_runs_every_batch_size(model, monkeypatch):
+    seen = []
+    monkeypatch.setattr(model, "forward", lambda x: seen.append(x.shape[0]) or torch.zeros((x.shape[0], 1)))
+    predictor.warm_up_model([1, 32, 1024])
+    assert seen == [1, 1, 32, 32, 1024, 1024]
+
+
+def test_quantized_model_parity(monkeypatch):
+    torch.manual_seed(0)
+    eager = FightPredictor(input_dim=14).eval()
+    monkeypatch.setattr(predictor.settings_predictor, "predictor_backend", "quantized")
+    monkeypatch.setattr(torch_backend, "load_eager_model", lambda path, input_dim: copy.deepcopy(eager))
+    monkeypatch.setitem(predictor.metadata, "version", "test")  # no checkpoint file to take the version from
+    quantized = predictor.load_model()
+
+    report = parity_report(TorchPredictorRunner(eager), quantized, reference_input())
+    assert report["max_abs_diff"] < 0.03
+    assert report["mean_abs_diff"] < 0.01
+    assert report["winner_agreement"] >= 0.99
+
+
+def test_numpy_backend_matches_eager(tmp_path, monkeypatch):
+    torch.manual_seed(0)
+    eager = FightPredictor(input_dim=14).eval()
+    path = export_numpy(eager, str(tmp_path / "predictor.npz"))
+
+    monkeypatch.setattr(predictor.settings_predictor, "predictor_backend", "numpy")
+    monkeypatch.setattr(predictor, "NUMPY_PATH", path)
+    numpy_model = predictor.load_model()
+
+    model_input = reference_input()
+    np.testing.assert_allclose(numpy_model(model_input), TorchPredictorRunner(eager)(model_input), rtol=1e-5, atol=1e-6)
+    assert numpy_model(model_input[:0]).shape == (0,)
+
+
+def test_numpy_backend_does_not_import_torch():
+    # the whole app, routes and batcher included
+    code = "import sys, main; assert 'torch' not in sys.modules, 'torch imported'"
+    subprocess.run([sys.executable, "-c", code], check=True, env={**os.environ, "PREDICTOR_BACKEND": "numpy"})
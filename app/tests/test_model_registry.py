@@ -0,0 +1,92 @@
+import json
+import os
+import weakref
+
+import numpy as np
+import pytest
+import torch
+from fastapi.testclient import TestClient
+
+from app.services import predictor
+from app.services.model_registry import ModelRegistry
+from app.services.torch_backend import FightPredictor
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path))
+    monkeypatch.setattr(predictor, "registry", registry)
+    monkeypatch.setattr(predictor.model_state, "served", None)
+    monkeypatch.setattr(predictor.settings_predictor, "predictor_warmup_batch_sizes", [1])
+    yield registry
+    predictor.prediction_cache.clear()
+
+
+# randomly initialized checkpoint, each seed predicts differently
+def publish(registry: ModelRegistry, version: str, seed: int):
+    directory = os.path.join(registry.root, version)
+    os.makedirs(directory)
+    torch.manual_seed(seed)
+    torch.save({"model_state_dict": FightPredictor(input_dim=14).state_dict()}, os.path.join(directory, "predictor.pt"))
+    with open(os.path.join(directory, "predictor_meta.json"), "w") as f:
+        json.dump({"input_dim": 14}, f)
+
+
+def test_reload_swaps_version_and_releases_old_model(registry, client: TestClient, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    payload = {"red_corner_id": 1, "blue_corner_id": 2}
+    publish(registry, "v0001", seed=1)
+
+    first = client.post("/fights/predict", json=payload).json()
+    assert first["model_version"] == "v0001-eager"
+    old_model = weakref.ref(predictor.model_state.served)
+
+    publish(registry, "v0002", seed=2)
+    assert client.get("/models/").json()["versions"] == ["v0001", "v0002"]
+    assert client.post("/models/reload").json() == {"served": "v0002-eager"}
+
+    second = client.post("/fights/predict", json=payload).json()
+    assert second["model_version"] == "v0002-eager"
+    assert second["red_corner_win_probability"] != first["red_corner_win_probability"]
+    assert old_model() is None
+
+
+def test_old_model_serves_while_new_one_loads(registry, monkeypatch):
+    publish(registry, "v0001", seed=1)
+    publish(registry, "v0002", seed=2)
+    predictor.reload_model("v0001")
+
+    load_model = predictor.load_model
+    seen_during_load = []
+
+    def observed_load(version):
+        seen_during_load.append(predictor.predict_win_probabilities_versioned(np.zeros((1, 14), dtype=np.float32))[0][1])
+        return load_model(version)
+
+    monkeypatch.setattr(predictor, "load_model", observed_load)
+    predictor.reload_model("v0002")
+    assert seen_during_load == ["v0001-eager"]
+    assert predictor.model_state.served.version == "v0002-eager"
+
+
+def test_failed_reload_keeps_served_model(registry, client: TestClient):
+    publish(registry, "v0001", seed=1)
+    predictor.reload_model()
+
+    response = client.post("/models/reload", params={"version": "v0009"})
+    assert response.status_code == 404
+    assert predictor.model_state.served.version == "v0001-eager"
+
+
+def test_reload_rejects_versions_outside_the_registry(registry, client: TestClient):
+    publish(registry, "v0001", seed=1)
+    predictor.reload_model()
+
+    # the parent directory has a checkpoint and metadata of its own
+    publish(ModelRegistry(os.path.dirname(registry.root)), os.path.basename(registry.root) + "-outside", seed=2)
+    for version in ("..", "../" + os.path.basename(registry.root) + "-outside", "v0001/.."):
+        assert client.post("/models/reload", params={"version": version}).status_code == 404
+    with pytest.raises(ValueError):
+        registry.artifact_path("..", "eager")
+    assert predictor.model_state.served.version == "v0001-eager"
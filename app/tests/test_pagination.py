@@ -0,0 +1,108 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.db.models import CardsDB, FightsDB
+from app.schemas.fighters import DivisionEnum
+from app.schemas.fights import RoundsEnum
+from app.services.fights import FIGHT_SORTS
+from app.services.pagination import after
+
+
+@pytest.fixture
+def fighters(add_fighter):
+    for i, name in enumerate(["Zabit Magomed", "Alex Pereira", "Jon Jones", "Islam Makhachev", "Bo Nickal", "Ilia Topuria", "Max Holloway"], start=1):
+        add_fighter(i, name, with_features=False, division="middleweight" if i % 2 else "lightweight")
+
+
+@pytest.fixture
+def fights(db_session, fighters):
+    db_session.add(CardsDB(id=1, card_name="Test Card", card_date=date(2025, 1, 1), card_number=1))
+    # three fights share each date, the id breaks the ties
+    for i in range(9):
+        db_session.add(
+            FightsDB(
+                id=i + 1,
+                rounds=RoundsEnum(3),
+                division=DivisionEnum("lightweight" if i % 3 else "middleweight"),
+                card=1,
+                red_corner=1,
+                blue_corner=2,
+                fight_date=date(2025, 1 + i // 3, 1),
+            )
+        )
+    db_session.flush()
+
+
+def walk(client: TestClient, url: str, **params) -> list[list[dict]]:
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url, params={**params, "format": "json", **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_fighters_pages_in_id_and_name_order(client: TestClient, fighters):
+    pages = walk(client, "/fighters/", limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [f["id"] for page in pages for f in page] == list(range(1, 8))
+
+    names = [f["name"] for page in walk(client, "/fighters/", limit=2, sort="name") for f in page]
+    assert names == sorted(names)
+
+    middleweights = [f["id"] for page in walk(client, "/fighters/", limit=2, division="middleweight") for f in page]
+    assert middleweights == [1, 3, 5, 7]
+
+
+def test_fights_newest_first_without_gaps_on_equal_dates(client: TestClient, fights):
+    ids = [f["id"] for page in walk(client, "/fights/", limit=2) for f in page]
+    assert ids == [9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+    filtered = [f["id"] for page in walk(client, "/fights/", limit=2, division="lightweight", date_from="2025-02-01") for f in page]
+    assert filtered == [9, 8, 6, 5]
+
+
+def test_htmx_load_more_returns_rows_only(client: TestClient, fights):
+    first = client.get("/fights/", params={"limit": 4})
+    assert "<h1>All Fights</h1>" in first.text
+    assert first.text.count('hx-trigger="revealed, click"') == 1
+
+    cursor = client.get("/fights/", params={"limit": 4, "format": "json"}).json()["next_cursor"]
+    rows = client.get("/fights/", params={"limit": 4, "cursor": cursor}, headers={"HX-Request": "true"})
+    assert "<h1>" not in rows.text
+    assert rows.text.count("Zabit Magomed vs Alex Pereira") == 4
+    assert "cursor=" in rows.text  # one more page
+
+    assert client.get("/fights/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_cards_date_range(client: TestClient, db_session):
+    for i in range(1, 6):
+        db_session.add(CardsDB(id=i, card_name=f"Card {i:03d}", card_date=date(2025, i, 1), card_number=i))
+    db_session.flush()
+
+    pages = walk(client, "/cards/", limit=2, date_from="2025-02-01", date_to="2025-04-01")
+    assert [c["id"] for page in pages for c in page] == [4, 3, 2]
+    assert client.get("/cards/", params={"date_from": "2030-01-01", "format": "json"}).json() == {"items": [], "next_cursor": None}
+
+
+# the page is read in index order, no sort of the matching rows, so its cost does not grow with the table
+@pytest.mark.parametrize("division", [None, DivisionEnum.lightweight])
+def test_fights_page_query_reads_the_index_in_order(db_session, division):
+    columns, descending = FIGHT_SORTS["date"]
+    stmt = select(FightsDB.id).where(after(columns, (date(2025, 2, 1), 5), descending))
+    if division:
+        stmt = stmt.where(FightsDB.division == division)
+    stmt = stmt.order_by(*(column.desc() for column in columns)).limit(50)
+
+    sql = str(stmt.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = " ".join(row[-1] for row in db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    assert "ix_fights_" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,141 @@
+import json
+import struct
+from datetime import date
+
+import numpy as np
+import pytest
+import torch
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db.models import CardsDB, FighterFeatures, FightsDB
+from app.services import predictor
+from app.services.feature_store import FEATURE_ORDER
+
+
+def test_predict_batch_matches_single_pass(client: TestClient, db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    add_fighter(3, "Fighter Three")
+
+    matchups = [(1, 2), (2, 3), (3, 1)]
+    response = client.post("/fights/predict_batch", json={"matchups": [{"red_corner_id": r, "blue_corner_id": b} for r, b in matchups]})
+    assert response.status_code == 200
+
+    predictions = response.json()["predictions"]
+    assert [(p["red_corner_id"], p["blue_corner_id"]) for p in predictions] == matchups
+
+    for (red_id, blue_id), prediction in zip(matchups, predictions, strict=True):
+        red, blue = db_session.get(FighterFeatures, red_id), db_session.get(FighterFeatures, blue_id)
+        model_input = np.asarray([[getattr(red, f) for f in FEATURE_ORDER] + [getattr(blue, f) for f in FEATURE_ORDER]], dtype=np.float32)
+        with torch.no_grad():
+            expected = torch.sigmoid(model(torch.from_numpy(model_input)))[0][0].item()
+
+        assert prediction["error"] is None
+        assert prediction["red_corner_win_probability"] == pytest.approx(expected, abs=1e-6)
+        assert prediction["blue_corner_win_probability"] == pytest.approx(1.0 - expected, abs=1e-6)
+
+
+def test_predict_batch_reports_missing_features_inline(client: TestClient, db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    add_fighter(4, "Fighter Four", with_features=False)
+
+    payload = {"matchups": [{"red_corner_id": 1, "blue_corner_id": 4}, {"red_corner_id": 1, "blue_corner_id": 2}]}
+    response = client.post("/fights/predict_batch", json=payload)
+    assert response.status_code == 200
+
+    missing, scored = response.json()["predictions"]
+    assert missing["error"] == "fighter 4 has no features"
+    assert missing["red_corner_win_probability"] is None
+    assert scored["error"] is None
+    assert 0.0 <= scored["red_corner_win_probability"] <= 1.0
+
+
+def test_predict_batch_single_query(db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    connection = db_session.connection()
+    event.listen(connection, "before_cursor_execute", count)
+    try:
+        requests = [predictor.FightPredictionRequest(red_corner_id=1, blue_corner_id=2)] * 50
+        items = predictor.predict_fights_batch(requests, db_session)
+    finally:
+        event.remove(connection, "before_cursor_execute", count)
+
+    assert len(items) == 50
+    assert len(statements) == 1
+
+
+def test_division_matrix_matches_pairwise_predictions(client: TestClient, db_session, model, add_fighter, monkeypatch):
+    for fighter_id in range(1, 6):
+        add_fighter(fighter_id, f"Fighter {fighter_id:03d}")
+    add_fighter(6, "Fighter 006", with_features=False)
+    add_fighter(7, "Fighter 007", division="heavyweight")
+    monkeypatch.setattr(predictor.settings_predictor, "predictor_max_pairs_per_pass", 10)  # two red corners per pass
+
+    data = client.get("/fights/predict/division/lightweight").json()
+    assert data["fighter_ids"] == [1, 2, 3, 4, 5]
+    assert data["missing_features"] == [6]
+
+    matchups = [predictor.FightPredictionRequest(red_corner_id=r, blue_corner_id=b) for r in range(1, 6) for b in range(1, 6)]
+    expected = predictor.predict_fights_batch(matchups, db_session)
+    for item in expected:
+        value = data["probabilities"][item.red_corner_id - 1][item.blue_corner_id - 1]
+        if item.red_corner_id == item.blue_corner_id:
+            assert value is None
+        else:
+            assert value == pytest.approx(item.red_corner_win_probability, abs=1e-6)
+
+    # the ids travel in a json preamble of the body, not in a header
+    body = client.get("/fights/predict/division/lightweight", params={"format": "f16"}).content
+    (length,) = struct.unpack_from("<I", body)
+    preamble = json.loads(body[4 : 4 + length])
+    assert preamble == {"fighter_ids": [1, 2, 3, 4, 5], "shape": [5, 5], "missing_features": [6]}
+    assert (4 + length) % 8 == 0
+    matrix = np.frombuffer(body, dtype="<f2", offset=4 + length).reshape(preamble["shape"])
+    assert matrix[0, 1] == pytest.approx(data["probabilities"][0][1], abs=1e-3)
+
+
+def test_card_predictions_in_one_query(client: TestClient, db_session, model, add_fighter):
+    for fighter_id in range(1, 6):
+        add_fighter(fighter_id, f"Fighter {fighter_id:03d}")
+    add_fighter(6, "Fighter 006", with_features=False)
+    db_session.add(CardsDB(id=1, card_name="UFC Test Night", card_date=date(2030, 1, 1)))
+    for fight_id, (red_id, blue_id) in enumerate([(1, 2), (3, 4), (5, 6)], start=1):
+        db_session.add(FightsDB(id=fight_id, rounds=3, division="lightweight", card=1, red_corner=red_id, blue_corner=blue_id, fight_date=date(2030, 1, 1)))
+    db_session.flush()
+
+    statements = []
+    connection = db_session.connection()
+    event.listen(connection, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    predictions = predictor.predict_card(1, db_session)
+    assert len(statements) == 1
+
+    assert [p.fight_id for p in predictions] == [1, 2, 3]
+    assert predictions[0].red_corner_name == "Fighter 001"
+    assert predictions[2].error == "fighter 6 has no features"
+
+    expected = predictor.predict_fights_batch([predictor.FightPredictionRequest(red_corner_id=3, blue_corner_id=4)], db_session)[0]
+    assert predictions[1].red_corner_win_probability == pytest.approx(expected.red_corner_win_probability, abs=1e-6)
+
+    response = client.get("/cards/1/predictions")
+    assert response.status_code == 200
+    assert [p["fight_id"] for p in response.json()] == [1, 2, 3]
+
+    response = client.post("/cards/1/predict_html")
+    assert response.status_code == 200
+    assert "Fighter 003" in response.text
+    assert "fighter 6 has no features" in response.text
+
+    db_session.add(CardsDB(id=2, card_name="UFC Empty Night", card_date=date(2030, 2, 1)))
+    db_session.flush()
+    assert client.get("/cards/2/predictions").json() == []
+    assert client.get("/cards/99/predictions").status_code == 404
+    assert client.post("/cards/99/predict_html").status_code == 404
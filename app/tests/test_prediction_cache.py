@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.services.batcher import prediction_batcher
+from app.services.feature_store import FEATURE_ORDER, feature_matrix
+from app.services.prediction_cache import PredictionCache, prediction_cache
+from app.services.predictor import prediction_cache_key
+
+
+def test_lru_eviction_and_ttl():
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put((1, 2, "v1", 1, 1), 0.1)
+    cache.put((1, 3, "v1", 1, 1), 0.2)
+    assert cache.get((1, 2, "v1", 1, 1)) == 0.1  # now most recently used
+    cache.put((2, 3, "v1", 1, 1), 0.3)
+
+    assert cache.get((1, 3, "v1", 1, 1)) is None
+    assert cache.get((2, 3, "v1", 1, 1)) == 0.3
+    assert cache.evictions == 1
+
+    with patch("app.services.prediction_cache.time.monotonic", return_value=1e12):
+        assert cache.get((2, 3, "v1", 1, 1)) is None
+
+
+def test_invalidate_fighter_drops_all_matchups():
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put((1, 2, "v1", 1, 1), 0.1)
+    cache.put((3, 1, "v1", 1, 1), 0.2)
+    cache.put((2, 3, "v1", 1, 1), 0.3)
+
+    cache.invalidate_fighter(1)
+    assert len(cache) == 1
+    assert cache.get((2, 3, "v1", 1, 1)) == 0.3
+
+
+def test_hit_skips_db_and_model(client: TestClient, db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    payload = {"red_corner_id": 1, "blue_corner_id": 2}
+
+    first = client.post("/fights/predict", json=payload).json()
+    hits = prediction_cache.hits
+    with (
+        patch.object(model, "forward", side_effect=AssertionError("model called")),
+        patch.object(db_session, "execute", side_effect=AssertionError("db called")),
+    ):
+        second = client.post("/fights/predict", json=payload).json()
+
+    assert second == first
+    assert prediction_cache.hits == hits + 1
+
+
+def test_feature_change_invalidates(client: TestClient, db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    payload = {"red_corner_id": 1, "blue_corner_id": 2}
+
+    client.post("/fights/predict", json=payload)
+    assert len(prediction_cache) == 1
+
+    feature_matrix.upsert(1, dict.fromkeys(FEATURE_ORDER, 9.0))
+    assert len(prediction_cache) == 0
+
+
+def test_feature_change_during_scoring_is_not_cached_as_new(client: TestClient, db_session, model, add_fighter):
+    add_fighter(1, "Fighter One")
+    add_fighter(2, "Fighter Two")
+    submit = prediction_batcher.submit
+
+    # the features of fighter 1 change after the rows were read, before the result is put
+    async def submit_then_change(model_input):
+        result = await submit(model_input)
+        feature_matrix.upsert(1, dict.fromkeys(FEATURE_ORDER, 9.0))
+        return result
+
+    with patch.object(prediction_batcher, "submit", submit_then_change):
+        stale = client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2}).json()
+
+    assert prediction_cache.get(prediction_cache_key(1, 2, stale["model_version"])) is None
+    fresh = client.post("/fights/predict", json={"red_corner_id": 1, "blue_corner_id": 2}).json()
+    assert fresh["red_corner_win_probability"] != stale["red_corner_win_probability"]
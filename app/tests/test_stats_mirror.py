@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import api_services
+from app.services.api_cache import ApiResponseCache
+from app.services.stats_mirror import StatsMirror, main, write_mirror
+
+JONES = {"name": "Jon Jones", "Records": {"Sig. Str. Landed": "4.3"}, "Win Stats": {"Wins by Knockout": 10}}
+PEREIRA = {"name": "Alex Pereira", "Records": {"Sig. Str. Landed": "5.1"}, "Win Stats": {"Wins by Knockout": 9}}
+
+
+@pytest.fixture
+def mirror_path(tmp_path):
+    return str(tmp_path / "stats_mirror.jsonl")
+
+
+def test_lookup_by_normalized_name(mirror_path):
+    write_mirror(mirror_path, [(f"Fighter {i}", {"i": i}) for i in range(500)])
+    mirror = StatsMirror(mirror_path)
+
+    assert len(mirror) == 500
+    assert mirror.get("  fighter   123 ") == {"i": 123}
+    assert mirror.get("Fighter 500") is None
+    assert (mirror.hits, mirror.misses) == (1, 1)
+
+
+def test_rebuild_is_picked_up_without_reopening(mirror_path):
+    write_mirror(mirror_path, [("Jon Jones", JONES)])
+    mirror = StatsMirror(mirror_path)
+    assert mirror.get("Alex Pereira") is None
+
+    write_mirror(mirror_path, [("Jon Jones", JONES), ("Alex Pereira", PEREIRA)])
+    assert mirror.get("Alex Pereira") == PEREIRA
+
+
+def test_cli_builds_from_recordings_and_the_api_cache(mirror_path, tmp_path):
+    recorded = tmp_path / "recorded.jsonl"
+    recorded.write_text(json.dumps([JONES]) + "\n" + json.dumps({"Records": {}}) + "\n")  # a /search response, a payload without a name
+    cache = ApiResponseCache(max_size=10, ttl_seconds=60, negative_ttl_seconds=10, path=str(tmp_path / "api_cache.sqlite"))
+    cache.put("search:alex pereira", PEREIRA)
+    cache.put("search:nobody", None)
+    cache.close()
+
+    main(["build", str(recorded), "--from-api-cache", cache.path, "--mirror", mirror_path])
+    mirror = StatsMirror(mirror_path)
+    assert len(mirror) == 2
+    assert mirror.get("Alex Pereira") == PEREIRA
+
+    # refreshing keeps what the mirror has, newer recordings win
+    recorded.write_text(json.dumps({**JONES, "Win Stats": {"Wins by Knockout": 11}}) + "\n")
+    main(["build", str(recorded), "--mirror", mirror_path])
+    assert len(mirror) == 2
+    assert mirror.get("jon jones")["Win Stats"]["Wins by Knockout"] == 11
+
+
+@pytest.mark.parametrize("mode, upstream_calls", [("first", ["Alex Pereira"]), ("only", [])])
+def test_mirror_before_the_api(mode, upstream_calls, mirror_path, monkeypatch):
+    write_mirror(mirror_path, [("Jon Jones", JONES)])
+    monkeypatch.setattr(api_services, "stats_mirror", StatsMirror(mirror_path))
+    monkeypatch.setattr(api_services.settings_api, "api_mirror_mode", mode)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["name"])
+        return httpx.Response(200, json=[PEREIRA])
+
+    async def lookup():
+        api_services.open_api_client(httpx.MockTransport(handler))
+        try:
+            return [await api_services.get_external_fighter_features(name) for name in ("Jon Jones", "Alex Pereira")]
+        finally:
+            await api_services.close_api_client()
+
+    assert asyncio.run(lookup()) == [JONES, PEREIRA if mode == "first" else None]
+    assert calls == upstream_calls
+
+
+# a fighter the api did not know a while ago is found in the mirror, the cached miss does not hide it
+def test_mirror_before_a_cached_miss(mirror_path, api_cache, monkeypatch):
+    write_mirror(mirror_path, [("Jon Jones", JONES)])
+    monkeypatch.setattr(api_services, "stats_mirror", StatsMirror(mirror_path))
+    monkeypatch.setattr(api_services.settings_api, "api_mirror_mode", "first")
+    api_cache.put(api_services.fighter_cache_key("Jon Jones"), None)
+    api_cache.put(api_services.fighter_cache_key("Nobody Known"), None)
+
+    assert asyncio.run(api_services.get_external_fighter_features("Jon Jones")) == JONES
+    assert asyncio.run(api_services.get_external_fighter_features("Nobody Known")) is None  # still a cached miss, no upstream call
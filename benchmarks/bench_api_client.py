@@ -0,0 +1,94 @@
+"""external api lookups per second through the pooled client against a new client per lookup (the old behaviour),
+sequential and concurrent.
+
+the api is a local keep-alive http server. a new connection waits --connect-ms before it is served, standing in for
+the dns lookup, tcp connect and tls handshake to mma-stats.p.rapidapi.com that a fresh client pays on every lookup.
+
+    python benchmarks/bench_api_client.py --lookups 300 --concurrency 20 --connect-ms 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+os.environ.setdefault("RAPIDAPI_API_KEY", "bench")
+
+import httpx  # noqa: E402
+
+from app.db.settings import settings_api  # noqa: E402
+from app.services.api_services import create_api_client  # noqa: E402
+
+BODY = json.dumps([{"name": "Bench Fighter", "Records": {"Sig. Str. Landed": "4.3"}, "Win Stats": {"Wins by Knockout": 10}}]).encode()
+
+
+async def start_stand_in(connect_ms: float, response_ms: float) -> asyncio.Server:
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        await asyncio.sleep(connect_ms / 1000)
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):  # get requests, no body
+                await asyncio.sleep(response_ms / 1000)
+                writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\ncontent-length: %d\r\n\r\n%s" % (len(BODY), BODY))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(serve, "127.0.0.1", 0, backlog=1024)
+
+
+async def run(mode: str, lookups: int, concurrency: int) -> float:
+    pooled = create_api_client() if mode == "pooled" else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(i: int):
+        async with semaphore:
+            if pooled is not None:
+                response = await pooled.get("/search", params={"name": f"fighter {i}"})
+            else:
+                async with httpx.AsyncClient(base_url=settings_api.rapidapi_base_url, timeout=10.0) as client:
+                    response = await client.get("/search", params={"name": f"fighter {i}"})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(lookup(i) for i in range(lookups)))
+    elapsed = time.perf_counter() - start
+    if pooled is not None:
+        await pooled.aclose()
+    return lookups / elapsed
+
+
+async def main_async(args: argparse.Namespace):
+    server = await start_stand_in(args.connect_ms, args.response_ms)
+    port = server.sockets[0].getsockname()[1]
+    settings_api.rapidapi_base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{'client':<9} {'concurrency':>11} {'lookups/s':>10}")
+    for concurrency in (1, args.concurrency):
+        for mode in ("per-call", "pooled"):
+            rate = await run(mode, args.lookups, concurrency)
+            print(f"{mode:<9} {concurrency:>11} {rate:>10.1f}")
+
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20, help="keep it at or under API_MAX_CONNECTIONS")
+    parser.add_argument("--connect-ms", type=float, default=30.0, help="setup cost of a new connection")
+    parser.add_argument("--response-ms", type=float, default=5.0, help="server time per lookup")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
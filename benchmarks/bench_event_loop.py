@@ -0,0 +1,115 @@
+"""p99 latency of an unrelated route while /fights/predict is under load, with the blocking
+prediction work inline on the event loop (before) and offloaded to the thread pools (after).
+
+    python benchmarks/bench_event_loop.py --seconds 5 --concurrency 8 --db-latency-ms 2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+os.environ.setdefault("RAPIDAPI_API_KEY", "bench")
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")  # every request does the full work
+
+import httpx  # noqa: E402
+import torch  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db.models import FighterFeatures, FightersDB  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.db.settings import settings_predictor  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import predictor  # noqa: E402
+from app.services.torch_backend import FightPredictor, TorchPredictorRunner  # noqa: E402
+
+
+def seed(n_fighters: int, with_features: float):
+    with SessionLocal() as db:
+        for i in range(1, n_fighters + 1):
+            db.add(
+                FightersDB(id=i, name=f"Bench Fighter {i:05d}", division="lightweight", birth_date=date(1995, 1, 1), wins=10, losses=2, height=1.8, weight=70.0)
+            )
+            if random.random() < with_features:
+                db.add(
+                    FighterFeatures(
+                        fighter_id=i, avg_sig_str_landed=random.uniform(1, 7), avg_sig_str_pct=random.uniform(30, 60), wins_by_ko=random.randint(0, 10)
+                    )
+                )
+        db.commit()
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run(offload: bool, seconds: float, concurrency: int, n_fighters: int) -> dict:
+    settings_predictor.predictor_offload = offload
+    transport = httpx.ASGITransport(app=app)
+    deadline = time.perf_counter() + seconds
+    probe_latencies: list[float] = []
+    predictions = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def predict_load():
+            nonlocal predictions
+            while time.perf_counter() < deadline:
+                red, blue = random.sample(range(1, n_fighters + 1), 2)
+                await client.post("/fights/predict", json={"red_corner_id": red, "blue_corner_id": blue})
+                predictions += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/stats/features")
+                probe_latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.005)
+
+        await asyncio.gather(probe(), *(predict_load() for _ in range(concurrency)))
+
+    return {
+        "mode": "offloaded" if offload else "inline",
+        "predictions/s": predictions / seconds,
+        "probe p50 ms": statistics.median(probe_latencies),
+        "probe p99 ms": percentile(probe_latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="keep it under the engine pool size, inline mode deadlocks on checkout otherwise")
+    parser.add_argument("--fighters", type=int, default=5000)
+    parser.add_argument("--with-features", type=float, default=0.5, help="share of fighters with features, the rest miss the matrix and hit the db")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="added to every statement, sqlite has no network round trip")
+    args = parser.parse_args()
+
+    random.seed(0)
+    torch.manual_seed(0)
+    seed(args.fighters, args.with_features)
+
+    if args.db_latency_ms:
+        event.listen(engine, "before_cursor_execute", lambda *_: time.sleep(args.db_latency_ms / 1000))
+    predictor.model_state.served = predictor.ServedModel(TorchPredictorRunner(FightPredictor(input_dim=14).eval()), "bench", {"input_dim": 14})
+
+    for offload in (False, True):
+        result = asyncio.run(run(offload, args.seconds, args.concurrency, args.fighters))
+        print("  ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""forward pass latency and weight size of the serving backends at the common batch sizes.
+
+uses pytorch/predictor.pt when present, otherwise a randomly initialized model of the same shape.
+
+    python benchmarks/bench_model_backends.py --repeat 2000
+"""
+
+import argparse
+import copy
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+
+from app.services.model_export import export_numpy, export_torchscript  # noqa: E402
+from app.services.numpy_backend import load_numpy_model  # noqa: E402
+from app.services.predictor import MODEL_PATH, metadata  # noqa: E402
+from app.services.torch_backend import FightPredictor, TorchPredictorRunner, load_eager_model, load_torchscript_model, quantize_model  # noqa: E402
+
+BATCH_SIZES = [1, 32, 1024]
+
+
+def timed(fn, model_input, repeat: int) -> tuple[float, float]:
+    for _ in range(20):
+        fn(model_input)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(model_input)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+# every backend behind the same numpy in, probabilities out interface the server uses.
+# the artifact path is what each worker loads, its size is what it keeps resident for the weights
+def backends(eager: torch.nn.Module, tmp: str) -> dict:
+    quantized_path = f"{tmp}/predictor.quantized.pt"
+    quantized = quantize_model(copy.deepcopy(eager))
+    torch.save(quantized.state_dict(), quantized_path)
+    eager_path = f"{tmp}/predictor.pt"
+    torch.save(eager.state_dict(), eager_path)
+    torchscript_path = export_torchscript(eager, f"{tmp}/predictor.torchscript.pt")
+    numpy_path = export_numpy(eager, f"{tmp}/predictor.npz")
+    return {
+        "eager": (TorchPredictorRunner(eager), eager_path),
+        "torchscript": (TorchPredictorRunner(load_torchscript_model(torchscript_path)), torchscript_path),
+        "quantized": (TorchPredictorRunner(quantized), quantized_path),
+        "numpy": (load_numpy_model(numpy_path), numpy_path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    eager = load_eager_model(MODEL_PATH, metadata["input_dim"]) if Path(MODEL_PATH).exists() else FightPredictor(input_dim=metadata["input_dim"]).eval()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models = backends(eager, tmp)
+        for name, (_, path) in models.items():
+            print(f"{name:<12} weights: {os.path.getsize(path) / 1024:.1f} KiB")
+
+        rng = np.random.default_rng(0)
+        print(f"{'backend':<12} {'batch':>6} {'p50 us':>10} {'p99 us':>10}")
+        for batch_size in BATCH_SIZES:
+            model_input = rng.standard_normal((batch_size, metadata["input_dim"]), dtype=np.float32)
+            for name, (model, _) in models.items():
+                p50, p99 = timed(model, model_input, args.repeat)
+                print(f"{name:<12} {batch_size:>6} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""fights listing latency as the table grows: the old full listing (every row and its fighters) against one keyset
+page, the first one and one 90% deep, with and without a division filter. sqlite file in a temp dir.
+
+    python benchmarks/bench_pagination.py --rows 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("RAPIDAPI_API_KEY", "bench")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.models import Base, CardsDB, FightersDB, FightsDB  # noqa: E402
+from app.schemas.fighters import DivisionEnum  # noqa: E402
+from app.services.fights import get_all_fights_service  # noqa: E402
+from app.services.pagination import encode_cursor  # noqa: E402
+
+N_FIGHTERS = 2000
+DIVISIONS = list(DivisionEnum)
+
+
+def prepare(path: str, rows: int) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    start = date(1993, 11, 12)
+    with engine.begin() as conn:
+        conn.execute(insert(CardsDB), [{"id": 1, "card_name": "Bench Card", "card_date": start, "card_number": 1}])
+        conn.execute(
+            insert(FightersDB),
+            [
+                {
+                    "id": i,
+                    "name": f"Bench Fighter {i:05d}",
+                    "division": random.choice(DIVISIONS),
+                    "birth_date": date(1995, 1, 1),
+                    "wins": 10,
+                    "losses": 2,
+                    "height": 1.8,
+                    "weight": 70.0,
+                }
+                for i in range(1, N_FIGHTERS + 1)
+            ],
+        )
+        for offset in range(0, rows, 50000):
+            batch = []
+            for i in range(offset, min(offset + 50000, rows)):
+                red, blue = random.sample(range(1, N_FIGHTERS + 1), 2)
+                batch.append(
+                    {
+                        "id": i + 1,
+                        "rounds": 3,
+                        "division": random.choice(DIVISIONS),
+                        "card": 1,
+                        "red_corner": red,
+                        "blue_corner": blue,
+                        "favorite": red,
+                        "winner": blue,
+                        "fight_date": start + timedelta(days=i * 12000 // rows),
+                    }
+                )
+            conn.execute(insert(FightsDB), batch)
+    return sessionmaker(bind=engine)
+
+
+def timed(session_factory: sessionmaker, fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            start = time.perf_counter()
+            fn(db)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--full-up-to", type=int, default=100000, help="skip the full listing on bigger tables")
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'rows':>9} {'full ms':>9} {'first ms':>9} {'deep ms':>9} {'division deep ms':>17}")
+    for rows in args.rows:
+        session_factory = prepare(os.path.join(tempfile.mkdtemp(), "bench.db"), rows)
+        with session_factory() as db:
+            deep = db.get(FightsDB, rows // 10)  # newest first, 90% of the table comes before it
+            deep_cursor = encode_cursor((deep.fight_date, deep.id))
+
+        full = timed(session_factory, lambda db: [f.red_fighter.name for f in db.query(FightsDB).all()], 3) if rows <= args.full_up_to else float("nan")
+        first = timed(session_factory, lambda db: get_all_fights_service(db, None, args.limit), 20)
+        deep_ms = timed(session_factory, lambda db, cursor=deep_cursor: get_all_fights_service(db, cursor, args.limit), 20)
+        division = timed(session_factory, lambda db, cursor=deep_cursor: get_all_fights_service(db, cursor, args.limit, DivisionEnum.lightweight), 20)
+        print(f"{rows:>9} {full:>9.1f} {first:>9.2f} {deep_ms:>9.2f} {division:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
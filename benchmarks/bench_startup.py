@@ -0,0 +1,86 @@
+"""cold start time and peak resident memory of a worker with the torch (eager) and numpy backends.
+
+each run is a fresh interpreter that imports the app, loads the model and scores one matchup.
+uses pytorch/predictor.pt when present, otherwise a randomly initialized model of the same shape.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# peak rss from VmHWM (linux, KiB). ru_maxrss would carry over the peak of this process, which has torch loaded
+WORKER = """
+import sys, time
+start = time.perf_counter()
+import numpy as np
+import main
+from app.services import predictor
+model = predictor.get_model()
+model(np.zeros((1, model.metadata["input_dim"]), dtype=np.float32))
+elapsed = time.perf_counter() - start
+peak = next(line.split()[1] for line in open("/proc/self/status") if line.startswith("VmHWM"))
+print(elapsed, peak, "torch" in sys.modules)
+"""
+
+
+# checkpoint, numpy export and metadata in a scratch dir, the worker runs from there
+def prepare(tmp: Path):
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    os.environ.setdefault("RAPIDAPI_API_KEY", "bench")
+    import torch
+
+    os.chdir(ROOT)
+    from app.services.model_export import export_numpy
+    from app.services.predictor import MODEL_PATH, metadata
+    from app.services.torch_backend import FightPredictor, load_eager_model
+
+    torch.manual_seed(0)
+    eager = load_eager_model(MODEL_PATH, metadata["input_dim"]) if Path(MODEL_PATH).exists() else FightPredictor(input_dim=metadata["input_dim"]).eval()
+
+    (tmp / "pytorch").mkdir()
+    torch.save({"model_state_dict": eager.state_dict()}, tmp / "pytorch/predictor.pt")
+    export_numpy(eager, str(tmp / "pytorch/predictor.npz"))
+    shutil.copy(ROOT / "pytorch/predictor_meta.json", tmp / "pytorch/predictor_meta.json")
+
+
+def run_worker(tmp: Path, backend: str) -> tuple[float, float, bool]:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join((str(ROOT), str(ROOT / "app"))),
+        "PREDICTOR_BACKEND": backend,
+        "DATABASE_URL": "sqlite:///:memory:",
+        "RAPIDAPI_API_KEY": "bench",
+    }
+    output = subprocess.run([sys.executable, "-c", WORKER], cwd=tmp, env=env, check=True, capture_output=True, text=True).stdout
+    elapsed, maxrss, torch_loaded = output.strip().splitlines()[-1].split()
+    return float(elapsed), int(maxrss) / 1024, torch_loaded == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare(Path(tmp))
+        print(f"{'backend':<8} {'startup s':>10} {'peak rss MiB':>13} {'torch':>6}")
+        for backend in ("eager", "numpy"):
+            runs = [run_worker(Path(tmp), backend) for _ in range(args.runs)]
+            startup = statistics.median(run[0] for run in runs)
+            rss = statistics.median(run[1] for run in runs)
+            print(f"{backend:<8} {startup:>10.2f} {rss:>13.1f} {json.dumps(runs[0][2]):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""stats mirror lookups per second and build time for a mirror of --fighters fighters.
+hits and misses go through the sorted index, a hit also reads and parses its jsonl line.
+
+    python benchmarks/bench_stats_mirror.py --fighters 100000 --lookups 100000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.services.stats_mirror import StatsMirror, write_mirror  # noqa: E402
+
+PAYLOAD = {"Records": {"Sig. Str. Landed": "4.3", "Striking accuracy": "51%", "Takedown avg": "1.2"}, "Win Stats": {"Wins by Knockout": 10}}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fighters", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    path = str(Path(tempfile.mkdtemp()) / "stats_mirror.jsonl")
+
+    start = time.perf_counter()
+    write_mirror(path, ((f"Bench Fighter {i}", {"name": f"Bench Fighter {i}", **PAYLOAD}) for i in range(args.fighters)))
+    print(f"build: {args.fighters} fighters in {time.perf_counter() - start:.2f}s, {Path(path).stat().st_size / 2**20:.1f} MiB data")
+
+    mirror = StatsMirror(path)
+    mirror.get("warm up")
+    for label, names in (
+        ("hit", [f"Bench Fighter {random.randrange(args.fighters)}" for _ in range(args.lookups)]),
+        ("miss", [f"Nobody {i}" for i in range(args.lookups)]),
+    ):
+        start = time.perf_counter()
+        for name in names:
+            mirror.get(name)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<5} {args.lookups / elapsed:>10.0f} lookups/s {elapsed / args.lookups * 1e6:>7.1f} us/lookup")
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main()
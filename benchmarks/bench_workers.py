@@ -0,0 +1,162 @@
+"""per worker memory with 1, 4 and 16 workers, `uvicorn --workers` (spawned, every worker loads its own copy)
+against `python -m app.serve` (forked from one preloaded process).
+
+pss splits shared pages between the processes that map them, uss is what only that worker holds.
+total is the pss of the workers plus the supervisor, what the whole server costs. linux only (/proc).
+
+    python benchmarks/bench_workers.py --workers 1 4 16
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/bench.db")
+os.environ.setdefault("RAPIDAPI_API_KEY", "bench")
+os.environ.setdefault("PREDICTOR_REGISTRY_DIR", f"{_tmp}/models")
+
+import torch  # noqa: E402
+
+from app.db.models import Base, FighterFeatures, FightersDB  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.services.torch_backend import FightPredictor  # noqa: E402
+
+
+def prepare(n_fighters: int):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        for i in range(1, n_fighters + 1):
+            db.add(
+                FightersDB(id=i, name=f"Bench Fighter {i:05d}", division="lightweight", birth_date=date(1995, 1, 1), wins=10, losses=2, height=1.8, weight=70.0)
+            )
+            db.add(
+                FighterFeatures(fighter_id=i, avg_sig_str_landed=random.uniform(1, 7), avg_sig_str_pct=random.uniform(30, 60), wins_by_ko=random.randint(0, 10))
+            )
+        db.commit()
+
+    version = Path(os.environ["PREDICTOR_REGISTRY_DIR"]) / "v0001"
+    version.mkdir(parents=True)
+    torch.save({"model_state_dict": FightPredictor(input_dim=14).state_dict()}, version / "predictor.pt")
+    (version / "predictor_meta.json").write_text(json.dumps({"input_dim": 14}))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int) -> list[int]:
+    found = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                stat = Path(f"/proc/{entry}/stat").read_text()
+            except OSError:
+                continue
+            if int(stat.rsplit(")", 1)[1].split()[1]) == pid:  # the command name may contain spaces
+                found.append(int(entry))
+    return found
+
+
+# uvicorn runs a single worker in its own process, without a supervisor
+def worker_pids(server: subprocess.Popen, mode: str, workers: int) -> list[int]:
+    if mode == "uvicorn" and workers == 1:
+        return [server.pid]
+    return [pid for pid in children(server.pid) if "resource_tracker" not in Path(f"/proc/{pid}/cmdline").read_text()]
+
+
+# kB values of /proc/<pid>/smaps_rollup
+def memory(pid: int) -> dict[str, int]:
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":")
+        values[key] = int(value.split()[0])
+    return {"rss": values["Rss"], "pss": values["Pss"], "uss": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def measure(mode: str, workers: int, n_fighters: int) -> dict:
+    port = free_port()
+    if mode == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "app.serve", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            deadline = time.monotonic() + 300
+            while True:
+                try:
+                    if client.get("/stats/features").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{mode} with {workers} workers did not start")
+                time.sleep(0.5)
+
+            # wait until every worker is up, then send some predictions so each one has run the model
+            while len(worker_pids(server, mode, workers)) < workers:
+                time.sleep(0.5)
+            time.sleep(2 + workers * 0.5)
+            for _ in range(workers * 20):
+                red, blue = random.sample(range(1, n_fighters + 1), 2)
+                client.post("/fights/predict", json={"red_corner_id": red, "blue_corner_id": blue})
+
+        pids = worker_pids(server, mode, workers)
+        per_worker = [memory(pid) for pid in pids]
+        supervisor = memory(server.pid) if server.pid not in pids else {"pss": 0}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    def mean(key: str) -> float:
+        return sum(m[key] for m in per_worker) / len(per_worker) / 1024
+
+    return {
+        "mode": mode,
+        "workers": len(per_worker),
+        "rss MiB": mean("rss"),
+        "pss MiB": mean("pss"),
+        "uss MiB": mean("uss"),
+        "total pss MiB": (sum(m["pss"] for m in per_worker) + supervisor["pss"]) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--modes", nargs="+", choices=["uvicorn", "prefork"], default=["uvicorn", "prefork"])
+    parser.add_argument("--fighters", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    torch.manual_seed(0)
+    prepare(args.fighters)
+
+    print(f"{'mode':<8} {'workers':>7} {'rss MiB':>9} {'pss MiB':>9} {'uss MiB':>9} {'total pss MiB':>14}")
+    for workers in args.workers:
+        for mode in args.modes:
+            r = measure(mode, workers, args.fighters)
+            print(f"{r['mode']:<8} {r['workers']:>7} {r['rss MiB']:>9.1f} {r['pss MiB']:>9.1f} {r['uss MiB']:>9.1f} {r['total pss MiB']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()